@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: wire codecs – encode/decode cost and bytes on the wire.
+
+Measures every codec netcodec can use in this environment (MessagePack only
+when the ``msgpack`` package is installed), each with and without zlib frame
+compression at COMPRESS_MIN_BYTES, on three typical messages: one ordered
+command, a full history page and an initial_world packet.
+
+Run from the project root:
+    python benchmarks/bench_codecs.py [--repeat 2000]
+"""
+
+import argparse, json, os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from engine.core import netcodec
+
+
+def _command(seq: int) -> dict:
+    return {
+        "seq": seq,
+        "timestamp": 1_700_000_000 + seq * 0.25,
+        "command": {"username": f"player{seq % 4}", "text": f"raise {seq % 7}"},
+    }
+
+
+def _messages() -> dict:
+    with open(os.path.join("templates", "default", config.INITIAL_WORLD_FILE)) as fh:
+        world = json.load(fh)
+    return {
+        "command": _command(42),
+        "history_page": {
+            "type": "history_page",
+            "commands": [_command(i) for i in range(1, config.HISTORY_PAGE_SIZE + 1)],
+        },
+        "initial_world": {"type": "initial_world", "world": world},
+    }
+
+
+def _us_per_call(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def main():
+    p = argparse.ArgumentParser(description="Wire codec benchmark")
+    p.add_argument("--repeat", type=int, default=2000)
+    args = p.parse_args()
+
+    if netcodec.msgpack is None:
+        print("msgpack not installed – only JSON is available")
+    print("times are µs per message; bytes include the 4-byte header")
+    print(f"{'message':>14} {'codec':>13} {'bytes':>8} {'encode':>9} {'decode':>9}")
+
+    for label, msg in _messages().items():
+        rep = args.repeat if label == "command" else max(1, args.repeat // 20)
+        for name, codec in netcodec.CODECS.items():
+            for over in (None, config.COMPRESS_MIN_BYTES):
+                blob = netcodec.encode(msg, codec, over)
+                dec = netcodec.NetDecoder()
+                assert dec.feed(blob) == [msg]
+                enc_us = _us_per_call(lambda: netcodec.encode(msg, codec, over), rep)
+                dec_us = _us_per_call(lambda: dec.feed(blob), rep)
+                tag = name if over is None else name + "+zlib"
+                print(f"{label:>14} {tag:>13} {len(blob):>8} {enc_us:>9.2f} {dec_us:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
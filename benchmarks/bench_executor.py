@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-command latency of the sequencer's execution engines.
+
+Builds a throw-away client directory (orchestrator, rule loop and the
+project's scripts) and times ``raise 1`` – one command script plus the rule
+loop – through each engine in engine/client/executor.py.
+
+Run from the project root:
+    python benchmarks/bench_executor.py [--commands 50]
+"""
+
+import argparse, json, os, shutil, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+from engine.client.executor import EXECUTORS, make_executor
+
+
+def _client_dir(tmp: str) -> str:
+    cd = os.path.join(tmp, "client")
+    os.makedirs(os.path.join(cd, "data"))
+    for name in (config.ORCHESTRATOR_SCRIPT, config.RULE_LOOP_SCRIPT, "config.py"):
+        shutil.copy(os.path.join(ROOT, name), cd)
+    shutil.copytree(os.path.join(ROOT, "scripts"), os.path.join(cd, "scripts"))
+    return cd
+
+
+def main():
+    p = argparse.ArgumentParser(description="Executor benchmark")
+    p.add_argument("--commands", type=int, default=50)
+    args = p.parse_args()
+
+    orchestrator = os.path.join(ROOT, config.ORCHESTRATOR_SCRIPT)
+    with tempfile.TemporaryDirectory() as tmp:
+        cd = _client_dir(tmp)
+        print(f"{'executor':>12} {'first (ms)':>11} {'steady (ms)':>12}")
+        for kind in EXECUTORS:
+            with open(os.path.join(cd, "data", config.WORLD_FILE), "w") as fh:
+                json.dump({"counter": 0, "rules_in_power": ["trim_counter"]}, fh)
+            ex = make_executor(kind, cd, orchestrator)
+            t0 = time.perf_counter()
+            assert ex.run("raise 1", "bench")[0] == 0
+            first = (time.perf_counter() - t0) * 1000
+            t0 = time.perf_counter()
+            for _ in range(args.commands):
+                ex.run("raise 1", "bench")
+            steady = (time.perf_counter() - t0) / args.commands * 1000
+            ex.close()
+            print(f"{kind:>12} {first:>11.1f} {steady:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
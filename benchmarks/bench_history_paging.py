@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of serving one history page as the session grows.
+
+Compares the old approach (json.load the whole history.json, filter, slice)
+against HistoryStore.read_raw (seek via the .idx files + bounded read).
+
+Run from the project root:
+    python benchmarks/bench_history_paging.py [--sizes 1000 10000 100000]
+"""
+
+import argparse, json, os, sys, tempfile, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from engine.server.history_store import HistoryStore
+
+
+def _command(seq: int) -> dict:
+    return {
+        "seq": seq,
+        "timestamp": 1_700_000_000 + seq * 0.25,
+        "command": {"username": f"player{seq % 4}", "text": f"raise {seq % 7}"},
+    }
+
+
+def _legacy_page(path: str, from_seq: int, page_size: int) -> list:
+    with open(path, "r") as fh:
+        history = json.load(fh)
+    return [cmd for cmd in history if cmd.get("seq", 0) >= from_seq][:page_size]
+
+
+def _time_per_call(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def main():
+    p = argparse.ArgumentParser(description="History paging benchmark")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    p.add_argument("--repeat", type=int, default=20)
+    args = p.parse_args()
+
+    page = config.HISTORY_PAGE_SIZE
+    print(f"page size {page}, times are ms per page request")
+    print(f"{'commands':>10} {'legacy first':>13} {'legacy last':>12} {'store first':>12} {'store last':>11}")
+
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            cmds = [_command(i) for i in range(1, n + 1)]
+            legacy = os.path.join(tmp, "legacy.json")
+            with open(legacy, "w") as fh:
+                json.dump(cmds, fh, indent=2)
+
+            store = HistoryStore(tmp)
+            for cmd in cmds:
+                store.append(cmd)
+
+            last_from = max(n - page + 1, 1)
+            rep = max(1, args.repeat if n <= 10_000 else args.repeat // 4)
+            row = (
+                _time_per_call(lambda: _legacy_page(legacy, 1, page), rep),
+                _time_per_call(lambda: _legacy_page(legacy, last_from, page), rep),
+                _time_per_call(lambda: store.read_raw(1, page), args.repeat * 10),
+                _time_per_call(lambda: store.read_raw(last_from, page), args.repeat * 10),
+            )
+            store.close()
+            print(f"{n:>10} {row[0]:>13.3f} {row[1]:>12.3f} {row[2]:>12.3f} {row[3]:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: NetDecoder throughput on large frames.
+
+Compares the old decoder (``bytes`` buffer grown with ``+=`` and re-sliced
+per message) against the bytearray/memoryview NetDecoder, both through
+``feed`` with fixed-size chunks and through ``recv_into`` on a socketpair.
+
+Run from the project root:
+    python benchmarks/bench_netdecoder.py [--sizes-mb 1 50] [--chunk 4096]
+"""
+
+import argparse, os, socket, struct, sys, threading, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from engine.core import netcodec
+
+
+class LegacyDecoder:
+    """The pre-bytearray decoder, binary frames only (no JSON parse cost)."""
+
+    def __init__(self) -> None:
+        self._buf = b""
+
+    def feed(self, data: bytes) -> list:
+        self._buf += data
+        out = []
+        while len(self._buf) >= 4:
+            length = struct.unpack(">I", self._buf[:4])[0] & netcodec.LENGTH_MASK
+            if len(self._buf) < 4 + length:
+                break
+            out.append(self._buf[4 : 4 + length])
+            self._buf = self._buf[4 + length :]
+        return out
+
+
+def _feed_all(decoder, blob: bytes, chunk: int) -> int:
+    got = 0
+    view = memoryview(blob)
+    for i in range(0, len(blob), chunk):
+        got += len(decoder.feed(bytes(view[i : i + chunk])))
+    return got
+
+
+def _recv_all(blob: bytes, chunk: int) -> int:
+    a, b = socket.socketpair()
+    sender = threading.Thread(target=lambda: (a.sendall(blob), a.close()))
+    sender.start()
+    dec, got = netcodec.NetDecoder(), 0
+    while (msgs := dec.recv_into(b, chunk)) is not None:
+        got += len(msgs)
+    sender.join()
+    b.close()
+    return got
+
+
+def _mb_per_s(fn, nbytes: int) -> float:
+    t0 = time.perf_counter()
+    assert fn() == 1
+    return nbytes / (time.perf_counter() - t0) / 1e6
+
+
+def main():
+    p = argparse.ArgumentParser(description="NetDecoder benchmark")
+    p.add_argument("--sizes-mb", type=int, nargs="+", default=[1, 50])
+    p.add_argument("--chunk", type=int, default=4096, help="bytes per feed() call")
+    p.add_argument("--legacy-max-mb", type=int, default=8,
+                   help="skip the (quadratic) legacy decoder above this size")
+    args = p.parse_args()
+
+    print(f"one binary frame per run, feed() chunk {args.chunk} B, "
+          f"recv_into chunk {config.BUFFER_SIZE} B; MB/s")
+    print(f"{'frame':>8} {'legacy feed':>12} {'new feed':>10} {'recv_into':>10}")
+
+    for mb in args.sizes_mb:
+        blob = netcodec.encode_binary(os.urandom(mb * 1024 * 1024))
+        if mb <= args.legacy_max_mb:
+            legacy = f"{_mb_per_s(lambda: _feed_all(LegacyDecoder(), blob, args.chunk), len(blob)):.1f}"
+        else:
+            legacy = "skipped"
+        new = _mb_per_s(lambda: _feed_all(netcodec.NetDecoder(), blob, args.chunk), len(blob))
+        recv = _mb_per_s(lambda: _recv_all(blob, config.BUFFER_SIZE), len(blob))
+        print(f"{mb:>6}MB {legacy:>12} {new:>10.1f} {recv:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
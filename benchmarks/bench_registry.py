@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: script discovery – full rglob scan vs the indexed registry.
+
+Creates N command scripts in a temp folder and times one discovery the way
+a fresh orchestrator process does it (empty in-memory cache), before and
+after engine/core/registry.py, plus a lookup after one script changed.
+
+Run from the project root:
+    python benchmarks/bench_registry.py [--scripts 500] [--repeat 20]
+"""
+
+import argparse, os, re, sys, tempfile, time
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from engine.core import registry
+
+NAME_PATTERN = re.compile(r'NAME\s*=\s*["\'](.+?)["\']')
+BODY = "\nimport sys\nfrom engine.core import world_store\n\n" + "# filler\n" * 60
+
+
+def _rglob_scan(folder: Path) -> dict:
+    """The pre-index discovery: open every script, regex the first line."""
+    found = {}
+    for path in folder.rglob("*.py"):
+        with path.open() as fh:
+            for line in fh:
+                s = line.strip()
+                if not s or s.startswith("#"):
+                    continue
+                m = NAME_PATTERN.match(s)
+                if m:
+                    found[m.group(1)] = str(path)
+                break
+    return found
+
+
+def _fresh_discover(folder: Path, index: str) -> dict:
+    registry._memo.clear()          # what a new process starts with
+    registry._paths.clear()
+    return registry.discover(folder, index)
+
+
+def _time(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    p = argparse.ArgumentParser(description="Registry benchmark")
+    p.add_argument("--scripts", type=int, default=500)
+    p.add_argument("--repeat", type=int, default=20)
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp, "commands")
+        for i in range(args.scripts):
+            sub = folder / f"group{i % 10}"
+            sub.mkdir(parents=True, exist_ok=True)
+            (sub / f"cmd_{i}.py").write_text(f'NAME = "cmd_{i}"\n' + BODY)
+        old = time.time() - 10      # out of the index's "racy" window
+        for path in folder.rglob("*.py"):
+            os.utime(path, (old, old))
+        index = os.path.join(tmp, registry.INDEX_FILE)
+
+        assert _rglob_scan(folder) == _fresh_discover(folder, index)
+        print(f"{args.scripts} scripts, ms per discovery")
+        print(f"  rglob + open every file : {_time(lambda: _rglob_scan(folder), args.repeat):8.2f}")
+        print(f"  index, new process      : {_time(lambda: _fresh_discover(folder, index), args.repeat):8.2f}")
+        print(f"  index, long-lived       : {_time(lambda: registry.discover(folder, index), args.repeat):8.2f}")
+
+        target = folder / "group0" / "cmd_0.py"
+        target.write_text('NAME = "renamed"\n' + BODY)
+        os.utime(target, (old + 1, old + 1))
+        t0 = time.perf_counter()
+        assert "renamed" in _fresh_discover(folder, index)
+        print(f"  index, one file changed : {(time.perf_counter() - t0) * 1000:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
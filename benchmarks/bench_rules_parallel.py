@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one rule loop over N independent rules, serial vs PARALLEL_RULES.
+
+Creates N script rules in a temp client folder, each reading and writing
+its own key (READS/WRITES declared) and burning a little CPU, and times
+rule_loop.apply_rules with the subprocess runner and the worker pool at
+several RULE_WORKERS settings (a pool of that size).  Every run must give
+the serial world.
+
+Run from the project root:
+    python benchmarks/bench_rules_parallel.py [--rules 16] [--work 200000]
+"""
+
+import argparse, contextlib, importlib.util, io, os, sys, tempfile, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+
+RULE = '''NAME = "r{i}"
+READS = ["in.k{i}"]
+WRITES = ["out.k{i}"]
+import json, sys
+w = json.load(sys.stdin)
+v = w["in"]["k{i}"]
+for _ in range({work}):
+    v = (v * 31 + 7) % 1000003
+w.setdefault("out", {{}})["k{i}"] = v
+print(json.dumps(w))
+'''
+
+
+def _rule_loop():
+    spec = importlib.util.spec_from_file_location(
+        "rule_loop", os.path.join(ROOT, config.RULE_LOOP_SCRIPT))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _loop(rl, run_script, rules: int, repeat: int):
+    world = None
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        world = {"in": {f"k{i}": i for i in range(rules)},
+                 "rules_in_power": [f"r{i}" for i in range(rules)]}
+        with contextlib.redirect_stdout(io.StringIO()):
+            world, _ = rl.apply_rules(world, run_script, rl._load_module)
+    return world, (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    p = argparse.ArgumentParser(description="Parallel rule benchmark")
+    p.add_argument("--rules", type=int, default=16)
+    p.add_argument("--work", type=int, default=200000, help="loop iterations per rule")
+    p.add_argument("--repeat", type=int, default=3)
+    args = p.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers = sorted({1, 2, 4, cores})
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "scripts", "rules")
+        os.makedirs(folder)
+        os.makedirs(os.path.join(tmp, "data"))
+        for i in range(args.rules):
+            with open(os.path.join(folder, f"r{i}.py"), "w") as fh:
+                fh.write(RULE.format(i=i, work=args.work))
+        os.chdir(tmp)
+        rl = _rule_loop()
+        config.SELECTIVE_RULES = False
+
+        print(f"{args.rules} rules, {cores} cores, ms per rule loop")
+        config.PARALLEL_RULES = False
+        serial, ms = _loop(rl, rl._run_script, args.rules, args.repeat)
+        print(f"  {'subprocess, serial':<26} {ms:9.1f}")
+        config.PARALLEL_RULES = True
+        for n in workers:
+            config.RULE_WORKERS = n
+            world, ms = _loop(rl, rl._run_script, args.rules, args.repeat)
+            assert world == serial
+            print(f"  {f'subprocess, {n} workers':<26} {ms:9.1f}")
+
+        if hasattr(os, "fork"):
+            from engine.client.worker_pool import WorkerPool
+            for n in workers:
+                config.RULE_WORKERS = n
+                pool = WorkerPool(size=n)
+                world, ms = _loop(rl, pool.run_script, args.rules, args.repeat)
+                pool.close()
+                assert world == serial
+                print(f"  {f'pool, {n} workers':<26} {ms:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
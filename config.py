@@ -18,20 +18,57 @@ CLIENT_MANIFEST     = "client_snapshot.json"
 
 ENGINE_ZIP_NAME     = "engine_snapshot.zip"
 CLIENT_ZIP_NAME     = "client_snapshot.zip"
+SNAPSHOT_META_FILE  = "snapshot_meta.json"   # hashes of both zips, inside SNAPSHOT_DIR
+SNAPSHOT_HASH_FILE  = "snapshot.sha256"      # client: sha of the unpacked snapshot, in data/
 
-HISTORY_FILE        = "history.json"
+HISTORY_FILE        = "history.json"         # legacy single-list history, migrated on start
+HISTORY_DIR         = "history"              # append-only NDJSON segments, inside session
+HISTORY_SEGMENT_SIZE = 10000                 # commands per history segment
 WORLD_FILE          = "world.json"
 INITIAL_WORLD_FILE  = "initial_world.json"
+WORLD_INDENT        = None                   # e.g. 2 to pretty-print world.json while debugging
 
 COMMANDS_LOG_FILE   = "commands.log"
 CURSOR_FILE         = "cursor.seq"
+CURSOR_OFFSET_FILE  = "cursor.offset"        # "<byte offset> <seq>" – where the sequencer resumes reading
+OUTBOX_DIR          = "outbox"               # client: messages for the server, inside data/
+PATCH_JOURNAL_FILE  = "world_patches.ndjson" # client: JSON Patch per command and rule, inside data/
+TIMELINE_DIR        = "timeline"             # client: full worlds every TIMELINE_EVERY seqs, inside data/
+CHECKPOINT_DIR      = "checkpoints"          # server: trusted world checkpoint, inside session
+REPLAYS_DIR         = "replays"              # replay.py reports (final world, hash trail, timings)
+REPLAY_WORKERS      = 0                      # replay-all pool size (0 = one per CPU core)
 
 # ------------- network -------------------------
 SERVER_HOST         = "0.0.0.0"
 SERVER_PORT         = 9000
-BUFFER_SIZE         = 4096
+SERVER_MODE         = "threads"              # "threads" (thread per client) or "asyncio"
+LISTEN_BACKLOG      = 128
+BUFFER_SIZE         = 64 * 1024              # bytes per socket read
+HELLO_TIMEOUT       = 1.0                    # seconds the server waits for a client hello
+SNAPSHOT_CHUNK_SIZE = 64 * 1024              # bytes per binary snapshot frame
+WIRE_CODECS         = ["msgpack", "json"]    # preference order; msgpack needs the msgpack package
+COMPRESS_FRAMES     = True                   # offer zlib frame compression in the hello
+COMPRESS_MIN_BYTES  = 1024                   # smaller frames (live commands) are never compressed
 FRAME_HEADER_BYTES  = 4
 HISTORY_PAGE_SIZE   = 200 
+HISTORY_CACHE_SIZE  = 1000                   # recent commands kept encoded in server memory
+HISTORY_STREAMING   = True                   # client asks for server-push catch-up if offered
+HISTORY_STREAM_WINDOW = 8                    # unacknowledged pages in flight while streaming
+
+# ------------- slow consumers (server) ---------
+SLOW_CONSUMER_POLICY    = "resync"           # "resync", "disconnect" or "buffer"
+OUTBOUND_QUEUE_LIMIT_KB = 1024               # queued bytes that mark a client as slow
+SLOW_CONSUMER_BUFFER_MB = 16                 # "buffer" policy: queue this much, then disconnect
+METRICS_INTERVAL        = 0                  # seconds between queue-depth reports (0 = off)
+
+# ------------- world checkpoints & desync ------
+CHECKPOINT_INTERVAL = 0                      # clients report their world every N seqs (0 = off)
+CHECKPOINT_QUORUM   = 2                      # distinct connections that must report the same hash
+DESYNC_HASH_EVERY   = 0                      # sequencer hashes the world every N seqs for desync checks (0 = off)
+DESYNC_REPORT_EVERY = 10                     # sampled hashes per world_hashes report (sent sooner when idle)
+DESYNC_HASH_CHARS   = 16                     # hex digits of each hash sent to the server
+TIMELINE_EVERY      = 50                     # client keeps a full world every N seqs for rewind (0 = off)
+TIMELINE_KEEP       = 20                     # timeline worlds kept; the journal behind the oldest is dropped
 
 
 # ------------- entry scripts -------------------
@@ -40,6 +77,18 @@ RULE_LOOP_SCRIPT    = "rule_loop.py"
 SERVER_SCRIPT       = "thin_server.py"
 CLIENT_SCRIPT       = "thin_client.py"
 SEQUENCER_SCRIPT    = "sequencer.py"
+EXECUTOR            = "subprocess"           # "subprocess" (interpreter per script), "inprocess" or "pool"
+POOL_SIZE           = 2                      # pre-forked script workers ("pool" executor)
+POOL_MAX_JOBS       = 100                    # scripts a pool worker runs before it is replaced
+WORLD_IN_MEMORY     = False                  # load/save world.json once per command; scripts with run() get the dict
+SELECTIVE_RULES     = False                  # skip rules whose declared READS did not change (writes data/rules_base.json)
+VERIFY_SKIPPED_RULES = False                 # debug: run skippable rules on a copy, warn if they would change the world
+RULES_FIXPOINT      = False                  # re-run rules whose inputs other rules changed until stable
+RULES_MAX_PASSES    = 16                     # fixpoint: passes over the rules before giving up
+PARALLEL_RULES      = False                  # run rules with disjoint READS/WRITES side by side
+RULE_WORKERS        = 0                      # parallel rules: scripts at once (0 = one per CPU core)
+RULE_CONFLICTS      = "serial"               # rule wrote outside its WRITES: "serial" (re-run its wave) or "fail"
+WORLD_PATCHES       = True                   # journal what each command and rule changed (PATCH_JOURNAL_FILE)
 SCRIPTS_DIR         = "scripts"
 DEFAULT_VIEW        = "default"
 
@@ -1,10 +1,10 @@
 # engine/client/client_network.py
 
 import shutil
-import os, json, socket
+import os, json, socket, hashlib, zipfile, threading
 from typing import Any
 import config
-from engine.core import netcodec, utils
+from engine.core import netcodec, timeline, utils, world_store
 from engine.client import sequencer_control      # restart helper
 from engine.core.utils import clear_client_state
 
@@ -18,20 +18,71 @@ def connect(client: dict) -> bool:
         cursor_path = os.path.join(client["data_dir"], config.CURSOR_FILE)
         scripts_dir = os.path.join(client["client_dir"], "scripts")
         
-        # Clear local state using shared utility
-        clear_client_state(commands_path, cursor_path, scripts_dir)
+        # Clear local state using shared utility; scripts stay until the
+        # server says the snapshot changed (see _snapshot_end)
+        clear_client_state(commands_path, cursor_path, scripts_dir, clear_scripts=False)
+        _clear_outbox(client)
 
         # Proceed with connection
         host, port = client["server_host"], client["server_port"]
         print(f"Connecting to server at {host}:{port} …")
         client["socket"].connect((host, port))
         client["_decoder"] = netcodec.NetDecoder()
+        client["_codec"] = netcodec.JSON
+        client["_server_caps"] = []
+        client["_send_lock"] = threading.Lock()
+        client["_pending"] = _handshake(client)
         return True
     except (ConnectionError, OSError) as exc:
         print(f"Connection error: {exc}")
         return False
 
 
+def _client_caps() -> list:
+    caps = ["snapshot_chunks"]
+    if config.COMPRESS_FRAMES:
+        caps.append("zlib")       # we decode compressed frames
+    if config.CHECKPOINT_INTERVAL:
+        caps.append("checkpoints")
+    return caps
+
+
+def _handshake(client: dict) -> list:
+    """
+    Answer the server's hello with our caps and cached snapshot sha.
+
+    Returns whatever else was decoded while waiting; the listener handles
+    those first.  A server that sends no hello gets no reply and falls back
+    to the legacy base64 snapshot.
+    """
+    sock, dec = client["socket"], client["_decoder"]
+    msgs: list = []
+    sock.settimeout(config.HELLO_TIMEOUT)
+    try:
+        while not msgs:
+            msgs = dec.recv_into(sock, config.BUFFER_SIZE)
+            if msgs is None:
+                msgs = []
+                break
+    except socket.timeout:
+        pass
+    finally:
+        sock.settimeout(None)
+
+    if msgs and isinstance(msgs[0], dict) and msgs[0].get("type") == "hello":
+        reply = {
+            "type": "hello",
+            "caps": _client_caps(),
+            "codecs": netcodec.available_codecs(config.WIRE_CODECS),
+            "snapshot_sha256": _cached_snapshot_sha(client),
+        }
+        sock.sendall(netcodec.encode(reply))
+        client["_codec"] = netcodec.choose_codec(msgs[0].get("codecs"), config.WIRE_CODECS)
+        client["_server_caps"] = msgs[0].get("caps", [])
+        return msgs[1:]
+    return msgs
+
+
 def disconnect(client: dict) -> None:
     try:
         client["socket"].close()
@@ -39,10 +90,21 @@ def disconnect(client: dict) -> None:
         pass
 
 
+def _send(client: dict, obj: Any, compress_over: int = None) -> None:
+    """Encode *obj* with the codec negotiated in the hello and send it.
+
+    The listener thread and the command loop both send; the lock keeps a
+    large frame from being interleaved with another.
+    """
+    frame = netcodec.encode(obj, client.get("_codec", netcodec.JSON), compress_over)
+    with client.setdefault("_send_lock", threading.Lock()):
+        client["socket"].sendall(frame)
+
+
 def send_command(client: dict, command_text: str) -> bool:
     try:
         payload = {"username": client["username"], "text": command_text}
-        client["socket"].sendall(netcodec.encode(payload))
+        _send(client, payload)
         return True
     except (socket.error, OSError) as exc:
         print(f"Network error while sending: {exc}")
@@ -86,52 +148,96 @@ HISTORY_PAGE_SIZE = config.HISTORY_PAGE_SIZE
 
 def listen_for_broadcasts(client: dict):
     sock = client["socket"]
-    dec = netcodec.NetDecoder()
+    dec = client.get("_decoder") or netcodec.NetDecoder()
     client["_history_high"] = None
     client["_next_seq_pull"] = 1
+    client["_history_streaming"] = False
 
     try:
+        for msg in client.pop("_pending", None) or []:
+            _handle_message(client, msg)
         while True:
-            chunk = sock.recv(config.BUFFER_SIZE)
-            if not chunk:
+            msgs = dec.recv_into(sock, config.BUFFER_SIZE)
+            if msgs is None:
                 print("\nDisconnected.")
                 break
-            for msg in dec.feed(chunk):
-                if isinstance(msg, dict):
-                    typ = msg.get("type")
-
-                    if typ == "snapshot_zip":
-                        _handle_snapshot_zip(client, msg)
-
-                    elif typ == "initial_world":
-                        # new: write the initial world into data/world.json
-                        dst = os.path.join(client["data_dir"], config.WORLD_FILE)
-                        try:
-                            with open(dst, "w", encoding="utf-8") as f:
-                                json.dump(msg["world"], f, indent=2)
-                            print("Initial world received.")
-                        except Exception as exc:
-                            print("Failed to write initial world:", exc)
-                    # ───────── RESET – blank client and re-seed world ───────
-                    elif typ == "reset":
-                        _handle_reset(client, msg)          # NEW
-
-                    elif typ == "history_meta":
-                        client["_history_high"] = msg["highest_seq"]
-                        _request_history(client)
-
-                    elif typ == "history_page":
-                        for cmd in msg.get("commands", []):
-                            process_command(client, cmd)
-                            client["_next_seq_pull"] = cmd["seq"] + 1
-                        _request_history(client)
-
-                    elif "seq" in msg:
-                        process_command(client, msg)
+            for msg in msgs:
+                _handle_message(client, msg)
 
     except Exception as exc:
         print("Listener error:", exc)
 
+
+def _handle_message(client: dict, msg: Any) -> None:
+    if isinstance(msg, bytes):
+        _snapshot_chunk(client, msg)
+        return
+    if not isinstance(msg, dict):
+        return
+    typ = msg.get("type")
+
+    if typ == "snapshot_begin":
+        _snapshot_begin(client, msg)
+
+    elif typ == "snapshot_end":
+        _snapshot_end(client, msg)
+
+    elif typ == "snapshot_cached":
+        print("Snapshot unchanged – using cached scripts.")
+
+    elif typ == "snapshot_zip":
+        _handle_snapshot_zip(client, msg)
+
+    elif typ == "checkpoint":
+        _handle_checkpoint(client, msg)
+
+    elif typ == "desync":
+        views = ", ".join(f"{'/'.join(who)}={digest}" for digest, who in msg["groups"].items())
+        print(f"\n!!! DESYNC: worlds differ at seq {msg['divergent_seq']} "
+              f"(last agreement at seq {msg['after']}): {views}")
+
+    elif typ == "initial_world":
+        # new: write the initial world into data/world.json
+        dst = os.path.join(client["data_dir"], config.WORLD_FILE)
+        try:
+            world_store.save(msg["world"], dst)
+            print("Initial world received.")
+        except Exception as exc:
+            print("Failed to write initial world:", exc)
+    # ───────── RESET – blank client and re-seed world ───────
+    elif typ == "reset":
+        _handle_reset(client, msg)          # NEW
+
+    elif typ == "history_meta":
+        client["_history_high"] = msg["highest_seq"]
+        if "from" in msg:
+            # server-initiated resync: we were too slow and
+            # missed live commands from this seq onwards
+            client["_next_seq_pull"] = msg["from"]
+            client["_history_streaming"] = False
+        if client["_history_streaming"]:
+            pass  # a stream is already running – it covers this
+        elif config.HISTORY_STREAMING and "history_stream" in msg.get("caps", []):
+            _request_history_stream(client)
+        else:
+            _request_history(client)
+
+    elif typ == "history_page":
+        for cmd in msg.get("commands", []):
+            process_command(client, cmd)
+            client["_next_seq_pull"] = cmd["seq"] + 1
+        if client["_history_streaming"]:
+            _ack_history_page(client)
+        else:
+            _request_history(client)
+
+    elif typ == "history_stream_end":
+        client["_history_streaming"] = False
+        print(f"History caught up to seq {msg.get('highest_seq')}.")
+
+    elif "seq" in msg:
+        process_command(client, msg)
+
 # ---------------------------------------------------------------------------#
 # RESET helper                                                               #
 # ---------------------------------------------------------------------------#
@@ -145,6 +251,8 @@ def _handle_reset(client: dict, msg: dict):
     cursor   = os.path.join(client["data_dir"], config.CURSOR_FILE)
     scripts  = os.path.join(client["client_dir"], "scripts")
     utils.clear_client_state(commands, cursor, scripts)
+    _forget_snapshot(client)
+    _clear_outbox(client)
 
     # 2) drop the running sequencer and spin a new one
     sequencer_control.cleanup(client)
@@ -152,12 +260,12 @@ def _handle_reset(client: dict, msg: dict):
 
     # 3) write new world
     dst = os.path.join(client["data_dir"], config.WORLD_FILE)
-    with open(dst, "w", encoding="utf-8") as fh:
-        json.dump(msg["world"], fh, indent=2)
+    world_store.save(msg["world"], dst)
 
     # 4) reset history-pull helpers
     client["_history_high"]  = None
     client["_next_seq_pull"] = 1
+    client["_history_streaming"] = False
 
     # 5) re-emit INITIAL_COMMAND so per-client init runs on the fresh world
     try:
@@ -173,16 +281,190 @@ def _request_history(client):
     if high is None or nextseq > high:
         return  # done
     packet = {"type": "history_request", "from": nextseq}
-    client["socket"].sendall(netcodec.encode(packet))
+    _send(client, packet)
+
+
+def _request_history_stream(client):
+    """Ask the server to push every missing page; acks keep the window open."""
+    high = client.get("_history_high")
+    nextseq = client.get("_next_seq_pull", 1)
+    if high is None or nextseq > high:
+        return  # nothing to catch up on
+    client["_history_streaming"] = True
+    packet = {
+        "type": "history_stream",
+        "from": nextseq,
+        "window": config.HISTORY_STREAM_WINDOW,
+    }
+    _send(client, packet)
+
+
+def _ack_history_page(client):
+    _send(client, {"type": "history_ack"})
+
+
+# ---------------------------------------------------------------------------#
+# Snapshot download / cache                                                  #
+# ---------------------------------------------------------------------------#
+
+def _snapshot_hash_path(client: dict) -> str:
+    return os.path.join(client["data_dir"], config.SNAPSHOT_HASH_FILE)
+
+
+def _cached_snapshot_sha(client: dict):
+    """sha256 of the snapshot currently unpacked in client_dir, if known."""
+    scripts = os.path.join(client["client_dir"], "scripts")
+    try:
+        if not os.listdir(scripts):
+            return None
+        with open(_snapshot_hash_path(client), "r") as fh:
+            return fh.read().strip() or None
+    except OSError:
+        return None
+
+
+def _forget_snapshot(client: dict) -> None:
+    try:
+        os.remove(_snapshot_hash_path(client))
+    except OSError:
+        pass
+
+
+def _install_snapshot(client: dict, zip_source, sha: str) -> None:
+    """Replace the unpacked scripts with *zip_source* and remember its sha."""
+    _forget_snapshot(client)
+    scripts = os.path.join(client["client_dir"], "scripts")
+    shutil.rmtree(scripts, ignore_errors=True)
+    with zipfile.ZipFile(zip_source, "r") as zf:
+        zf.extractall(client["client_dir"])
+    os.makedirs(scripts, exist_ok=True)
+    with open(_snapshot_hash_path(client), "w") as fh:
+        fh.write(sha)
+
+
+def _snapshot_begin(client: dict, msg: dict):
+    part = _snapshot_hash_path(client) + ".part"
+    client["_snapshot"] = {
+        "path": part,
+        "fh": open(part, "wb"),
+        "sha": hashlib.sha256(),
+    }
+    print(f"Receiving snapshot ({msg.get('size', '?')} bytes) …")
+
+
+def _snapshot_chunk(client: dict, data: bytes):
+    snap = client.get("_snapshot")
+    if snap is None:
+        return  # not inside a snapshot transfer
+    snap["fh"].write(data)
+    snap["sha"].update(data)
+
+
+def _snapshot_end(client: dict, msg: dict):
+    snap = client.pop("_snapshot", None)
+    if snap is None:
+        return
+    snap["fh"].close()
+    try:
+        digest = snap["sha"].hexdigest()
+        if digest != msg.get("sha256"):
+            print(f"Snapshot hash mismatch ({digest[:12]} != {str(msg.get('sha256'))[:12]}) – ignored.")
+            return
+        _install_snapshot(client, snap["path"], digest)
+        print("Snapshot received & unpacked.")
+    except Exception as exc:
+        print(f"Snapshot unpack error: {exc}")
+    finally:
+        try:
+            os.remove(snap["path"])
+        except OSError:
+            pass
 
 
 def _handle_snapshot_zip(client: dict, msg: dict):
-    import base64, zipfile, io, os, shutil, sys
+    """Legacy servers: the whole zip base64-encoded in one frame."""
+    import base64, io
     try:
         data   = base64.b64decode(msg["b64"])
-        buffer = io.BytesIO(data)
-        with zipfile.ZipFile(buffer, "r") as zf:
-            zf.extractall(client["client_dir"])
+        _install_snapshot(client, io.BytesIO(data), hashlib.sha256(data).hexdigest())
         print("Snapshot received & unpacked.")
     except Exception as exc:
-        print(f"Snapshot unpack error: {exc}")
\ No newline at end of file
+        print(f"Snapshot unpack error: {exc}")
+
+
+# ---------------------------------------------------------------------------#
+# World checkpoints                                                          #
+# ---------------------------------------------------------------------------#
+
+def _outbox_dir(client: dict) -> str:
+    return os.path.join(client["data_dir"], config.OUTBOX_DIR)
+
+
+def _clear_outbox(client: dict) -> None:
+    shutil.rmtree(_outbox_dir(client), ignore_errors=True)
+
+
+# outbox message type -> server cap it needs
+OUTBOX_CAPS = {
+    "checkpoint":   "checkpoints",
+    "world_hashes": "world_hashes",
+}
+
+
+def flush_outbox(client: dict) -> None:
+    """Send the reports the sequencer left in data/outbox, oldest first.
+
+    Checkpoints and sampled world hashes; a server without the matching
+    cap would take them for player commands, so there they are dropped.
+    """
+    folder = _outbox_dir(client)
+    try:
+        names = sorted(n for n in os.listdir(folder) if n.endswith(".json"))
+    except OSError:
+        return
+    caps = client.get("_server_caps", [])
+    compress_over = config.COMPRESS_MIN_BYTES if "zlib" in caps else None
+    for name in names:
+        path = os.path.join(folder, name)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                msg = json.load(fh)
+            if OUTBOX_CAPS.get(msg.get("type")) in caps:
+                msg.setdefault("username", client.get("username"))
+                _send(client, msg, compress_over)
+            os.remove(path)
+        except (OSError, ValueError) as exc:
+            print(f"Outbox upload failed: {exc}")
+            return
+
+
+def _handle_checkpoint(client: dict, msg: dict):
+    """Start from the server's trusted checkpoint instead of seq 1.
+
+    Only sent while joining, before any history: the world replaces the
+    initial world, the cursor jumps to the checkpoint's seq and the
+    sequencer is restarted so it picks that cursor up.  The patch journal
+    starts over there too: rewind cannot reach past the checkpoint.
+    """
+    seq = msg.get("seq")
+    if not isinstance(seq, int) or world_store.digest(msg.get("world")) != msg.get("sha256"):
+        print("Checkpoint hash mismatch – replaying from the start.")
+        return
+    running = bool(client.get("sequencer_process"))
+    if running:
+        sequencer_control.cleanup(client)
+
+    timeline.start_at(client["data_dir"], seq)
+    world_store.save(msg["world"], os.path.join(client["data_dir"], config.WORLD_FILE))
+    open(client["commands_path"], "w").close()
+    with open(os.path.join(client["data_dir"], config.CURSOR_FILE), "w") as fh:
+        fh.write(str(seq))
+    try:
+        os.remove(os.path.join(client["data_dir"], config.CURSOR_OFFSET_FILE))
+    except OSError:
+        pass
+
+    if running:
+        sequencer_control.start_sequencer(client)
+    client["_next_seq_pull"] = seq + 1
+    print(f"Checkpoint at seq {seq} installed – replaying from {seq + 1}.")
@@ -0,0 +1,213 @@
+# engine/client/executor.py
+"""
+Command execution engines used by the sequencer.
+
+    subprocess – ``python orchestrator.py <text> <user>`` per command; the
+                 orchestrator spawns the command script and rule_loop.py,
+                 which spawns every rule (the original behaviour).
+    inprocess  – one long-lived worker process per client runs the
+                 orchestrator, the rule loop and every script in-process.
+                 Compiled code objects are cached per file (mtime/size
+                 checked), so a command costs no interpreter start-up.
+    pool       – the same long-lived worker for the orchestrator and rule
+                 loop, but each script runs in a pre-forked child
+                 (engine/client/worker_pool.py) for scripts that are not
+                 safe to share an interpreter.  POSIX only; falls back to
+                 subprocess where ``os.fork`` is missing.
+
+Scripts see the same contract either way: ``sys.argv``, ``PLAYER`` in the
+environment, stdin (rules), stdout/stderr, exit code via ``sys.exit`` and
+cwd = the client directory (so ``data/world.json`` resolves the same).
+What the in-process engine cannot isolate: a script that calls
+``os._exit`` or crashes the interpreter kills the worker (it is restarted
+and that command is reported as failed), and modules a script imports stay
+cached in the worker's ``sys.modules``.
+
+The worker talks to the sequencer over its stdin/stdout using netcodec
+frames: ``{"text", "user", "seq"}`` in, ``{"code", "stdout", "stderr"}`` out.
+"""
+
+import io
+import os
+import subprocess
+import sys
+from typing import Dict, Optional, Tuple
+
+import config
+from engine.core import netcodec
+from engine.client.script_host import ScriptHost
+
+
+# --------------------------------------------------------------------------- #
+# Sequencer side
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _script_env() -> Dict[str, str]:
+    """Environment for the orchestrator: the project root importable, so
+    scripts can use engine.core.world_store."""
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    return env
+
+
+class SubprocessExecutor:
+    """One orchestrator interpreter per command."""
+
+    def __init__(self, client_dir: str, orchestrator: str) -> None:
+        self.client_dir = client_dir
+        self.orchestrator = orchestrator
+
+    def run(self, text: str, user: str, seq: Optional[int] = None) -> Tuple[int, str, str]:
+        flags = ["--world-in-memory"] if config.WORLD_IN_MEMORY else []
+        if seq is not None:
+            flags += ["--seq", str(seq)]
+        result = subprocess.run(
+            [sys.executable, self.orchestrator, text, user, *flags],
+            cwd=self.client_dir,
+            env=_script_env(),
+            capture_output=True,
+            text=True
+        )
+        return result.returncode, result.stdout, result.stderr
+
+    def close(self) -> None:
+        pass
+
+
+class InProcessExecutor:
+    """Forward commands to a long-lived worker (``worker_main``)."""
+
+    scripts = "inprocess"       # where the worker runs the scripts
+
+    def __init__(self, client_dir: str, orchestrator: str) -> None:
+        self.client_dir = client_dir
+        self.orchestrator = orchestrator
+        self.proc: Optional[subprocess.Popen] = None
+        self._decoder = netcodec.NetDecoder()
+
+    def _spawn(self) -> None:
+        # by path, not ``-m``: that would put the client directory first on
+        # sys.path, and its config.py (the session snapshot's, perhaps from
+        # an older engine) would shadow the engine's – as for the orchestrator
+        # the subprocess executor runs, the engine's config is found through
+        # PYTHONPATH
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "engine", "client", "executor.py"),
+             "--worker", self.orchestrator, "--scripts", self.scripts],
+            cwd=self.client_dir,
+            env=_script_env(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self._decoder = netcodec.NetDecoder()
+
+    def run(self, text: str, user: str, seq: Optional[int] = None) -> Tuple[int, str, str]:
+        if self.proc is None or self.proc.poll() is not None:
+            self._spawn()
+        try:
+            self.proc.stdin.write(netcodec.encode({"text": text, "user": user, "seq": seq}))
+            self.proc.stdin.flush()
+            reply = self._read_reply()
+        except (OSError, EOFError) as exc:
+            code = self.proc.poll()
+            self.close()
+            return 1, "", f"!!! executor worker died (exit {code}): {exc}\n"
+        return reply["code"], reply["stdout"], reply["stderr"]
+
+    def _read_reply(self) -> Dict:
+        fd = self.proc.stdout.fileno()
+        while True:
+            chunk = os.read(fd, config.BUFFER_SIZE)
+            if not chunk:
+                raise EOFError("worker closed its pipe")
+            for msg in self._decoder.feed(chunk):
+                return msg
+
+    def close(self) -> None:
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=2)
+        except Exception:
+            self.proc.kill()
+        self.proc = None
+
+
+class PoolExecutor(InProcessExecutor):
+    """Long-lived worker whose scripts run in pre-forked children."""
+
+    scripts = "pool"
+
+
+EXECUTORS = {
+    "subprocess": SubprocessExecutor,
+    "inprocess":  InProcessExecutor,
+    "pool":       PoolExecutor,
+}
+
+
+def make_executor(kind: str, client_dir: str, orchestrator: str):
+    """Build the executor named *kind* (see ``EXECUTORS``)."""
+    if kind == "pool" and not hasattr(os, "fork"):
+        print("Executor 'pool' needs os.fork – using 'subprocess'")
+        kind = "subprocess"
+    try:
+        return EXECUTORS[kind](client_dir, orchestrator)
+    except KeyError:
+        raise ValueError(f"Unknown executor {kind!r}; expected one of {sorted(EXECUTORS)}")
+
+
+# --------------------------------------------------------------------------- #
+# Worker side
+
+def worker_main(orchestrator: str, scripts: str = "inprocess") -> None:
+    """Serve commands from the sequencer until stdin closes."""
+    # Keep the real stdout for replies; anything a script writes to fd 1
+    # behind our back ends up on stderr instead of corrupting the stream.
+    reply = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    sys.stdout = io.TextIOWrapper(os.fdopen(1, "wb", closefd=False), write_through=True)
+
+    host = ScriptHost()
+    pool = None
+    if scripts == "pool":
+        # fork only now, with everything above already imported
+        from engine.client.worker_pool import WorkerPool
+        pool = WorkerPool(close_fds=(reply.fileno(),))
+    elif getattr(config, "PARALLEL_RULES", False):
+        print("PARALLEL_RULES is off with the in-process executor (scripts share "
+              "sys.stdout)", file=sys.stderr)
+    run_script = pool.run_script if pool else host.run_script
+
+    decoder = netcodec.NetDecoder()
+    try:
+        while True:
+            chunk = os.read(0, config.BUFFER_SIZE)
+            if not chunk:
+                return
+            for req in decoder.feed(chunk):
+                code, out, err = host.run_command(orchestrator, req["text"], req["user"],
+                                                  run_script, req.get("seq"))
+                msg = {"code": code, "stdout": out.decode("utf-8", errors="replace"),
+                       "stderr": err.decode("utf-8", errors="replace")}
+                try:
+                    frame = netcodec.encode(msg)
+                except ValueError as exc:   # output too large for one frame
+                    frame = netcodec.encode({"code": 1, "stdout": "", "stderr": f"!!! {exc}\n"})
+                reply.write(frame)
+                reply.flush()
+    finally:
+        if pool:
+            pool.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="JC-CLI executor worker")
+    parser.add_argument("--worker", metavar="ORCHESTRATOR", required=True)
+    parser.add_argument("--scripts", choices=["inprocess", "pool"], default="inprocess")
+    args = parser.parse_args()
+    worker_main(args.worker, args.scripts)
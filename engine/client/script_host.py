@@ -0,0 +1,146 @@
+# engine/client/script_host.py
+"""
+Run JC-CLI scripts inside the current interpreter.
+
+``ScriptHost.run_script`` has the same signature and result as the
+orchestrator's / rule loop's ``_run_script`` (a fresh interpreter per
+script), so either can be handed to ``orchestrator.run`` / ``rule_loop.main``.
+Used by the in-process executor worker and by each pre-forked pool worker.
+"""
+
+import builtins
+import io
+import os
+import sys
+import traceback
+from typing import Dict, Optional, Tuple
+
+import config
+
+
+class ScriptHost:
+    """Runs scripts and helper modules inside this interpreter."""
+
+    def __init__(self) -> None:
+        self._code: Dict[str, Tuple[Tuple[int, int], object]] = {}
+        self._modules: Dict[str, Tuple[Tuple[int, int], dict]] = {}
+
+    def _compiled(self, path: str):
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        hit = self._code.get(path)
+        if hit and hit[0] == key:
+            return hit[1]
+        with open(path, "rb") as fh:
+            code = compile(fh.read(), path, "exec")
+        self._code[path] = (key, code)
+        return code
+
+    def load_module(self, path: str) -> dict:
+        """Namespace of *path* executed once (not as ``__main__``), reloaded on change."""
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        key = (st.st_mtime_ns, st.st_size)
+        hit = self._modules.get(path)
+        if hit and hit[0] == key:
+            return hit[1]
+        name = os.path.splitext(os.path.basename(path))[0]
+        ns = {"__name__": name, "__file__": path, "__builtins__": builtins}
+        exec(self._compiled(path), ns)
+        self._modules[path] = (key, ns)
+        return ns
+
+    def run_script(self, path: str, argv: list, env: Optional[dict] = None,
+                   stdin: Optional[bytes] = None) -> Tuple[int, bytes, bytes]:
+        """In-process twin of orchestrator._run_script."""
+        path = os.path.abspath(path)
+        out, err = io.BytesIO(), io.BytesIO()
+        saved = (sys.argv, sys.stdin, sys.stdout, sys.stderr, sys.path[0], os.getcwd())
+        saved_env = {k: os.environ.get(k) for k in (env or {})}
+
+        sys.argv = [path, *argv]
+        sys.path[0] = os.path.dirname(path)
+        sys.stdin = io.TextIOWrapper(io.BytesIO(stdin or b""), encoding="utf-8")
+        wrappers = (io.TextIOWrapper(out, encoding="utf-8", write_through=True),
+                    io.TextIOWrapper(err, encoding="utf-8", write_through=True))
+        sys.stdout, sys.stderr = wrappers
+        os.environ.update(env or {})
+        code = 0
+        try:
+            exec(self._compiled(path),
+                 {"__name__": "__main__", "__file__": path, "__builtins__": builtins})
+        except SystemExit as exc:
+            code = _exit_code(exc)
+        except BaseException as exc:
+            # same traceback as a standalone run: drop our own exec frame
+            traceback.print_exception(type(exc), exc, exc.__traceback__.tb_next)
+            code = 1
+        finally:
+            # detach, so collecting the wrappers doesn't close out/err
+            for stream in wrappers:
+                try:
+                    stream.flush()
+                    stream.detach()
+                except ValueError:
+                    pass            # the script closed it
+            sys.argv, sys.stdin, sys.stdout, sys.stderr, sys.path[0], cwd = saved
+            os.chdir(cwd)
+            for k, v in saved_env.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+        return code, _value(out), _value(err)
+
+    def run_command(self, orchestrator: str, text: str, user: str,
+                    run_script=None, seq: Optional[int] = None) -> Tuple[int, bytes, bytes]:
+        """
+        orchestrator.run() with the orchestrator and rule loop in-process.
+        Scripts run through *run_script* (default: in-process as well);
+        *seq* is handed on for the patch journal.
+        """
+        run_script = run_script or self.run_script
+        orch = self.load_module(orchestrator)
+
+        def run_rules() -> int:
+            rule_loop = self.load_module(os.path.join(os.getcwd(), config.RULE_LOOP_SCRIPT))
+            if "apply_rules" not in rule_loop:
+                # rule_loop.py of an older session snapshot: main() takes no runner
+                return orch["_run_rule_loop"](run_script)
+            return rule_loop["main"](run_script, self.load_module)
+
+        out, err = io.BytesIO(), io.BytesIO()
+        saved = sys.stdout, sys.stderr
+        wrappers = (io.TextIOWrapper(out, encoding="utf-8", write_through=True),
+                    io.TextIOWrapper(err, encoding="utf-8", write_through=True))
+        sys.stdout, sys.stderr = wrappers
+        try:
+            code = orch["run"](text, user, run_script, run_rules,
+                               config.WORLD_IN_MEMORY, self.load_module, seq)
+        except SystemExit as exc:
+            code = _exit_code(exc)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            for stream in wrappers:
+                try:
+                    stream.flush()
+                    stream.detach()
+                except ValueError:
+                    pass
+            sys.stdout, sys.stderr = saved
+        return code, _value(out), _value(err)
+
+
+def _value(buf: io.BytesIO) -> bytes:
+    return b"" if buf.closed else buf.getvalue()
+
+
+def _exit_code(exc: SystemExit) -> int:
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    print(exc.code, file=sys.stderr)        # sys.exit("message")
+    return 1
@@ -0,0 +1,223 @@
+# engine/client/worker_pool.py
+"""
+Pre-forked script workers – isolation without a cold interpreter per script.
+
+``WorkerPool.run_script`` is a drop-in for the orchestrator's / rule loop's
+``_run_script``: every job runs in a child process forked from the (already
+warmed-up) executor worker, so a misbehaving script can only take down its
+own child.  A child serves at most ``max_jobs`` scripts and is then replaced;
+a child that dies mid-job is reaped, the job is reported like a crashed
+subprocess (negative signal / exit status) and a fresh child is forked.
+
+Needs ``os.fork`` (POSIX).  Job and reply travel over a pipe pair per child
+as netcodec frames: a JSON header plus binary frames for stdin/stdout/stderr.
+Children get /dev/null as stdin and close the fds named in ``close_fds``
+(the executor worker's reply pipe), so they never keep the sequencer's
+pipes open once the worker is gone.
+
+``run_script`` is ``threadsafe``, so the rule loop's PARALLEL_RULES waves
+run on several children at once.  Children are only forked from the main
+thread: forking while another thread holds a lock (stdout, the import
+lock) can leave the child deadlocked.  Called from another thread, a child
+past ``max_jobs`` keeps serving and a dead one is not replaced until the
+next call from the main thread; if none is left, the job runs in a fresh
+interpreter like the subprocess runner.
+"""
+
+import os
+import subprocess
+import sys
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+import config
+from engine.core import netcodec
+from engine.client.script_host import ScriptHost
+
+
+class _Worker:
+    def __init__(self, pid: int, job_fd: int, reply_fd: int) -> None:
+        self.pid = pid
+        self.job_fd = job_fd
+        self.reply_fd = reply_fd
+        self.jobs = 0
+        self.decoder = netcodec.NetDecoder()
+
+
+class WorkerPool:
+    """``size`` forked children, each recycled after ``max_jobs`` scripts."""
+
+    def __init__(self, size: int = config.POOL_SIZE,
+                 max_jobs: int = config.POOL_MAX_JOBS,
+                 close_fds: Iterable[int] = ()) -> None:
+        if not hasattr(os, "fork"):
+            raise RuntimeError("WorkerPool needs os.fork")
+        self.size = max(int(size), 1)
+        self.max_jobs = max(int(max_jobs), 1)
+        self._close_fds = tuple(close_fds)  # parent fds no child may hold
+        self._host = ScriptHost()           # inherited by every child
+        self._cond = threading.Condition()
+        self._all: List[_Worker] = []
+        self._idle: List[_Worker] = []
+        for _ in range(self.size):
+            self._idle.append(self._fork())
+
+    # ------------------------------------------------------------------ #
+    # Parent side
+
+    def run_script(self, path: str, argv: list, env: Optional[dict] = None,
+                   stdin: Optional[bytes] = None) -> Tuple[int, bytes, bytes]:
+        forking = threading.current_thread() is threading.main_thread()
+        if forking:
+            self._top_up()
+        with self._cond:
+            self._cond.wait_for(lambda: self._idle or not self._all)
+            w = self._idle.pop() if self._idle else None
+        if w is None:
+            # every child died while other threads ran jobs: don't fork here
+            return _run_fresh(path, argv, env, stdin)
+        try:
+            result = self._submit(w, path, argv, env, stdin)
+        except (OSError, EOFError) as exc:
+            status = self._reap(w)
+            result = (status, b"", f"!!! pool worker died (exit {status}): {exc}\n".encode())
+            w = self._fork() if forking else None
+        else:
+            w.jobs += 1
+            if w.jobs >= self.max_jobs and forking:
+                self._reap(w)
+                w = self._fork()
+        with self._cond:
+            if w is not None:
+                self._idle.append(w)
+            self._cond.notify_all()         # waiters also watch for an empty pool
+        return result
+
+    run_script.threadsafe = True        # PARALLEL_RULES may call it from several threads
+
+    def _top_up(self) -> None:
+        """Main thread: recycle what other threads left worn out, replace the dead."""
+        with self._cond:
+            worn = [w for w in self._idle if w.jobs >= self.max_jobs]
+            self._idle = [w for w in self._idle if w.jobs < self.max_jobs]
+            missing = self.size - len(self._all) + len(worn)
+        for w in worn:
+            self._reap(w)
+        fresh = [self._fork() for _ in range(missing)]
+        with self._cond:
+            self._idle.extend(fresh)
+
+    def _submit(self, w: _Worker, path, argv, env, stdin) -> Tuple[int, bytes, bytes]:
+        job = netcodec.encode({"path": path, "argv": list(argv), "env": env or {}})
+        _write_all(w.job_fd, job + netcodec.encode_binary(stdin or b""))
+        frames = _read_frames(w.reply_fd, w.decoder, 3)
+        return frames[0]["code"], frames[1], frames[2]
+
+    def _fork(self) -> _Worker:
+        job_r, job_w = os.pipe()
+        reply_r, reply_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:                                    # child
+            code = 0
+            try:
+                os.close(job_w)
+                os.close(reply_r)
+                for other in self._all:                 # don't hold siblings' pipes open
+                    os.close(other.job_fd)
+                    os.close(other.reply_fd)
+                _detach(self._close_fds)                # nor the executor worker's
+                self._serve(job_r, reply_w)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(job_r)
+        os.close(reply_w)
+        w = _Worker(pid, job_w, reply_r)
+        with self._cond:
+            self._all.append(w)
+        return w
+
+    def _reap(self, w: _Worker) -> int:
+        """Close *w*'s pipes and collect its exit status (subprocess-style)."""
+        with self._cond:
+            if w in self._all:
+                self._all.remove(w)
+        for fd in (w.job_fd, w.reply_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        try:
+            _, status = os.waitpid(w.pid, 0)
+        except ChildProcessError:
+            return -1
+        if os.WIFSIGNALED(status):
+            return -os.WTERMSIG(status)
+        return os.WEXITSTATUS(status)
+
+    def close(self) -> None:
+        with self._cond:
+            workers, self._idle = list(self._all), []
+        for w in workers:
+            self._reap(w)       # closing the job pipe makes the child exit
+
+    # ------------------------------------------------------------------ #
+    # Child side
+
+    def _serve(self, job_fd: int, reply_fd: int) -> None:
+        decoder = netcodec.NetDecoder()
+        while True:                         # until the parent closes the job pipe
+            try:
+                header, stdin = _read_frames(job_fd, decoder, 2)
+            except EOFError:
+                return
+            code, out, err = self._host.run_script(
+                header["path"], header["argv"], header["env"], stdin)
+            try:
+                reply = (netcodec.encode({"code": code})
+                         + netcodec.encode_binary(out) + netcodec.encode_binary(err))
+            except ValueError as exc:       # output too large for one frame
+                reply = (netcodec.encode({"code": 1}) + netcodec.encode_binary(b"")
+                         + netcodec.encode_binary(f"!!! {exc}\n".encode()))
+            _write_all(reply_fd, reply)
+
+
+# --------------------------------------------------------------------------- #
+
+def _run_fresh(path: str, argv: list, env: Optional[dict],
+               stdin: Optional[bytes]) -> Tuple[int, bytes, bytes]:
+    """A fresh interpreter for one job, as the subprocess runner does it."""
+    full_env = os.environ.copy()
+    full_env.update(env or {})
+    proc = subprocess.run([sys.executable, path, *argv],
+                          env=full_env, input=stdin, capture_output=True)
+    return proc.returncode, proc.stdout, proc.stderr
+
+
+def _detach(fds: Iterable[int]) -> None:
+    """Child side: stdin from /dev/null and *fds* closed."""
+    null = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null, 0)
+    os.close(null)
+    for fd in fds:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _read_frames(fd: int, decoder: netcodec.NetDecoder, count: int) -> list:
+    frames: list = []
+    while len(frames) < count:
+        chunk = os.read(fd, config.BUFFER_SIZE)
+        if not chunk:
+            raise EOFError("worker pipe closed")
+        frames.extend(decoder.feed(chunk))
+    return frames
@@ -3,10 +3,9 @@
 
 import os
 import sys
-import json
 import shutil
 import config
-from . import utils
+from . import utils, world_store
 
 def join_session(session_name, client_name, server_ip=None):
     """Join a game session as a client, whether local or remote
@@ -39,8 +38,7 @@ def join_session(session_name, client_name, server_ip=None):
     # Initialize empty world file that will be populated from server
     client_world_file = os.path.join(client_data_dir, config.WORLD_FILE)
     try:
-        with open(client_world_file, 'w') as f:
-            json.dump({"counter": 0}, f, indent=2)
+        world_store.save({"counter": 0}, client_world_file)
     except IOError as e:
         print(f"Error creating empty world file: {e}")
         return False
@@ -1,67 +1,265 @@
 #!/usr/bin/env python3
 """
 engine/core/netcodec.py
-Length-prefixed JSON framing helpers for JC-CLI networking.
+Length-prefixed framing helpers for JC-CLI networking.
+
+Header layout (4 bytes, big-endian):
+    bit 31      FLAG_BINARY  – payload is raw bytes (e.g. a snapshot chunk)
+    bit 30      FLAG_MSGPACK – payload is MessagePack instead of JSON
+    bit 29      FLAG_ZLIB    – payload is zlib-compressed (applied last)
+    bit 28      reserved
+    bits 0-27   payload length
+
+Plain JSON frames never set a flag, so they are byte-identical to the
+original protocol.  Flagged frames are only sent to peers that negotiated
+them in the hello handshake.  The codec is marked per frame, so one stream
+can mix JSON frames (e.g. history pages spliced from disk) with the
+connection's negotiated codec.
+
+MessagePack needs the optional ``msgpack`` package; without it only JSON
+is offered and negotiation falls back to it.
+
+Compression is a per-frame decision too: callers pass ``compress_over``
+(the connection's negotiated threshold) and only payloads at least that
+large – and that actually shrink – are sent deflated.
 """
 
 import json
 import struct
-from typing import Any, List
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import msgpack
+except ImportError:          # optional – JSON only
+    msgpack = None
+
+HEADER_LEN   = 4  # 4-byte big-endian unsigned int
+FLAG_BINARY  = 0x80000000
+FLAG_MSGPACK = 0x40000000
+FLAG_ZLIB    = 0x20000000
+CODEC_MASK   = FLAG_MSGPACK
+LENGTH_MASK  = 0x0FFFFFFF
+
+
+# --------------------------------------------------------------------------- #
+# Codecs
+
+class JsonCodec:
+    name = "json"
+    flag = 0
+
+    @staticmethod
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def loads(payload: bytes) -> Any:
+        return json.loads(payload)
+
+
+class MsgpackCodec:
+    name = "msgpack"
+    flag = FLAG_MSGPACK
+
+    @staticmethod
+    def dumps(obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    @staticmethod
+    def loads(payload: bytes) -> Any:
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+JSON = JsonCodec()
+
+CODECS: Dict[str, Any] = {JSON.name: JSON}
+if msgpack is not None:
+    CODECS[MsgpackCodec.name] = MsgpackCodec()
+
+_BY_FLAG = {codec.flag: codec for codec in CODECS.values()}
+
+
+def available_codecs(preference: Iterable[str]) -> List[str]:
+    """The names in *preference* this process can actually encode/decode."""
+    return [name for name in preference if name in CODECS]
+
 
-HEADER_LEN = 4  # 4-byte big-endian unsigned int
+def choose_codec(offered: Iterable[str], preference: Iterable[str]):
+    """First codec in *preference* that the peer *offered*; JSON otherwise."""
+    offered = set(offered or ())
+    for name in available_codecs(preference):
+        if name in offered:
+            return CODECS[name]
+    return JSON
 
 
-def encode(obj: Any) -> bytes:
+# --------------------------------------------------------------------------- #
+# Framing
+
+ZLIB_LEVEL = 6
+
+
+def encode(obj: Any, codec=JSON, compress_over: Optional[int] = None) -> bytes:
     """
-    Serialize *obj* to JSON and prefix it with a 4-byte length header.
+    Serialize *obj* with *codec* (JSON by default) and prefix it with a
+    4-byte header.  See ``frame`` for *compress_over*.
 
     Returns
     -------
     bytes
-        Header + UTF-8 JSON payload.
+        Header + payload.
+    """
+    return frame(codec.dumps(obj), codec.flag, compress_over)
+
+
+def frame(payload: bytes, flags: int = 0, compress_over: Optional[int] = None) -> bytes:
     """
-    payload = json.dumps(obj, separators=(",", ":")).encode("utf-8")
-    header = struct.pack(">I", len(payload))
+    Prefix an already-serialized *payload* (UTF-8 JSON unless *flags* say
+    otherwise) with the header.
+    Lets callers splice stored JSON into a message without re-encoding it.
+
+    With *compress_over* set, payloads of at least that many bytes are
+    zlib-compressed when that makes them smaller.
+
+    Raises ``ValueError`` for a payload longer than ``LENGTH_MASK`` bytes
+    (256 MiB) – its length would spill into the flag bits.  Send such data
+    in chunks, as snapshots are.
+    """
+    if compress_over is not None and len(payload) >= compress_over:
+        packed = zlib.compress(payload, ZLIB_LEVEL)
+        if len(packed) < len(payload):
+            payload, flags = packed, flags | FLAG_ZLIB
+    if len(payload) > LENGTH_MASK:
+        raise ValueError(f"Frame payload of {len(payload)} bytes exceeds "
+                         f"the {LENGTH_MASK}-byte limit")
+    header = struct.pack(">I", flags | len(payload))
     return header + payload
 
 
+def encode_binary(data: bytes) -> bytes:
+    """Frame raw *data* as a binary frame (decoded back as ``bytes``)."""
+    return frame(data, FLAG_BINARY)
+
+
 class NetDecoder:
     """
     Incremental decoder for the same length-prefixed format.
 
+    Bytes live in one growable ``bytearray``; ``_start`` / ``_end`` mark the
+    unparsed region.  Frames are parsed in place (``struct.unpack_from`` and
+    a memoryview slice per payload), consumed bytes are only reclaimed when
+    the tail runs out of room, and ``recv_into`` lets the socket write
+    straight into the free tail.  A large frame therefore costs one
+    allocation sized up front plus one copy for the returned payload,
+    instead of re-copying the whole buffer on every recv.
+
     Usage
     -----
     >>> dec = NetDecoder()
-    >>> for msg in dec.feed(sock.recv(4096)):
-    ...     handle(msg)
+    >>> while (msgs := dec.recv_into(sock)) is not None:
+    ...     for msg in msgs:
+    ...         handle(msg)
     """
 
-    def __init__(self) -> None:
-        self._buf = b""
+    def __init__(self, bufsize: int = 65536) -> None:
+        self._initial = bufsize
+        self._buf = bytearray(bufsize)
+        self._start = 0     # first unparsed byte
+        self._end = 0       # end of received data
+        self._need = 0      # full size of the frame being waited for, if known
+
+    # ------------------------------------------------------------------ #
 
     def feed(self, data: bytes) -> List[Any]:
         """
-        Feed raw bytes from the socket and return all complete JSON
-        objects decoded since the previous call.
+        Feed raw bytes from the socket and return all complete messages
+        decoded since the previous call (each with the codec its header
+        names).  Binary frames are returned as ``bytes``.
+        """
+        n = len(data)
+        self._reserve(n)
+        self._buf[self._end : self._end + n] = data
+        self._end += n
+        return self._parse()
+
+    def recv_into(self, sock, nbytes: int = 0) -> Optional[List[Any]]:
+        """
+        Receive once from *sock* directly into the buffer and return the
+        decoded messages, or None when the peer closed the connection.
+        Socket timeouts/errors propagate unchanged.
         """
-        self._buf += data
+        pending = self._end - self._start
+        want = max(nbytes or self._initial, self._need - pending)
+        self._reserve(want)
+        with memoryview(self._buf)[self._end :] as tail:
+            n = sock.recv_into(tail)
+        if not n:
+            return None
+        self._end += n
+        return self._parse()
+
+    # ------------------------------------------------------------------ #
+
+    def _reserve(self, n: int) -> None:
+        """Make room for *n* more bytes after ``_end``."""
+        if len(self._buf) - self._end >= n:
+            return
+        pending = self._end - self._start
+        if self._start:
+            # compact: move the unparsed tail to the front
+            self._buf[:pending] = self._buf[self._start : self._end]
+            self._start, self._end = 0, pending
+        if len(self._buf) - self._end < n:
+            size = max(len(self._buf) * 2, pending + n)
+            self._buf.extend(bytes(size - len(self._buf)))
+
+    def _parse(self) -> List[Any]:
         out: List[Any] = []
+        buf = self._buf
+
+        with memoryview(buf) as mv:
+            while True:
+                self._need = 0
+                avail = self._end - self._start
+                if avail < HEADER_LEN:
+                    break
+
+                header = struct.unpack_from(">I", buf, self._start)[0]
+                length = header & LENGTH_MASK
+                if avail < HEADER_LEN + length:
+                    self._need = HEADER_LEN + length
+                    break
 
-        while True:
-            if len(self._buf) < HEADER_LEN:
-                break
+                begin = self._start + HEADER_LEN
+                payload = bytes(mv[begin : begin + length])
+                self._start = begin + length
 
-            length = struct.unpack(">I", self._buf[:HEADER_LEN])[0]
-            if len(self._buf) < HEADER_LEN + length:
-                break
+                if header & FLAG_ZLIB:
+                    try:
+                        payload = zlib.decompress(payload)
+                    except Exception:
+                        continue        # corrupt – skip, like a bad payload
 
-            payload = self._buf[HEADER_LEN : HEADER_LEN + length]
-            self._buf = self._buf[HEADER_LEN + length :]
+                if header & FLAG_BINARY:
+                    out.append(payload)
+                    continue
 
-            try:
-                out.append(json.loads(payload.decode("utf-8")))
-            except json.JSONDecodeError:
-                # Skip malformed payloads but keep processing stream
-                continue
+                codec = _BY_FLAG.get(header & CODEC_MASK)
+                if codec is None:
+                    continue            # codec we never offered – skip it
+                try:
+                    out.append(codec.loads(payload))
+                except Exception:
+                    # Skip malformed payloads but keep processing stream
+                    # (JSONDecodeError / UnicodeDecodeError / RecursionError,
+                    # msgpack's TypeError for unhashable keys, bad ext types …)
+                    continue
 
+        if self._start == self._end:
+            # everything consumed – rewind, and give back a buffer that
+            # only grew to hold one oversized frame
+            self._start = self._end = 0
+            if len(self._buf) > 4 * self._initial:
+                self._buf = bytearray(self._initial)
         return out
@@ -0,0 +1,193 @@
+# engine/core/registry.py
+"""
+Script discovery (commands, rules, views) with an on-disk index.
+
+Every ``*.py`` below a scripts folder is described by one index entry,
+keyed by its path relative to that folder:
+
+    data/script_index.json
+        {"version": 3, "folders": {"<abs folder>": {
+            "raise_value.py": {"mtime": …, "size": …, "name": "raise",
+                               "any_name": "raise", "run": false,
+                               "reads": null, "writes": null}, …}}}
+
+``name`` comes from the first non-blank, non-comment line
+(``NAME = "…"``, what the orchestrator and rule loop require), ``any_name``
+from the first line starting with ``NAME`` anywhere (the view manager's
+rule), ``run`` says whether the script defines the in-process
+``run(world, …)`` entry point, and ``reads`` / ``writes`` hold a rule's
+declared ``READS = [...]`` / ``WRITES = [...]`` world paths (None when it
+declares none).
+
+A lookup walks the folder and stats each file; only files whose mtime or
+size changed since they were indexed are opened again.  Files modified
+within the last RACY_NS are re-read on every lookup until they age, so an
+edit that keeps both mtime and size cannot hide.  Long-lived processes
+(the in-process executor) keep the index in memory and write it back
+only when something changed.
+"""
+
+import ast
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+from engine.core import world_store
+
+INDEX_FILE     = "script_index.json"          # inside the client's data/
+INDEX_VERSION  = 3
+RACY_NS        = 2_000_000_000                # younger files are not trusted to the index
+NAME_PATTERN   = re.compile(r'NAME\s*=\s*["\'](.+?)["\']')
+RUN_PATTERN    = re.compile(r'^def\s+run\s*\(\s*world\s*,', re.M)
+READS_PATTERN  = re.compile(r'^READS\s*=\s*(\[.*?\]|\(.*?\))', re.M | re.S)
+WRITES_PATTERN = re.compile(r'^WRITES\s*=\s*(\[.*?\]|\(.*?\))', re.M | re.S)
+
+_memo: Dict[str, dict] = {}                   # index path -> loaded index
+_paths: Dict[str, dict] = {}                  # abs script path -> its entry
+_lock = threading.Lock()
+
+
+def default_index(cwd: Optional[str] = None) -> str:
+    return os.path.join(cwd or os.getcwd(), "data", INDEX_FILE)
+
+
+def _load_index(index_path: str) -> dict:
+    index = _memo.get(index_path)
+    if index is None:
+        try:
+            with open(index_path, "r", encoding="utf-8") as fh:
+                index = json.load(fh)
+            if index.get("version") != INDEX_VERSION:
+                raise ValueError("old index")
+        except (OSError, ValueError, AttributeError):
+            index = {"version": INDEX_VERSION, "folders": {}}
+        _memo[index_path] = index
+    return index
+
+
+def _parse(path: str) -> dict:
+    """Read one script's metadata."""
+    entry = {"name": None, "any_name": None, "run": False, "reads": None, "writes": None}
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as fh:
+            text = fh.read()
+    except OSError:
+        return entry
+    first = True
+    for line in text.splitlines():
+        s = line.strip()
+        if first and s and not s.startswith("#"):
+            first = False
+            m = NAME_PATTERN.match(s)
+            if m:
+                entry["name"] = m.group(1)
+        if entry["any_name"] is None and s.startswith("NAME") and "=" in s:
+            entry["any_name"] = s.split("=", 1)[1].strip().strip("\"'")
+        if not first and entry["any_name"] is not None:
+            break
+    entry["run"] = bool(RUN_PATTERN.search(text))
+    entry["reads"] = _declared(READS_PATTERN, text)
+    entry["writes"] = _declared(WRITES_PATTERN, text)
+    return entry
+
+
+def _declared(pattern, text: str):
+    """A literal list of path strings assigned at module level, else None."""
+    m = pattern.search(text)
+    if not m:
+        return None
+    try:
+        value = ast.literal_eval(m.group(1))
+    except (ValueError, SyntaxError):
+        return None
+    if not all(isinstance(v, str) for v in value):
+        return None
+    return list(value)
+
+
+def _walk(folder: str, prefix: str):
+    """``(relative path, path, stat)`` of every ``*.py`` below *folder*, sorted."""
+    try:
+        entries = sorted(os.scandir(folder), key=lambda e: e.name)
+    except OSError:
+        return
+    for e in entries:
+        try:
+            if e.is_dir():
+                if e.name != "__pycache__":
+                    yield from _walk(e.path, prefix + e.name + "/")
+            elif e.name.endswith(".py"):
+                yield prefix + e.name, e.path, e.stat()
+        except OSError:
+            continue
+
+
+def scan(folder, index_path: Optional[str] = None) -> Dict[str, dict]:
+    """``{relative path: entry}`` for every script under *folder*, kept current."""
+    folder = os.path.abspath(folder)
+    index_path = index_path or default_index()
+    with _lock:
+        index = _load_index(index_path)
+        old = index["folders"].get(folder, {})
+        now = time.time_ns()
+        new: Dict[str, dict] = {}
+        changed = False
+        for rel, path, st in _walk(folder, ""):
+            entry = old.get(rel)
+            if (entry is None or entry.get("racy") or entry["mtime"] != st.st_mtime_ns
+                    or entry["size"] != st.st_size):
+                entry = _parse(path)
+                entry.update(mtime=st.st_mtime_ns, size=st.st_size)
+                if now - st.st_mtime_ns < RACY_NS:
+                    entry["racy"] = True
+                changed = True
+            new[rel] = entry
+            _paths[path] = entry
+        if changed or new.keys() != old.keys():
+            index["folders"][folder] = new
+            # no data/ folder (not a client directory): memory only
+            if os.path.isdir(os.path.dirname(index_path)):
+                try:
+                    world_store.write_text(index_path, json.dumps(index, separators=(",", ":")))
+                except OSError:
+                    pass
+        return new
+
+
+def discover(folder, index_path: Optional[str] = None, any_line: bool = False) -> Dict[str, str]:
+    """
+    ``{NAME: script path}`` for *folder*.  Scripts are taken in sorted path
+    order, so when two share a NAME every client picks the same one.
+    *any_line* accepts ``NAME`` on any line (view scripts).
+    """
+    folder = os.path.abspath(folder)
+    key = "any_name" if any_line else "name"
+    registry: Dict[str, str] = {}
+    for rel, entry in scan(folder, index_path).items():
+        if entry[key]:
+            registry[entry[key]] = os.path.join(folder, *rel.split("/"))
+    return registry
+
+
+def info(path) -> dict:
+    """*path*'s index entry – from the index when it is current, else parsed now."""
+    path = os.path.abspath(path)
+    entry = _paths.get(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return _parse(path)
+    if entry is not None and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size \
+            and not entry.get("racy"):
+        return entry
+    entry = _parse(path)
+    entry.update(mtime=st.st_mtime_ns, size=st.st_size)
+    return entry
+
+
+def has_handler(path) -> bool:
+    """Does *path* define ``run(world, …)``?"""
+    return info(path)["run"]
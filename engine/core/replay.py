@@ -0,0 +1,265 @@
+# engine/core/replay.py
+"""
+Headless replay of a recorded session – no server, client, sockets or watchdog.
+
+The commands are fed straight to an executor (engine/client/executor.py) in
+seq order, exactly as the sequencer would run them, inside a throw-away
+client directory:
+
+    <workdir>/
+        data/world.json     # starts as the session's initial_world.json
+        rule_loop.py        # from the client snapshot (or the project root)
+        config.py
+        scripts/            # the snapshot's scripts, or --scripts
+
+After every seq the world is hashed (``world_store.digest``), giving a trail
+that can be diffed against another replay or a client's checkpoints.
+
+    result = replay_session("sessions/demo")
+    result["final_world"], result["trail"], result["timings"]
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from typing import Callable, Dict, List, Optional
+
+import config
+from engine.core import world_store
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TRAIL_FILE   = "trail.ndjson"        # {"seq", "sha256", "code", "ms"} per command
+SUMMARY_FILE = "summary.json"
+
+
+# --------------------------------------------------------------------------- #
+# Inputs
+
+def read_history(path: str) -> List[dict]:
+    """
+    Ordered commands from *path*: a session's ``history/`` segment folder,
+    one ``.ndjson`` segment, or a legacy ``history.json`` list.
+    """
+    if os.path.isdir(path):
+        lines: List[bytes] = []
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".ndjson"):
+                with open(os.path.join(path, name), "rb") as fh:
+                    lines.extend(fh.read().split(b"\n"))
+        history = [json.loads(ln) for ln in lines if ln.strip()]
+    elif path.endswith(".ndjson"):
+        with open(path, "rb") as fh:
+            history = [json.loads(ln) for ln in fh if ln.strip()]
+    else:
+        with open(path, "r", encoding="utf-8") as fh:
+            history = json.load(fh)
+    return sorted(history, key=lambda c: c["seq"])
+
+
+def session_inputs(session_dir: str) -> Dict[str, Optional[str]]:
+    """Paths of a session's history, initial world, client snapshot and checkpoint."""
+    history = os.path.join(session_dir, config.HISTORY_DIR)
+    legacy = os.path.join(session_dir, config.HISTORY_FILE)
+    if os.path.exists(legacy) and not (os.path.isdir(history) and os.listdir(history)):
+        history = legacy            # never opened by a segment-aware server
+    client_zip = os.path.join(session_dir, config.SNAPSHOT_DIR, config.CLIENT_ZIP_NAME)
+    checkpoint = os.path.join(session_dir, config.CHECKPOINT_DIR, "latest.json")
+    try:
+        with open(os.path.join(session_dir, config.SNAPSHOT_DIR, config.SNAPSHOT_META_FILE)) as fh:
+            client_sha = json.load(fh).get("client_sha256")
+    except (OSError, ValueError):
+        client_sha = None
+    return {
+        "history":    history,
+        "world":      os.path.join(session_dir, config.INITIAL_WORLD_FILE),
+        "client_zip": client_zip if os.path.exists(client_zip) else None,
+        "client_sha256": client_sha,
+        "checkpoint": checkpoint if os.path.exists(checkpoint) else None,
+    }
+
+
+def prepare_workdir(workdir: str, initial_world: dict, client_zip: Optional[str] = None,
+                    scripts: Optional[str] = None) -> None:
+    """Lay out a client directory: snapshot (if any), *scripts* override, world.
+
+    A reused *workdir* loses its old data/ first – rule base, patch journal,
+    timeline and script index from the last run would make this one differ.
+    """
+    shutil.rmtree(os.path.join(workdir, config.DATA_DIR), ignore_errors=True)
+    if client_zip:
+        with zipfile.ZipFile(client_zip, "r") as zf:
+            zf.extractall(workdir)
+    for name in (config.RULE_LOOP_SCRIPT, "config.py"):
+        if not os.path.exists(os.path.join(workdir, name)):
+            shutil.copy(os.path.join(ROOT, name), workdir)
+    target = os.path.join(workdir, config.SCRIPTS_DIR)
+    if scripts or not os.path.isdir(target):
+        shutil.rmtree(target, ignore_errors=True)
+        shutil.copytree(scripts or os.path.join(ROOT, config.SCRIPTS_DIR), target)
+    os.makedirs(os.path.join(workdir, config.DATA_DIR), exist_ok=True)
+    world_store.save(initial_world, os.path.join(workdir, config.DATA_DIR, config.WORLD_FILE))
+
+
+# --------------------------------------------------------------------------- #
+# Replay
+
+def replay(workdir: str, history: List[dict], executor: str = "inprocess",
+           verbose: bool = False, on_step: Optional[Callable[[dict], None]] = None) -> dict:
+    """
+    Run *history* in *workdir* (see ``prepare_workdir``) through *executor*.
+    Returns ``{"final_world", "trail", "timings"}``; *on_step* gets every
+    trail entry as it is produced.
+    """
+    from engine.client.executor import make_executor
+
+    world_path = os.path.join(workdir, config.DATA_DIR, config.WORLD_FILE)
+    ex = make_executor(executor, workdir, os.path.join(ROOT, config.ORCHESTRATOR_SCRIPT))
+    trail: List[dict] = []
+    per_command: Dict[str, Dict[str, float]] = {}
+    started = time.perf_counter()
+    try:
+        for cmd in history:
+            text = cmd["command"]["text"]
+            t0 = time.perf_counter()
+            code, out, err = ex.run(text, cmd["command"]["username"], cmd.get("seq"))
+            ms = (time.perf_counter() - t0) * 1000
+            if verbose:
+                print(f"[Command:{cmd['seq']}] {text}")
+                for stream in (out, err):
+                    if stream:
+                        print(stream, end="" if stream.endswith("\n") else "\n")
+
+            step = {
+                "seq": cmd["seq"],
+                "sha256": world_store.digest(world_store.load(world_path)),
+                "code": code,
+                "ms": round(ms, 3),
+            }
+            trail.append(step)
+            name = text.split(None, 1)[0] if text.strip() else ""
+            stat = per_command.setdefault(name, {"count": 0, "total_ms": 0.0})
+            stat["count"] += 1
+            stat["total_ms"] += ms
+            if on_step:
+                on_step(step)
+    finally:
+        ex.close()
+    total = time.perf_counter() - started
+
+    return {
+        "final_world": world_store.load(world_path),
+        "trail": trail,
+        "timings": _timings(trail, total, per_command, executor),
+    }
+
+
+def _timings(trail: List[dict], total: float, per_command: dict, executor: str) -> dict:
+    ms = sorted(step["ms"] for step in trail)
+
+    def pct(p: float) -> float:
+        return ms[min(int(len(ms) * p), len(ms) - 1)] if ms else 0.0
+
+    return {
+        "executor": executor,
+        "commands": len(trail),
+        "failed": sum(1 for step in trail if step["code"] != 0),
+        "total_s": round(total, 3),
+        "commands_per_s": round(len(trail) / total, 1) if total else 0.0,
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "max_ms": ms[-1] if ms else 0.0,
+        "per_command": {name: {"count": s["count"],
+                               "mean_ms": round(s["total_ms"] / s["count"], 3)}
+                        for name, s in sorted(per_command.items())},
+    }
+
+
+def replay_session(session_dir: Optional[str] = None, history: Optional[str] = None,
+                   world: Optional[str] = None, scripts: Optional[str] = None,
+                   executor: str = "inprocess", workdir: Optional[str] = None,
+                   verbose: bool = False, on_step=None) -> dict:
+    """
+    Replay a session directory, or an explicit *history* + *world* pair
+    (which override the session's own files).  *scripts* replaces the
+    snapshot's scripts/ – e.g. to test a new rule version against an old
+    game.  The result also carries ``"checkpoint"``: the session's trusted
+    checkpoint compared with the trail, when there is one, and ``"source"``:
+    which scripts ran.  *workdir* is used and kept instead of a temporary
+    client directory.
+    """
+    inputs = session_inputs(session_dir) if session_dir else \
+        {"client_zip": None, "client_sha256": None, "checkpoint": None}
+    history_path = history or inputs.get("history")
+    world_path = world or inputs.get("world")
+    if not history_path or not world_path:
+        raise ValueError("need a session directory or both a history and an initial world")
+
+    commands = read_history(history_path)
+    initial_world = world_store.load(world_path)
+
+    tmp = None if workdir else tempfile.mkdtemp(prefix="jc-replay-")
+    try:
+        prepare_workdir(workdir or tmp, initial_world, inputs["client_zip"], scripts)
+        result = replay(workdir or tmp, commands, executor, verbose, on_step)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    result["checkpoint"] = _check_checkpoint(inputs["checkpoint"], result["trail"])
+    result["source"] = {
+        "scripts": os.path.abspath(scripts) if scripts else "snapshot",
+        "client_sha256": inputs["client_sha256"],
+    }
+    return result
+
+
+def _check_checkpoint(path: Optional[str], trail: List[dict]) -> Optional[dict]:
+    if not path:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            cp = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    replayed = next((step["sha256"] for step in trail if step["seq"] == cp["seq"]), None)
+    return {"seq": cp["seq"], "sha256": cp["sha256"], "match": replayed == cp["sha256"]}
+
+
+# --------------------------------------------------------------------------- #
+# Output
+
+def read_trail(out_dir: str) -> List[dict]:
+    """The trail written by ``write_report`` into *out_dir*."""
+    with open(os.path.join(out_dir, TRAIL_FILE), "r", encoding="utf-8") as fh:
+        return [json.loads(ln) for ln in fh if ln.strip()]
+
+
+def first_divergence(trail: List[dict], other: List[dict]) -> Optional[int]:
+    """First seq whose world hash differs between two trails (None if they agree)."""
+    theirs = {step["seq"]: step["sha256"] for step in other}
+    for step in trail:
+        if theirs.get(step["seq"]) != step["sha256"]:
+            return step["seq"]
+    if len(other) > len(trail):
+        return other[len(trail)]["seq"]
+    return None
+
+
+def write_report(out_dir: str, result: dict) -> None:
+    """final world.json, trail.ndjson and summary.json (timings) into *out_dir*."""
+    os.makedirs(out_dir, exist_ok=True)
+    world_store.save(result["final_world"], os.path.join(out_dir, config.WORLD_FILE))
+    with open(os.path.join(out_dir, TRAIL_FILE), "w", encoding="utf-8") as fh:
+        for step in result["trail"]:
+            fh.write(json.dumps(step, separators=(",", ":")) + "\n")
+    summary = dict(result["timings"])
+    summary["final_sha256"] = world_store.digest(result["final_world"])
+    summary["checkpoint"] = result.get("checkpoint")
+    summary["source"] = result.get("source")
+    with open(os.path.join(out_dir, SUMMARY_FILE), "w", encoding="utf-8") as fh:
+        json.dump(summary, fh, indent=2)
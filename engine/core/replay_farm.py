@@ -0,0 +1,161 @@
+# engine/core/replay_farm.py
+"""
+Replay every archived session in parallel – one session per pool worker.
+
+``replay_all`` fans the sessions under ``sessions/`` out to a process pool
+(``REPLAY_WORKERS``, default one per CPU core).  Sessions share nothing, so
+throughput grows with the number of cores until the disk gives out.
+
+With a *scripts* folder each session is also compared with its baseline –
+the same history under the session's own snapshot scripts:
+
+    replays/<session>/          # baseline report (engine/core/replay.py),
+                                # reused while snapshot and history match
+    replays/<session>.candidate/
+    replays/replay-all-<time>.json   # one row per session + totals
+
+Rows report commands/s, failed commands, the baseline and candidate final
+hashes and the first seq where the two diverge; a session that cannot be
+replayed at all is reported with its error instead.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+from typing import List, Optional
+
+import config
+from engine.core import replay, world_store
+
+
+def list_sessions(sessions_dir: str = config.SESSIONS_DIR) -> List[str]:
+    """Session folders (those with an initial world), sorted by name."""
+    try:
+        names = sorted(os.listdir(sessions_dir))
+    except OSError:
+        return []
+    return [os.path.join(sessions_dir, n) for n in names
+            if os.path.exists(os.path.join(sessions_dir, n, config.INITIAL_WORLD_FILE))]
+
+
+def _cached_baseline(report_dir: str, source: dict, last_seq: int) -> Optional[dict]:
+    """A previous snapshot replay of the same history, if still valid."""
+    try:
+        with open(os.path.join(report_dir, replay.SUMMARY_FILE), "r", encoding="utf-8") as fh:
+            summary = json.load(fh)
+        trail = replay.read_trail(report_dir)
+    except (OSError, ValueError):
+        return None
+    if summary.get("source") != source or not trail or trail[-1]["seq"] != last_seq:
+        return None
+    return {"final_sha256": summary["final_sha256"], "trail": trail}
+
+
+def replay_one(session_dir: str, scripts: Optional[str] = None,
+               executor: str = "inprocess", out_root: str = config.REPLAYS_DIR) -> dict:
+    """Replay one session (and its baseline) -> one report row.  Never raises."""
+    name = os.path.basename(os.path.normpath(session_dir))
+    row = {"session": name}
+    try:
+        started = time.perf_counter()
+        result = replay.replay_session(session_dir, scripts=scripts, executor=executor)
+        t = result["timings"]
+        row.update(commands=t["commands"], failed=t["failed"], seconds=t["total_s"],
+                   commands_per_s=t["commands_per_s"],
+                   final_sha256=world_store.digest(result["final_world"]),
+                   checkpoint=result["checkpoint"])
+
+        if not scripts:
+            replay.write_report(os.path.join(out_root, name), result)
+        else:
+            replay.write_report(os.path.join(out_root, name + ".candidate"), result)
+            base_dir = os.path.join(out_root, name)
+            source = dict(result["source"], scripts="snapshot")
+            last = result["trail"][-1]["seq"] if result["trail"] else 0
+            base = _cached_baseline(base_dir, source, last)
+            if base is None:
+                full = replay.replay_session(session_dir, executor=executor)
+                replay.write_report(base_dir, full)
+                base = {"final_sha256": world_store.digest(full["final_world"]),
+                        "trail": full["trail"]}
+            row["baseline_sha256"] = base["final_sha256"]
+            row["first_divergent_seq"] = replay.first_divergence(result["trail"], base["trail"])
+        row["wall_s"] = round(time.perf_counter() - started, 3)
+    except Exception as exc:
+        row["error"] = f"{type(exc).__name__}: {exc}"
+    return row
+
+
+def _job(args) -> dict:
+    return replay_one(*args)
+
+
+def _status(row: dict) -> str:
+    if "error" in row:
+        return f"ERROR {row['error']}"
+    if row.get("first_divergent_seq") is not None:
+        return f"DIVERGES at seq {row['first_divergent_seq']}"
+    if row.get("checkpoint") and not row["checkpoint"]["match"]:
+        return f"checkpoint MISMATCH at seq {row['checkpoint']['seq']}"
+    return "ok"
+
+
+def replay_all(sessions_dir: str = config.SESSIONS_DIR, scripts: Optional[str] = None,
+               workers: int = config.REPLAY_WORKERS, executor: str = "inprocess",
+               out_root: str = config.REPLAYS_DIR) -> Optional[dict]:
+    """
+    Replay every session in *sessions_dir*, printing one line per finished
+    session, and write the aggregate report.  Returns the report.
+    """
+    sessions = list_sessions(sessions_dir)
+    if not sessions:
+        print(f"No sessions found in {sessions_dir}")
+        return None
+    if scripts and not os.path.isdir(scripts):
+        print(f"Scripts folder not found: {scripts}")
+        return None
+
+    workers = min(workers or os.cpu_count() or 1, len(sessions))
+    against = f" against {scripts}" if scripts else ""
+    print(f"Replaying {len(sessions)} sessions{against} on {workers} workers …")
+
+    rows: List[dict] = []
+    started = time.perf_counter()
+    jobs = [(s, scripts, executor, out_root) for s in sessions]
+    with multiprocessing.Pool(workers) as pool:
+        for row in pool.imap_unordered(_job, jobs):
+            rows.append(row)
+            rate = f"{row['commands']:>7} cmds {row['commands_per_s']:>9} cmd/s" \
+                if "commands" in row else ""
+            print(f"[{len(rows)}/{len(sessions)}] {row['session']:<24} {rate}  {_status(row)}")
+    wall = time.perf_counter() - started
+
+    rows.sort(key=lambda r: r["session"])
+    commands = sum(r.get("commands", 0) for r in rows)
+    report = {
+        "scripts": os.path.abspath(scripts) if scripts else "snapshot",
+        "executor": executor,
+        "workers": workers,
+        "sessions": len(rows),
+        "commands": commands,
+        "wall_s": round(wall, 3),
+        "commands_per_s": round(commands / wall, 1) if wall else 0.0,
+        "errors": [r["session"] for r in rows if "error" in r],
+        "diverged": [r["session"] for r in rows if r.get("first_divergent_seq") is not None],
+        "checkpoint_mismatches": [r["session"] for r in rows
+                                  if r.get("checkpoint") and not r["checkpoint"]["match"]],
+        "failed_commands": sum(r.get("failed", 0) for r in rows),
+        "rows": rows,
+    }
+    os.makedirs(out_root, exist_ok=True)
+    path = os.path.join(out_root, time.strftime("replay-all-%Y%m%d-%H%M%S.json"))
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+
+    print(f"{len(rows)} sessions, {commands} commands in {report['wall_s']} s "
+          f"({report['commands_per_s']} cmd/s overall): {len(report['diverged'])} diverged, "
+          f"{len(report['checkpoint_mismatches'])} checkpoint mismatches, "
+          f"{len(report['errors'])} errors")
+    print(f"Report written to {path}")
+    return report
@@ -32,7 +32,7 @@ def _create_snapshots(template_dir: str, session_dir: str) -> bool:
         "client_zip": os.path.basename(cli_zip),
         "client_sha256": cli_hash,
     }
-    with open(os.path.join(snap_dir, "snapshot_meta.json"), "w") as fh:
+    with open(os.path.join(snap_dir, config.SNAPSHOT_META_FILE), "w") as fh:
         json.dump(manifest, fh, indent=2)
     return True
 
@@ -52,8 +52,7 @@ def start_session(session_name, template_name=config.DEFAULT_TEMPLATE):
     os.makedirs(session_dir, exist_ok=True)
     os.makedirs(os.path.join(session_dir, config.CLIENT_DIR), exist_ok=True)
     shutil.copy2(init_world, os.path.join(session_dir, config.INITIAL_WORLD_FILE))
-    with open(os.path.join(session_dir, config.HISTORY_FILE), "w") as fh:
-        json.dump([], fh)
+    os.makedirs(os.path.join(session_dir, config.HISTORY_DIR), exist_ok=True)
 
     if not _create_snapshots(template_dir, session_dir):
         return False
@@ -0,0 +1,245 @@
+# engine/core/timeline.py
+"""
+Client-local time travel over the patch journal.
+
+Every journal line (engine/core/world_patch.py) carries the step's
+``patch`` and its ``undo``, so the world one seq earlier is the current
+one with that seq's ``undo``s applied in reverse order, and one seq later
+is its ``patch``es applied in order – the cost of a step is what that seq
+changed, not the size of the world or of the history.  Nothing is
+re-executed.
+
+To keep the journal bounded the sequencer stores the full world every
+TIMELINE_EVERY seqs and keeps the newest TIMELINE_KEEP of them; the
+journal behind the oldest one is dropped (``checkpoint``):
+
+    data/timeline/00000150.json     # world after seq 150
+    data/timeline/horizon           # earliest seq still reachable
+
+The horizon also marks where the journal began: when a client joins from
+a server checkpoint (``start_at``) or WORLD_PATCHES is turned on late
+(``prepare``), there is nothing to undo before that seq.  Without a horizon
+file nothing before the cursor is trusted.
+
+``Timeline.goto(seq)`` starts from whatever is closest – where it already
+is, the live world or a stored one – and walks the journal from there.
+Nothing here touches data/world.json or the sequencer: the rewound world
+is a private copy (the view manager's ``rewind`` / ``forward`` / ``live``).
+"""
+
+import copy
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import config
+from engine.core import world_patch, world_store
+
+HORIZON_FILE = "horizon"
+
+
+class TimelineError(Exception):
+    """The requested seq cannot be reconstructed."""
+
+
+def _dir(data_dir: str) -> str:
+    return os.path.join(data_dir, config.TIMELINE_DIR)
+
+
+def _path(data_dir: str, seq: int) -> str:
+    return os.path.join(_dir(data_dir), f"{seq:08d}.json")
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def checkpoints(data_dir: str) -> List[int]:
+    """Seqs with a stored world, ascending."""
+    try:
+        names = os.listdir(_dir(data_dir))
+    except OSError:
+        return []
+    return sorted(int(n[:-5]) for n in names if n.endswith(".json") and n[:-5].isdigit())
+
+
+def horizon(data_dir: str) -> Optional[int]:
+    """Earliest seq the journal reaches back to (None: unknown)."""
+    try:
+        with open(os.path.join(_dir(data_dir), HORIZON_FILE), "r", encoding="utf-8") as fh:
+            return int(fh.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _set_horizon(data_dir: str, seq: int) -> None:
+    os.makedirs(_dir(data_dir), exist_ok=True)
+    world_store.write_text(os.path.join(_dir(data_dir), HORIZON_FILE), str(seq))
+
+
+def checkpoint(data_dir: str, seq: int, world_file: str, keep: int) -> None:
+    """Store the world after *seq*; keep *keep* of them and the journal after the oldest."""
+    os.makedirs(_dir(data_dir), exist_ok=True)
+    with open(world_file, "r", encoding="utf-8") as fh:
+        world_store.write_text(_path(data_dir, seq), fh.read())
+
+    seqs = checkpoints(data_dir)
+    if keep > 0 and len(seqs) > keep:
+        for old in seqs[:-keep]:
+            _remove(_path(data_dir, old))
+        oldest = seqs[-keep]
+        # horizon first: a reader never trusts entries that are gone
+        _set_horizon(data_dir, max(oldest, horizon(data_dir) or 0))
+        world_patch.drop_before(os.path.join(data_dir, config.PATCH_JOURNAL_FILE), oldest)
+
+
+def trim(data_dir: str, seq: int) -> None:
+    """Forget everything after *seq* (the cursor went back: reset, reconnect)."""
+    world_patch.trim(os.path.join(data_dir, config.PATCH_JOURNAL_FILE), seq)
+    for s in checkpoints(data_dir):
+        if s > seq:
+            _remove(_path(data_dir, s))
+    if (horizon(data_dir) or 0) > seq:
+        _remove(os.path.join(_dir(data_dir), HORIZON_FILE))
+
+
+def start_at(data_dir: str, seq: int) -> None:
+    """The journal starts over at *seq* (the world came from elsewhere)."""
+    _set_horizon(data_dir, seq)         # first: nothing older is trusted
+    _remove(os.path.join(data_dir, config.PATCH_JOURNAL_FILE))
+    for s in checkpoints(data_dir):
+        _remove(_path(data_dir, s))
+
+
+def prepare(data_dir: str, cursor: int, journaled: bool) -> None:
+    """Sequencer start: match the timeline to *cursor*.
+
+    Steps past the cursor belong to a world that was reset or replaced.
+    Without *journaled* (WORLD_PATCHES off) seqs go by unrecorded, so the
+    horizon is dropped; the journal then starts at the cursor once they are
+    recorded again.
+    """
+    trim(data_dir, cursor)
+    if not journaled:
+        _remove(os.path.join(_dir(data_dir), HORIZON_FILE))
+    elif horizon(data_dir) is None:
+        start_at(data_dir, cursor)
+
+
+def _read_int(path: str) -> int:
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return int(fh.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+class Timeline:
+    """A private copy of the world that can be moved to any reachable seq."""
+
+    def __init__(self, data_dir: str) -> None:
+        self.data_dir = str(data_dir)
+        self.journal = os.path.join(self.data_dir, config.PATCH_JOURNAL_FILE)
+        self.cursor_file = os.path.join(self.data_dir, config.CURSOR_FILE)
+        self.world_file = os.path.join(self.data_dir, config.WORLD_FILE)
+        self.seq: Optional[int] = None      # None: following the live world
+        self.world: Optional[dict] = None
+        self._steps: Dict[int, List[dict]] = {}
+        self._key = None                    # journal stat when _steps was read
+
+    # ------------------------------------------------------------------ #
+
+    def _load_steps(self) -> None:
+        """Journal lines by seq, re-read only when the file changed."""
+        try:
+            st = os.stat(self.journal)
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            key = None
+        if key == self._key:
+            return
+        steps: Dict[int, List[dict]] = {}
+        for entry in world_patch.read(self.journal):
+            steps.setdefault(entry["seq"], []).append(entry)
+        self._steps, self._key = steps, key
+
+    def live(self) -> Tuple[int, dict]:
+        """``(cursor, world)`` of the live client, both from the same seq."""
+        for _ in range(50):
+            cursor, stamp = _read_int(self.cursor_file), _mtime(self.cursor_file)
+            # a world written after the cursor belongs to a command in progress
+            if not stamp or _mtime(self.world_file) <= stamp:
+                world = world_store.load(self.world_file)
+                if _read_int(self.cursor_file) == cursor:
+                    return cursor, world
+            time.sleep(0.02)
+        raise TimelineError("The world is busy – try again")
+
+    def changes(self, seq: int) -> List[dict]:
+        """The journal lines of *seq*: what the command and each rule did."""
+        self._load_steps()
+        return list(self._steps.get(seq, []))
+
+    # ------------------------------------------------------------------ #
+
+    def _horizon(self, cursor: int) -> int:
+        low = horizon(self.data_dir)
+        return cursor if low is None else low
+
+    def goto(self, target: int) -> dict:
+        """The world right after seq *target* (0: before the first command)."""
+        cursor, live_world = self.live()
+        self._load_steps()              # after the cursor: has every line up to it
+        low = self._horizon(cursor)
+        if not low <= target <= cursor:
+            raise TimelineError(f"Seq {target} is outside the timeline ({low}-{cursor})")
+
+        # closest start: the live world, where we are, or a stored world
+        starts = [(cursor, "live")]
+        if self.seq is not None and low <= self.seq <= cursor:
+            starts.append((self.seq, "here"))
+        starts += [(s, "stored") for s in checkpoints(self.data_dir) if low <= s <= cursor]
+        seq, kind = min(starts, key=lambda s: abs(s[0] - target))
+        if kind == "live":
+            world = live_world
+        elif kind == "here":
+            world = copy.deepcopy(self.world)
+        else:
+            world = world_store.load(_path(self.data_dir, seq))
+
+        while seq > target:
+            for entry in reversed(self._steps.get(seq, [])):
+                if "undo" not in entry:
+                    raise TimelineError(f"Seq {seq} was journaled without undo")
+                world = world_patch.apply(world, entry["undo"])
+            seq -= 1
+        while seq < target:
+            seq += 1
+            world = world_patch.world_at(world, self._steps.get(seq, []))
+
+        self.seq, self.world = target, world
+        return world
+
+    def back(self, steps: int = 1) -> dict:
+        cursor = self.live()[0]
+        start = self.seq if self.seq is not None else cursor
+        return self.goto(max(start - steps, self._horizon(cursor)))
+
+    def forward(self, steps: int = 1) -> dict:
+        if self.seq is None:
+            raise TimelineError("Already at the live world")
+        return self.goto(min(self.seq + steps, self.live()[0]))
+
+    def release(self) -> None:
+        """Follow the live world again."""
+        self.seq = self.world = None
@@ -116,10 +116,11 @@ def launch_in_new_terminal(cmd, title: str | None = None) -> bool:
         return False
 # ──────────────────────────────────────────────────────────────────────────────
 
-def clear_client_state(commands_path: str, cursor_path: str, scripts_dir: str) -> None:
+def clear_client_state(commands_path: str, cursor_path: str, scripts_dir: str,
+                       clear_scripts: bool = True) -> None:
     """
     Clear the client’s command log, reset the cursor file to zero,
-    and wipe & recreate the scripts directory.
+    and (unless *clear_scripts* is False) wipe & recreate the scripts directory.
     """
     # Clear commands log file
     open(commands_path, "w").close()
@@ -131,7 +132,7 @@ def clear_client_state(commands_path: str, cursor_path: str, scripts_dir: str) -
     print("Cursor sequence reset to 0")
 
     # Clear scripts directory if it exists
-    if os.path.exists(scripts_dir):
+    if clear_scripts and os.path.exists(scripts_dir):
         print(f"Clearing scripts directory: {scripts_dir}")
         shutil.rmtree(scripts_dir)
     os.makedirs(scripts_dir, exist_ok=True)
\ No newline at end of file
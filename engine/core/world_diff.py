@@ -0,0 +1,115 @@
+# engine/core/world_diff.py
+"""
+Which parts of the world changed – used to skip rules whose inputs didn't.
+
+Paths are dotted keys into the world's nested dicts (``"players.alice.hp"``).
+Lists and scalars are leaves: a change anywhere inside a list reports the
+list's own path.  Rules declare what they read the same way, with ``*``
+matching any single key:
+
+    NAME   = "regen"
+    READS  = ["players.*.hp", "turn"]
+    WRITES = ["players.*.hp"]
+
+``within`` and ``merge`` let the rule loop check independently computed
+rule results against their WRITES and combine them.
+"""
+
+import json
+from typing import Iterable, Set, Tuple
+
+Key = Tuple[str, ...]           # a path as its keys, exact even for keys with dots
+
+
+def same(a, b) -> bool:
+    """Equal as JSON – unlike ``==``, ``1``, ``1.0`` and ``True`` differ."""
+    if a is b:
+        return True
+    if type(a) is not type(b) or a != b:
+        return False
+    if isinstance(a, (dict, list)):
+        # == matched, but may have matched 1 against True somewhere inside
+        try:
+            return json.dumps(a, sort_keys=True) == json.dumps(b, sort_keys=True)
+        except (TypeError, ValueError):
+            if isinstance(a, dict):
+                return all(same(v, b[k]) for k, v in a.items())
+            return all(same(x, y) for x, y in zip(a, b))
+    return True
+
+
+def changed_keys(old, new, prefix: Key = ()) -> Set[Key]:
+    """Key paths whose values differ between *old* and *new* (``()`` = the root)."""
+    if same(old, new):
+        return set()
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        return {prefix}
+    out: Set[Key] = set()
+    for key in old.keys() | new.keys():
+        path = prefix + (key,)
+        if key not in new:
+            out.add(path)
+        elif key not in old:
+            # a new dict is reported by its contents, so rules that each add
+            # one key below a parent they create don't all "change" the parent
+            fresh = new[key]
+            added = changed_keys({}, fresh, path) if isinstance(fresh, dict) else None
+            out |= added or {path}
+        else:
+            out |= changed_keys(old[key], new[key], path)
+    return out
+
+
+def dotted(key: Key) -> str:
+    return ".".join(str(k) for k in key)
+
+
+def changed_paths(old, new) -> Set[str]:
+    """Dotted paths whose values differ between *old* and *new* ("" = the root)."""
+    return {dotted(k) for k in changed_keys(old, new)}
+
+
+def _related(a: str, b: str) -> bool:
+    """Is one path a prefix of the other (segment-wise, ``*`` matching any key)?"""
+    if a == "" or b == "":
+        return True
+    for x, y in zip(a.split("."), b.split(".")):
+        if x != y and x != "*" and y != "*":
+            return False
+    return True
+
+
+def affects(changed: Iterable[str], reads: Iterable[str]) -> bool:
+    """Does any changed path touch a declared read path (parent, child or equal)?"""
+    reads = list(reads)
+    return any(_related(c, r) for c in changed for r in reads)
+
+
+def _covers(declared: str, path: str) -> bool:
+    """Is *path* at or below *declared* (``*`` matching any key)?"""
+    if declared == "":
+        return True
+    d, p = declared.split("."), path.split(".")
+    return len(d) <= len(p) and all(x == y or x == "*" for x, y in zip(d, p))
+
+
+def within(changed: Iterable[str], declared: Iterable[str]) -> bool:
+    """Is every changed path at or below some declared path?"""
+    declared = list(declared)
+    return all(any(_covers(d, c) for d in declared) for c in changed)
+
+
+def merge(target: dict, source: dict, keys: Iterable[Key]) -> None:
+    """Copy the values at *keys* from *source* into *target* (absent = delete)."""
+    for key in keys:
+        if not key:
+            target.clear()
+            target.update(source)
+            continue
+        dst, src = target, source
+        for k in key[:-1]:
+            dst, src = dst.setdefault(k, {}), src[k]
+        if key[-1] in src:
+            dst[key[-1]] = src[key[-1]]
+        else:
+            dst.pop(key[-1], None)
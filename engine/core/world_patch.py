@@ -0,0 +1,258 @@
+# engine/core/world_patch.py
+"""
+World changes as JSON Patch (RFC 6902) and the client's patch journal.
+
+``diff(old, new)`` gives the operations that turn *old* into *new* –
+``add`` / ``remove`` / ``replace`` on JSON Pointer (RFC 6901) paths, down
+to the value that changed.  Lists are compared index by index; elements
+appended or dropped at the end become ``add`` / ``remove`` ops, anything
+else inside stays a per-index change.  ``apply`` understands all six
+operations, so patches from other tools work too.
+
+The orchestrator and the rule loop append what each step changed to
+``data/world_patches.ndjson``, one line per step that changed something:
+
+    {"seq": 12, "step": "command", "name": "raise", "patch": [...], "undo": [...]}
+    {"seq": 12, "step": "rule", "name": "trim_counter", "patch": [...], "undo": [...]}
+
+Applying a seq's ``patch``es in order to the world before it gives the
+world after it; its ``undo``s in reverse order go back (engine/core/
+timeline.py).  The journal is append-only; the sequencer trims it back to
+its cursor when it starts (reset, reconnect) and drops what lies behind
+its oldest timeline checkpoint.
+"""
+
+import copy
+import json
+import os
+from typing import Iterator, List
+
+from engine.core import world_diff, world_store
+
+
+class PatchError(ValueError):
+    """A patch operation does not fit the document."""
+
+
+# --------------------------------------------------------------------------- #
+# JSON Pointer
+
+def _escape(key) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _tokens(pointer: str) -> List[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"Invalid list index: {token!r}")
+    i = int(token)
+    if i > len(container) or (i == len(container) and not allow_end):
+        raise PatchError(f"List index out of range: {i}")
+    return i
+
+
+def _parent(doc, tokens: List[str]):
+    node = doc
+    for t in tokens[:-1]:
+        try:
+            node = node[_index(node, t)] if isinstance(node, list) else node[t]
+        except (KeyError, TypeError):
+            raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+    if not isinstance(node, (dict, list)):
+        raise PatchError(f"Path not found: /{'/'.join(tokens)}")
+    return node
+
+
+def _get(doc, pointer: str):
+    tokens = _tokens(pointer)
+    if not tokens:
+        return doc
+    node = _parent(doc, tokens)
+    try:
+        return node[_index(node, tokens[-1])] if isinstance(node, list) else node[tokens[-1]]
+    except KeyError:
+        raise PatchError(f"Path not found: {pointer}")
+
+
+# --------------------------------------------------------------------------- #
+# diff / apply
+
+def diff(old, new, path: str = "") -> List[dict]:
+    """RFC 6902 operations turning *old* into *new* (``[]`` when equal)."""
+    if world_diff.same(old, new):
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: List[dict] = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            sub = f"{path}/{_escape(key)}"
+            if key not in old:
+                ops.append({"op": "add", "path": sub, "value": value})
+            else:
+                ops.extend(diff(old[key], value, sub))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        ops = []
+        common = min(len(old), len(new))
+        for i in range(common):
+            ops.extend(diff(old[i], new[i], f"{path}/{i}"))
+        for i in range(len(old) - 1, common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+        for i in range(common, len(new)):
+            ops.append({"op": "add", "path": f"{path}/{i}", "value": new[i]})
+        return ops
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def apply(doc, patch: List[dict]):
+    """*doc* with *patch* applied (changed in place; the root may be replaced)."""
+    for op in patch:
+        kind, pointer = op.get("op"), op.get("path")
+        if kind in ("move", "copy"):
+            value = _get(doc, op["from"])
+            if kind == "move":
+                if pointer.startswith(op["from"] + "/"):
+                    raise PatchError(f"Cannot move {op['from']} into itself")
+                doc = _remove(doc, op["from"])
+            else:
+                value = copy.deepcopy(value)
+            doc = _add(doc, pointer, value)
+        elif kind == "add":
+            doc = _add(doc, pointer, copy.deepcopy(op["value"]))
+        elif kind == "remove":
+            doc = _remove(doc, pointer)
+        elif kind == "replace":
+            _get(doc, pointer)                  # must exist
+            doc = _replace(doc, pointer, copy.deepcopy(op["value"]))
+        elif kind == "test":
+            if _get(doc, pointer) != op["value"]:
+                raise PatchError(f"Test failed at {pointer}")
+        else:
+            raise PatchError(f"Unknown patch operation: {kind!r}")
+    return doc
+
+
+def _add(doc, pointer: str, value):
+    tokens = _tokens(pointer)
+    if not tokens:
+        return value
+    node = _parent(doc, tokens)
+    if isinstance(node, list):
+        node.insert(_index(node, tokens[-1], allow_end=True), value)
+    else:
+        node[tokens[-1]] = value
+    return doc
+
+
+def _remove(doc, pointer: str):
+    tokens = _tokens(pointer)
+    if not tokens:
+        raise PatchError("Cannot remove the root")
+    node = _parent(doc, tokens)
+    try:
+        if isinstance(node, list):
+            del node[_index(node, tokens[-1])]
+        else:
+            del node[tokens[-1]]
+    except KeyError:
+        raise PatchError(f"Path not found: {pointer}")
+    return doc
+
+
+def _replace(doc, pointer: str, value):
+    tokens = _tokens(pointer)
+    if not tokens:
+        return value
+    node = _parent(doc, tokens)
+    if isinstance(node, list):
+        node[_index(node, tokens[-1])] = value
+    else:
+        node[tokens[-1]] = value
+    return doc
+
+
+# --------------------------------------------------------------------------- #
+# Journal
+
+def append(path: str, entries: List[dict]) -> None:
+    """Append journal *entries* (one JSON line each) in a single write."""
+    if not entries:
+        return
+    data = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries)
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(data)
+
+
+def read(path: str, since: int = 0) -> Iterator[dict]:
+    """Journal entries with a seq after *since*, in file order."""
+    try:
+        fh = open(path, "r", encoding="utf-8")
+    except OSError:
+        return
+    with fh:
+        for line in fh:
+            if not line.endswith("\n"):
+                break                           # a step still being written
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            seq = entry.get("seq")
+            if isinstance(seq, int) and seq > since:
+                yield entry
+
+
+def trim(path: str, seq: int) -> None:
+    """Drop the entries after *seq* (the cursor went back: reset, reconnect)."""
+    if seq <= 0:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            lines = fh.readlines()
+    except OSError:
+        return
+    keep = [line for line in lines if line.endswith("\n") and _seq(line) <= seq]
+    if len(keep) != len(lines):
+        world_store.write_text(path, "".join(keep))
+
+
+def drop_before(path: str, seq: int) -> None:
+    """Drop the entries up to and including *seq* (a checkpoint covers them)."""
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            lines = fh.readlines()
+    except OSError:
+        return
+    keep = [line for line in lines if _seq(line) > seq or not line.endswith("\n")]
+    if len(keep) != len(lines):
+        world_store.write_text(path, "".join(keep))
+
+
+def _seq(line: str) -> int:
+    try:
+        seq = json.loads(line).get("seq")
+    except ValueError:
+        return 0
+    return seq if isinstance(seq, int) else 0
+
+
+def world_at(world: dict, entries: List[dict]) -> dict:
+    """*world* after the journal *entries*, applied in order."""
+    for entry in entries:
+        world = apply(world, entry["patch"])
+    return world
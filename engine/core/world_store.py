@@ -0,0 +1,97 @@
+# engine/core/world_store.py
+"""
+Read and write ``data/world.json`` safely.
+
+``save`` writes to a temp file in the same folder and renames it over the
+world file, so readers (view.py, the next command) never see a half-written
+world and a crash mid-write leaves the previous state intact.  Output is
+compact unless ``config.WORLD_INDENT`` is set (for debugging), and a world
+identical to what is already on disk is not written at all, which also
+spares the file watchers a redraw.
+
+Command scripts run with cwd = the client directory, so the default path
+works for them too:
+
+    from engine.core import world_store
+    world = world_store.load()
+    ...
+    world_store.save(world)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import config
+
+WORLD_PATH = os.path.join(config.DATA_DIR, config.WORLD_FILE)
+
+
+def dumps(world, indent=None) -> str:
+    """Serialise *world*: compact, or indented by *indent* / WORLD_INDENT."""
+    indent = config.WORLD_INDENT if indent is None else indent
+    if indent:
+        return json.dumps(world, indent=indent)
+    return json.dumps(world, separators=(",", ":"))
+
+
+def canonical(world) -> bytes:
+    """Key-sorted compact JSON: the same world gives the same bytes everywhere."""
+    return json.dumps(world, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def digest(world) -> str:
+    """sha256 of ``canonical(world)`` – compared across clients (checkpoints)."""
+    return hashlib.sha256(canonical(world)).hexdigest()
+
+
+def load(path=WORLD_PATH) -> dict:
+    """Return the world stored at *path* (raises like ``json.load``)."""
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save(world, path=WORLD_PATH, indent=None) -> bool:
+    """Atomically write *world* to *path*; False if it was already up to date."""
+    text = dumps(world, indent)
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            if fh.read() == text:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    write_text(path, text)
+    return True
+
+
+def write_text(path, text: str) -> None:
+    """Replace *path* with *text* through a temp file + rename."""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(path) + "-", suffix=".tmp",
+                               dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        _replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _replace(src, dst, attempts: int = 10) -> None:
+    # Windows refuses the rename while another process has dst open
+    # (e.g. the view reading it); that only ever lasts a moment.
+    for attempt in range(attempts):
+        try:
+            os.replace(src, dst)
+            return
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.01)
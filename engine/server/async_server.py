@@ -0,0 +1,219 @@
+# engine/server/async_server.py
+"""
+Asyncio server mode – one event loop, no per-connection threads.
+
+Accept, hello handshake, snapshot push, history paging/streaming and broadcast all run as
+coroutines on a single loop.  The message handling is shared with the
+threaded server (client_handling.register / dispatch / close_client); each
+connection is wrapped in an AsyncConnection so command_processing's
+``send`` calls write into the asyncio transport instead of blocking.
+
+History files are only touched from one worker thread
+(``server["history_io"]``): appends are queued there, page reads are
+awaited from it, so a large page never stalls the other connections.
+Snapshot reads and checkpoint / world-hash reports (hashing, disk writes)
+run on the loop's default executor for the same reason.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from engine.core import netcodec
+from engine.server import client_handling, command_processing
+
+
+class AsyncConnection:
+    """
+    The connection API of engine.server.connection.Connection on top of a
+    StreamWriter.  The transport's write buffer is the outbound queue, so
+    ``send`` never blocks the loop and a slow reader only grows its own buffer.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, addr) -> None:
+        self.writer = writer
+        self.addr = addr
+        self.username = None
+        self.closed = False
+        self.codec = netcodec.JSON
+        self.compress_over = None
+        self.lagging_from = None
+
+        self.written_bytes  = 0      # handed to the transport, sent or not
+        self.dropped_frames = 0
+        self.peak_bytes     = 0
+        self._sent_at_close = None
+
+    @property
+    def sent_bytes(self) -> int:
+        """Bytes the transport has passed to the socket (its buffer drained)."""
+        if self._sent_at_close is not None:
+            return self._sent_at_close
+        return self.written_bytes - self.queued_bytes()
+
+    def send(self, blob: bytes) -> None:
+        if self.closed or self.writer.is_closing():
+            raise ConnectionError("connection closed")
+        self.writer.write(blob)
+        self.written_bytes += len(blob)
+        self.peak_bytes = max(self.peak_bytes, self.queued_bytes())
+
+    def queued_bytes(self) -> int:
+        return self.writer.transport.get_write_buffer_size()
+
+    def queued_frames(self):
+        return None   # the transport only tracks bytes
+
+    def notify_when_drained(self, callback) -> None:
+        async def _wait():
+            try:
+                await self.writer.drain()
+            except (ConnectionError, OSError):
+                return
+            if not self.closed:
+                callback(self)
+        asyncio.get_running_loop().create_task(_wait())
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._sent_at_close = self.sent_bytes   # the rest of the buffer is dropped
+        self.writer.transport.abort()   # don't wait to flush a slow reader
+
+
+# --------------------------------------------------------------------------- #
+
+async def _await_hello(reader: asyncio.StreamReader, decoder) -> list:
+    """Async twin of client_handling._await_hello."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + config.HELLO_TIMEOUT
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return []
+        try:
+            chunk = await asyncio.wait_for(reader.read(config.BUFFER_SIZE), remaining)
+        except asyncio.TimeoutError:
+            return []
+        if not chunk:
+            raise ConnectionError("closed during handshake")
+        msgs = decoder.feed(chunk)
+        if msgs:
+            return msgs
+
+
+async def _history_page(server, conn, from_seq: int) -> int:
+    """Async twin of command_processing.send_history_page: disk reads off the loop."""
+    lines = command_processing.recent_page(server, from_seq)
+    if lines is None:
+        lines = await asyncio.get_running_loop().run_in_executor(
+            server["history_io"], command_processing.stored_page, server, from_seq)
+    return command_processing.send_page(conn, lines)
+
+
+async def _pump_history_stream(server, conn, stream: dict) -> bool:
+    """Async twin of command_processing.pump_history_stream."""
+    while stream["credit"] > 0:
+        if stream["next"] > stream["end"]:
+            conn.send(netcodec.encode({"type": "history_stream_end", "highest_seq": stream["end"]},
+                                      conn.codec, conn.compress_over))
+            return True
+        sent = await _history_page(server, conn, stream["next"])
+        if not sent:                                   # history vanished (reset)
+            stream["end"] = stream["next"] - 1
+            continue
+        stream["next"] += sent
+        stream["credit"] -= 1
+    return False
+
+
+async def _dispatch(server, conn, msg, state: dict, addr):
+    """client_handling.dispatch, with disk work awaited off the loop."""
+    kind = msg.get("type") if isinstance(msg, dict) else None
+    if kind == "history_request":
+        await _history_page(server, conn, int(msg.get("from", 1)))
+    elif kind == "history_stream":
+        state["stream"] = command_processing.start_history_stream(server, msg)
+        if await _pump_history_stream(server, conn, state["stream"]):
+            state["stream"] = None
+    elif kind == "checkpoint":
+        await asyncio.get_running_loop().run_in_executor(
+            None, command_processing.record_checkpoint, server, conn, msg)
+    elif kind == "world_hashes":
+        pkt = await asyncio.get_running_loop().run_in_executor(
+            None, command_processing.check_world_hashes, server, conn, msg)
+        if pkt:
+            command_processing.send_desync(server, pkt)
+    elif kind == "history_ack":
+        if state["stream"] is not None:
+            state["stream"]["credit"] += 1
+            if await _pump_history_stream(server, conn, state["stream"]):
+                state["stream"] = None
+    else:
+        client_handling.dispatch(server, conn, msg, state, addr)
+
+
+async def handle_connection(server, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    addr = writer.get_extra_info("peername")
+    print(f"New connection from {addr}")
+    conn = AsyncConnection(writer, addr)
+    decoder = netcodec.NetDecoder()
+    state = client_handling.new_state()
+
+    try:
+        command_processing.send_hello(server, conn)
+        await writer.drain()
+        hello, pending = command_processing.take_hello(await _await_hello(reader, decoder))
+        command_processing.apply_hello(conn, hello)
+        # each chunk is read (the legacy zip read and base64-encoded) off the loop
+        loop = asyncio.get_running_loop()
+        frames = command_processing.snapshot_frames(server, hello, conn.codec, conn.compress_over)
+        while (frame := await loop.run_in_executor(None, next, frames, None)) is not None:
+            conn.send(frame)
+            await writer.drain()
+        client_handling.register(server, conn)
+        for msg in pending:          # a legacy client may have spoken first
+            await _dispatch(server, conn, msg, state, addr)
+        await writer.drain()
+
+        while True:
+            chunk = await reader.read(config.BUFFER_SIZE)
+            if not chunk:
+                break
+            for msg in decoder.feed(chunk):
+                await _dispatch(server, conn, msg, state, addr)
+            # Back-pressure only this connection: history pages it asked for
+            await writer.drain()
+    except (ConnectionError, OSError) as exc:
+        print(f"Socket error with {addr}: {exc}")
+    except Exception as exc:
+        # a malformed message: drop this client, keep serving the others
+        print(f"Error with {addr}: {exc!r}")
+    finally:
+        client_handling.close_client(server, conn, addr, state)
+
+
+async def serve(server):
+    """Serve on the already-bound ``server["socket"]`` until cancelled."""
+    sock = server["socket"]
+    sock.listen(config.LISTEN_BACKLOG)
+    sock.setblocking(False)
+
+    srv = await asyncio.start_server(
+        lambda r, w: handle_connection(server, r, w),
+        sock=sock,
+    )
+    async with srv:
+        await srv.serve_forever()
+
+
+def run(server):
+    server["history_io"] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+    try:
+        asyncio.run(serve(server))
+    except KeyboardInterrupt:
+        print("\nShutting down server.")
+    finally:
+        server["socket"].close()
+        server.pop("history_io").shutdown(wait=True)    # queued appends still land
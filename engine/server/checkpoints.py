@@ -0,0 +1,92 @@
+# engine/server/checkpoints.py
+"""
+Quorum-trusted world checkpoints for fast client catch-up.
+
+Every CHECKPOINT_INTERVAL seqs each client's sequencer reports the world it
+reached (``{"type": "checkpoint", "seq", "sha256", "world"}``).  The server
+cannot run game code itself, so it only counts votes: once
+CHECKPOINT_QUORUM distinct connections report the same hash for a seq, that
+world becomes the session's trusted checkpoint and is kept on disk:
+
+    checkpoints/
+        latest.json     # {"seq", "sha256", "world"}
+
+A joining client receives it right after ``initial_world``, installs it as
+its world with the cursor at ``seq`` and pulls history from ``seq + 1`` only.
+Reports that disagree never reach the quorum and are dropped once a later
+checkpoint is trusted.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+import config
+from engine.core import world_store
+
+LATEST_FILE  = "latest.json"
+MAX_PENDING  = 8             # seqs collecting votes at the same time
+
+
+class CheckpointStore:
+    """Votes per ``seq → sha256`` and the latest checkpoint that reached quorum."""
+
+    def __init__(self, session_dir: str, quorum: int = config.CHECKPOINT_QUORUM) -> None:
+        self.dir    = os.path.join(session_dir, config.CHECKPOINT_DIR)
+        self.path   = os.path.join(self.dir, LATEST_FILE)
+        self.quorum = max(int(quorum), 1)
+        self._votes: Dict[int, Dict[str, dict]] = {}
+        self._lock  = threading.Lock()      # votes arrive from every client thread
+        self.latest: Optional[dict] = self._load()
+
+    def _load(self) -> Optional[dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                cp = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if world_store.digest(cp.get("world")) != cp.get("sha256"):
+            print(f"Ignoring corrupt checkpoint {self.path}")
+            return None
+        return cp
+
+    # ------------------------------------------------------------------ #
+
+    def vote(self, seq: int, sha256: str, world, voter: str) -> bool:
+        """
+        Count *voter*'s report (one per connection, however often it
+        reports); True when it makes *seq* the trusted checkpoint.
+        """
+        latest = self.latest
+        if latest and seq <= latest["seq"]:
+            return False
+        if world_store.digest(world) != sha256:
+            return False            # hash does not match the world it came with
+
+        with self._lock:
+            if self.latest and seq <= self.latest["seq"]:
+                return False
+            shas = self._votes.setdefault(seq, {})
+            entry = shas.setdefault(sha256, {"voters": set(), "world": world})
+            entry["voters"].add(voter)
+            if len(entry["voters"]) < self.quorum:
+                while len(self._votes) > MAX_PENDING:
+                    del self._votes[min(self._votes)]
+                return False
+
+            self.latest = {"seq": seq, "sha256": sha256, "world": entry["world"]}
+            world_store.write_text(self.path, json.dumps(self.latest, separators=(",", ":")))
+            for old in [s for s in self._votes if s <= seq]:
+                del self._votes[old]
+            return True
+
+    def clear(self) -> None:
+        """Forget everything (session reset)."""
+        with self._lock:
+            self._votes.clear()
+            self.latest = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -1,53 +1,147 @@
 # engine/server/client_handling.py
-"""Per‑client loop that now also replies to history page requests."""
+"""Per‑client loop that also serves pulled history pages and pushed history streams.
 
-import socket, json
+The message handling itself (``register`` / ``dispatch`` / ``close_client``)
+works on connection objects so the asyncio server mode can drive it too.
+All outbound traffic goes through the connection's queue (engine.server.connection).
+"""
+
+import socket, json, select, time
 import config
 from engine.core import netcodec
 from engine.server import command_processing
+from engine.server.connection import Connection
 
 
 def handle_client(server, sock: socket.socket, addr):
     decoder = netcodec.NetDecoder()
-    client_username = None  # We'll store the username here when we first get it
-
-    # push snapshot & meta immediately
-    command_processing.send_snapshot(server, sock)
-    command_processing.send_history_meta(server, sock)
+    state = new_state()
+    conn = Connection(sock, addr)
 
     try:
+        # hello + snapshot & meta from this thread, not the accept loop;
+        # the snapshot is flushed before live broadcasts start queueing
+        command_processing.send_hello(server, conn)
+        hello, pending = command_processing.take_hello(_await_hello(sock, decoder))
+        command_processing.apply_hello(conn, hello)
+        for frame in command_processing.snapshot_frames(server, hello, conn.codec, conn.compress_over):
+            conn.send(frame)
+            if conn.queued_bytes() > 4 * config.SNAPSHOT_CHUNK_SIZE:
+                conn.flush()
+        conn.flush()
+        register(server, conn)
+        for msg in pending:          # a legacy client may have spoken first
+            dispatch(server, conn, msg, state, addr)
+
         while True:
-            chunk = sock.recv(config.BUFFER_SIZE)
-            if not chunk:
+            msgs = decoder.recv_into(sock, config.BUFFER_SIZE)
+            if msgs is None:
                 break
-            for msg in decoder.feed(chunk):
-                # history page request from client
-                if isinstance(msg, dict) and msg.get("type") == "history_request":
-                    frm = int(msg.get("from", 1))
-                    command_processing.send_history_page(server, sock, frm)
-                    continue
-                # otherwise treat as player command
-                try:
-                    # Store username from first command received
-                    if client_username is None and isinstance(msg, dict) and "username" in msg:
-                        client_username = msg["username"]
-                    
-                    command_processing.process_command(server, msg)
-                except Exception as exc:
-                    print(f"Error processing from {addr}: {exc}")
+            for msg in msgs:
+                dispatch(server, conn, msg, state, addr)
     except Exception as exc:
-        print(f"Socket error with {addr}: {exc}")
+        if not conn.closed:
+            print(f"Socket error with {addr}: {exc}")
     finally:
-        # Remove the socket from server clients list
-        if sock in server["clients"]:
-            server["clients"].remove(sock)
-        sock.close()
-        print("Connection closed:", addr)
-        
-        # Broadcast disconnect message
-        if (config.SEND_DISCONNECT):
-            disconnect_msg = {
-                "username": client_username, 
-                "text": config.DISCONNECT_COMMAND
-            }
-            command_processing.process_command(server, disconnect_msg)
\ No newline at end of file
+        close_client(server, conn, addr, state)
+
+
+def _await_hello(sock: socket.socket, decoder) -> list:
+    """First messages from the client, or [] if it stays silent.
+
+    Clients that know the handshake answer the server hello straight away;
+    legacy clients just wait for the snapshot, so give up after
+    ``HELLO_TIMEOUT``.
+    """
+    deadline = time.monotonic() + config.HELLO_TIMEOUT
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return []
+        readable, _, _ = select.select([sock], [], [], remaining)
+        if not readable:
+            return []
+        msgs = decoder.recv_into(sock, config.BUFFER_SIZE)
+        if msgs is None:
+            raise ConnectionError("closed during handshake")
+        if msgs:
+            return msgs
+
+
+# --------------------------------------------------------------------------- #
+# Transport-agnostic pieces
+
+def new_state() -> dict:
+    return {
+        "username": None,   # We'll store the username here when we first get it
+        "stream": None,     # state of a server-push history stream, if any
+    }
+
+
+def register(server, conn):
+    """Send history meta and start receiving broadcasts.
+
+    Both happen under the server lock so no command can be ordered between
+    the advertised ``highest_seq`` and the first broadcast.
+    """
+    with server["lock"]:
+        command_processing.send_history_meta(server, conn)
+        server["clients"].append(conn)
+
+
+def dispatch(server, conn, msg, state: dict, addr):
+    """Handle one decoded message from a client."""
+    # handshake already done (or skipped) – a late hello has nothing to add
+    if isinstance(msg, dict) and msg.get("type") == "hello":
+        return
+    # history page request from client
+    if isinstance(msg, dict) and msg.get("type") == "history_request":
+        frm = int(msg.get("from", 1))
+        command_processing.send_history_page(server, conn, frm)
+        return
+    # streamed catch-up: push pages, one more per ack
+    if isinstance(msg, dict) and msg.get("type") == "history_stream":
+        state["stream"] = command_processing.start_history_stream(server, msg)
+        if command_processing.pump_history_stream(server, conn, state["stream"]):
+            state["stream"] = None
+        return
+    # a client's world report for the checkpoint quorum
+    if isinstance(msg, dict) and msg.get("type") == "checkpoint":
+        command_processing.record_checkpoint(server, conn, msg)
+        return
+    # sampled world hashes for desync detection
+    if isinstance(msg, dict) and msg.get("type") == "world_hashes":
+        command_processing.record_world_hashes(server, conn, msg)
+        return
+    if isinstance(msg, dict) and msg.get("type") == "history_ack":
+        if state["stream"] is not None:
+            state["stream"]["credit"] += 1
+            if command_processing.pump_history_stream(server, conn, state["stream"]):
+                state["stream"] = None
+        return
+    # otherwise treat as player command
+    try:
+        # Store username from first command received
+        if state["username"] is None and isinstance(msg, dict) and "username" in msg:
+            state["username"] = conn.username = msg["username"]
+
+        command_processing.process_command(server, msg)
+    except Exception as exc:
+        print(f"Error processing from {addr}: {exc}")
+
+
+def close_client(server, conn, addr, state: dict):
+    # Remove the connection from server clients list
+    with server["lock"]:
+        if conn in server["clients"]:
+            server["clients"].remove(conn)
+    conn.close()
+    print("Connection closed:", addr)
+
+    # Broadcast disconnect message
+    if (config.SEND_DISCONNECT):
+        disconnect_msg = {
+            "username": state["username"],
+            "text": config.DISCONNECT_COMMAND
+        }
+        command_processing.process_command(server, disconnect_msg)
@@ -2,7 +2,6 @@
 
 import json, os, time, base64
 from typing import Dict, Any
-import threading          # helper for broadcast
 import config
 from engine.core import netcodec
 
@@ -29,8 +28,14 @@ def process_command(server: Dict, command: Dict):
             "command": command,
         }
 
-        _broadcast(server, ordered)
-        _append_to_history(server, ordered)
+        # encode once: the same bytes go on the wire, to disk and to the cache
+        payload = json.dumps(ordered, separators=(",", ":")).encode("utf-8")
+        frame   = netcodec.frame(payload)
+
+        _broadcast(server, ordered, frame, seq)
+        # queued for the history thread: other clients never wait on disk
+        _append_to_history(server, ordered, payload)
+        server["recent"].push(seq, frame)
 
         print(f"[{seq}] {command.get('username','?')}: {command.get('text','')}")
 
@@ -42,8 +47,10 @@ def _reset_session(server: Dict):
     """Wipe history & resend the template world to everyone."""
     with server["lock"]:
         # 1) blank history  …………………………………………………………………………………
-        with open(server["history_path"], "w") as fh:
-            json.dump([], fh)
+        _history_io(server, server["history"].clear)
+        server["recent"].clear()
+        server["checkpoints"].clear()
+        server["desync"].clear()
         server["sequence_number"] = 0
 
         # 2) load initial world  ………………………………………………………………………………
@@ -55,7 +62,7 @@ def _reset_session(server: Dict):
 
         # 3) broadcast reset packet ………………………………………………………………………
         pkt = {"type": "reset", "world": world}
-        _broadcast(server, pkt)
+        _broadcast(server, pkt, force=True)
 
         print("=== SESSION RESET issued by host ===")
 
@@ -64,20 +71,80 @@ def _reset_session(server: Dict):
 # Snapshot & history helpers
 
 
-def send_snapshot(server: Dict, sock):
-    """Streams client zip, then sends the session's initial world."""
-    import base64
-    zip_path = os.path.join(server["session_dir"], config.SNAPSHOT_DIR, config.CLIENT_ZIP_NAME)
+def _server_caps() -> list:
+    caps = ["snapshot_chunks"]
+    if config.COMPRESS_FRAMES:
+        caps.append("zlib")
+    if config.CHECKPOINT_INTERVAL:
+        caps.append("checkpoints")
+    if config.DESYNC_HASH_EVERY:
+        caps.append("world_hashes")
+    return caps
+
+
+def send_hello(server: Dict, conn):
+    """First frame on every connection: capabilities + client snapshot identity.
+
+    Legacy clients ignore unknown message types, so this is harmless to them.
+    """
+    snap = server.get("client_snapshot")
+    hello = {
+        "type": "hello",
+        "caps": _server_caps(),
+        "codecs": netcodec.available_codecs(config.WIRE_CODECS),
+        "snapshot": None if snap is None else {
+            "name": snap["name"],
+            "size": snap["size"],
+            "sha256": snap["sha256"],
+        },
+    }
+    conn.send(netcodec.encode(hello))
+
+
+def snapshot_frames(server: Dict, hello: Dict = None, codec=netcodec.JSON,
+                    compress_over: int = None):
+    """Yield the frames that bring a new client up to the session's start.
+
+    With a ``snapshot_chunks`` hello the client zip goes out as raw binary
+    frames between ``snapshot_begin`` / ``snapshot_end`` – or not at all
+    (``snapshot_cached``) when the client already holds the same sha256.
+    Without one, the legacy single base64 ``snapshot_zip`` frame is used.
+    The initial world follows in both cases, then – for clients with the
+    ``checkpoints`` cap – the latest trusted checkpoint, if any.
+
+    Callers send the frames one by one and pace on their connection, so the
+    zip is never held in memory as a whole.  The zip chunks are never
+    compressed again (the zip is already deflated); the JSON frames are,
+    over *compress_over* bytes.
+    """
+    snap = server.get("client_snapshot")
+    caps = hello.get("caps", []) if hello else []
     try:
-        # 1) send the client code snapshot ZIP
-        with open(zip_path, "rb") as fh:
-            blob = base64.b64encode(fh.read()).decode("ascii")
-        packet = {"type": "snapshot_zip", "name": config.CLIENT_ZIP_NAME, "b64": blob}
-        sock.sendall(netcodec.encode(packet))
-    except Exception as exc:
+        # 1) the client code snapshot ZIP
+        if snap is None:
+            pass
+        elif "snapshot_chunks" in caps:
+            if hello.get("snapshot_sha256") == snap["sha256"]:
+                yield netcodec.encode({"type": "snapshot_cached", "sha256": snap["sha256"]}, codec)
+            else:
+                yield netcodec.encode({
+                    "type": "snapshot_begin",
+                    "name": snap["name"],
+                    "size": snap["size"],
+                    "sha256": snap["sha256"],
+                }, codec)
+                with open(snap["path"], "rb") as fh:
+                    for chunk in iter(lambda: fh.read(config.SNAPSHOT_CHUNK_SIZE), b""):
+                        yield netcodec.encode_binary(chunk)
+                yield netcodec.encode({"type": "snapshot_end", "sha256": snap["sha256"]}, codec)
+        else:
+            with open(snap["path"], "rb") as fh:
+                blob = base64.b64encode(fh.read()).decode("ascii")
+            yield netcodec.encode({"type": "snapshot_zip", "name": snap["name"], "b64": blob})
+    except OSError as exc:
         print("Snapshot send failed:", exc)
 
-    # 2) send the initial world JSON
+    # 2) the initial world JSON
     world_path = os.path.join(server["session_dir"], config.INITIAL_WORLD_FILE)
     try:
         with open(world_path, "r", encoding="utf-8") as f:
@@ -86,45 +153,213 @@ def send_snapshot(server: Dict, sock):
             "type": "initial_world",
             "world": world
         }
-        sock.sendall(netcodec.encode(init_pkt))
+        yield netcodec.encode(init_pkt, codec, compress_over)
     except Exception as exc:
         print("Initial world send failed:", exc)
 
+    # 3) the latest trusted checkpoint: the client replays only the tail
+    checkpoint = server["checkpoints"].latest if "checkpoints" in caps else None
+    if checkpoint:
+        yield netcodec.encode({"type": "checkpoint", **checkpoint}, codec, compress_over)
+
+
+def record_checkpoint(server: Dict, conn, msg: Dict):
+    """Count a client's world report towards the checkpoint quorum."""
+    seq = msg.get("seq")
+    if not isinstance(seq, int) or not 0 < seq <= server["sequence_number"]:
+        return              # not ordered yet, or from before a reset
+    # one vote per connection: a username is whatever the client claims
+    voter = repr(conn.addr)
+    if server["checkpoints"].vote(seq, msg.get("sha256"), msg.get("world"), voter):
+        print(f"Checkpoint at seq {seq} trusted ({str(msg.get('sha256'))[:12]})")
+
+
+def record_world_hashes(server: Dict, conn, msg: Dict):
+    """Compare a client's sampled world hashes with everyone else's."""
+    pkt = check_world_hashes(server, conn, msg)
+    if pkt:
+        send_desync(server, pkt)
+
+
+def check_world_hashes(server: Dict, conn, msg: Dict):
+    """Record a client's hashes (may write desync.json); the desync packet to send, if any."""
+    high = server["sequence_number"]
+    hashes = [h for h in msg.get("hashes") or []
+              if isinstance(h, list) and len(h) == 2 and isinstance(h[0], int)
+              and 0 < h[0] <= high and isinstance(h[1], str)]
+    if not hashes:
+        return
+    # a client that only replays has sent no command, so no username yet
+    voter = conn.username or msg.get("username") or repr(conn.addr)
+    found = server["desync"].report(voter, hashes)
+    if not found:
+        return
+    views = ", ".join(f"{'/'.join(who)}={digest}" for digest, who in found["groups"].items())
+    print(f"!!! DESYNC: clients disagree at seq {found['seq']} "
+          f"(last agreement at seq {found['after']}): {views}")
+    # tell everyone – old clients ignore unknown message types, but would
+    # take a frame with a "seq" key for an ordered command
+    return {"type": "desync", "divergent_seq": found["seq"],
+            "after": found["after"], "groups": found["groups"]}
+
+
+def send_desync(server: Dict, pkt: Dict):
+    with server["lock"]:
+        for c in list(server["clients"]):
+            if not c.closed:
+                try:
+                    c.send(netcodec.encode(pkt, c.codec))
+                except Exception:
+                    pass
+
+
+def take_hello(msgs):
+    """Split the client's first messages into ``(hello or None, the rest)``."""
+    if msgs and isinstance(msgs[0], dict) and msgs[0].get("type") == "hello":
+        return msgs[0], msgs[1:]
+    return None, msgs
+
+
+def apply_hello(conn, hello: Dict = None):
+    """Pick the wire codec and compression for everything sent after the handshake."""
+    if hello:
+        conn.codec = netcodec.choose_codec(hello.get("codecs"), config.WIRE_CODECS)
+        if config.COMPRESS_FRAMES and "zlib" in hello.get("caps", []):
+            conn.compress_over = config.COMPRESS_MIN_BYTES
+
 
 # -------------------------------------------------------------------- #
 # NEW: paged history
 
 
-def send_history_meta(server: Dict, sock):
-    """Send highest sequence number so client knows how many pages to pull."""
-    meta = {"type": "history_meta", "highest_seq": server["sequence_number"], "page_size": config.HISTORY_PAGE_SIZE}
-    sock.sendall(netcodec.encode(meta))
+def send_history_meta(server: Dict, conn, from_seq: int = None):
+    """Send highest sequence number so client knows how many pages to pull.
+    ``caps`` advertises that the client may ask for a pushed stream instead;
+    ``from`` (resync only) tells the client where its gap starts."""
+    meta = {
+        "type": "history_meta",
+        "highest_seq": server["sequence_number"],
+        "page_size": config.HISTORY_PAGE_SIZE,
+        "caps": ["history_stream"],
+    }
+    if from_seq is not None:
+        meta["from"] = from_seq
+    conn.send(netcodec.encode(meta, conn.codec, conn.compress_over))
+
+
+def send_history_page(server: Dict, conn, from_seq: int) -> int:
+    """Send a page beginning at *from_seq* inclusive.
+
+    Recent ranges come straight from the in-memory window of broadcast
+    frames; older ones are a seek + bounded read from the history index.
+    Either way the stored JSON is spliced into the frame without parsing.
+    Returns the number of commands in the page.
+    """
+    lines = recent_page(server, from_seq)
+    if lines is None:
+        lines = _history_read(server, stored_page, server, from_seq)
+    return send_page(conn, lines)
+
+
+def recent_page(server: Dict, from_seq: int):
+    """The page from the in-memory window, or None if it reaches further back."""
+    with server["lock"]:
+        return server["recent"].payloads(from_seq, config.HISTORY_PAGE_SIZE)
 
 
-def send_history_page(server: Dict, sock, from_seq: int):
-    """Send a page beginning at *from_seq* inclusive."""
-    page_size = config.HISTORY_PAGE_SIZE
+def stored_page(server: Dict, from_seq: int) -> list:
+    """The page read from the history files (disk I/O)."""
     try:
-        with open(server["history_path"], "r") as fh:
-            history = json.load(fh)
-    except Exception:
-        history = []
+        return server["history"].read_raw(from_seq, config.HISTORY_PAGE_SIZE)
+    except Exception as exc:
+        print("History read failed:", exc)
+        return []
+
 
-    page = [cmd for cmd in history if cmd.get("seq", 0) >= from_seq][:page_size]
-    packet = {"type": "history_page", "commands": page}
-    sock.sendall(netcodec.encode(packet))
+def send_page(conn, lines: list) -> int:
+    # always a JSON frame, whatever conn.codec is: the stored lines are
+    # spliced as-is and the decoder reads the codec from each header.
+    # Pages are the bulk of catch-up traffic and compress well.
+    payload = b'{"type":"history_page","commands":[' + b",".join(lines) + b"]}"
+    conn.send(netcodec.frame(payload, compress_over=conn.compress_over))
+    return len(lines)
+
+
+# -------------------------------------------------------------------- #
+# Server-push history streaming
+#
+# One ``history_stream`` request replaces the page-by-page ping-pong: the
+# server pushes pages back-to-back up to the highest seq known at request
+# time.  Flow control is credit based – at most ``window`` pages are
+# unacknowledged, and every ``history_ack`` from the client releases one
+# more.  Commands ordered after the request reach the client as live
+# broadcasts, exactly as with pulled pages.
+
+
+def start_history_stream(server: Dict, msg: Dict) -> Dict:
+    """Build the per-connection stream state for a ``history_stream`` request."""
+    window = int(msg.get("window", config.HISTORY_STREAM_WINDOW))
+    return {
+        "next": int(msg.get("from", 1)),
+        "end": server["sequence_number"],
+        "credit": max(window, 1),
+    }
+
+
+def pump_history_stream(server: Dict, conn, stream: Dict) -> bool:
+    """Push pages while credit lasts. Returns True once the stream is done."""
+    while stream["credit"] > 0:
+        if stream["next"] > stream["end"]:
+            conn.send(netcodec.encode({"type": "history_stream_end", "highest_seq": stream["end"]},
+                                      conn.codec, conn.compress_over))
+            return True
+        sent = send_history_page(server, conn, stream["next"])
+        if not sent:                                   # history vanished (reset)
+            stream["end"] = stream["next"] - 1
+            continue
+        stream["next"] += sent
+        stream["credit"] -= 1
+    return False
 
 
 # -------------------------------------------------------------------- #
 # Internal helpers
 
 
-def _broadcast(server: Dict, ordered: Dict):
-    blob = netcodec.encode(ordered)
+def _broadcast(server: Dict, ordered: Dict, blob: bytes = None, seq: int = None,
+               force: bool = False):
+    """Queue *ordered* on every client connection (called under the server lock).
+
+    *blob* is its JSON frame if the caller already has one; other
+    codec/compression combinations are encoded on first use, once per broadcast.
+
+    Only in-memory queues are touched here – the network writes happen on each
+    connection's writer – so one stalled client cannot hold up ordering.
+    A client whose queue is over the limit is handed to the slow-consumer
+    policy; *force* (reset packets) bypasses the policy and ends any resync.
+    """
+    # one encoding per (codec, threshold) in use, shared by the clients using it
+    frames = {(netcodec.JSON.name, None): blob or netcodec.encode(ordered)}
     dead = []
     for c in server["clients"]:
+        if c.closed:
+            dead.append(c)
+            continue
+        if force:
+            c.lagging_from = None
+        elif c.lagging_from is not None:
+            c.dropped_frames += 1       # resyncing: it will pull this from history
+            continue
+        key = (c.codec.name, c.compress_over)
+        blob = frames.get(key)
+        if blob is None:
+            blob = frames[key] = netcodec.encode(ordered, c.codec, c.compress_over)
+        if not force and c.queued_bytes() + len(blob) > _queue_limit():
+            if _slow_consumer(server, c, seq):
+                dead.append(c)
+            continue
         try:
-            c.sendall(blob)
+            c.send(blob)
         except Exception:
             dead.append(c)
     for c in dead:
@@ -135,15 +370,94 @@ def _broadcast(server: Dict, ordered: Dict):
             pass
 
 
-def _append_to_history(server: Dict, ordered: Dict):
+# -------------------------------------------------------------------- #
+# Slow consumers
+#
+#   resync     – stop queueing live commands for the client; once its queue
+#                has drained, send a history_meta whose ``from`` is the first
+#                withheld seq and let the client catch up from history.
+#   disconnect – drop the connection as soon as its queue exceeds the limit.
+#   buffer     – keep queueing up to SLOW_CONSUMER_BUFFER_MB, then disconnect.
+
+
+def _queue_limit() -> int:
+    if config.SLOW_CONSUMER_POLICY == "buffer":
+        return config.SLOW_CONSUMER_BUFFER_MB * 1024 * 1024
+    return config.OUTBOUND_QUEUE_LIMIT_KB * 1024
+
+
+def _slow_consumer(server: Dict, conn, seq) -> bool:
+    """Apply the policy to *conn*. Returns True if it must be dropped."""
+    policy = config.SLOW_CONSUMER_POLICY
+    if policy == "resync":
+        conn.dropped_frames += 1
+        if seq is not None:                 # ordered command – recoverable from history
+            conn.lagging_from = seq
+            print(f"Slow consumer {conn.addr}: {conn.queued_bytes()} bytes queued, "
+                  f"resyncing from seq {seq}")
+            conn.notify_when_drained(lambda c: _finish_resync(server, c))
+        return False
+    print(f"Slow consumer {conn.addr}: {conn.queued_bytes()} bytes queued, disconnecting")
+    return True
+
+
+def _finish_resync(server: Dict, conn):
+    """Queue drained: point the client at its gap and resume live traffic."""
+    with server["lock"]:
+        if conn.closed or conn.lagging_from is None:
+            return
+        try:
+            send_history_meta(server, conn, conn.lagging_from)
+        except Exception:
+            return
+        conn.lagging_from = None
+
+
+def client_metrics(server: Dict) -> list:
+    """Per-connection outbound queue statistics."""
+    return [
+        {
+            "addr": c.addr,
+            "username": c.username,
+            "queued_frames": c.queued_frames(),
+            "queued_bytes": c.queued_bytes(),
+            "peak_bytes": c.peak_bytes,
+            "sent_bytes": c.sent_bytes,
+            "dropped_frames": c.dropped_frames,
+            "lagging_from": c.lagging_from,
+        }
+        for c in list(server["clients"])
+    ]
+
+
+def _append_to_history(server: Dict, ordered: Dict, payload: bytes = None):
+    _history_io(server, _write_history, server["history"], ordered, payload)
+
+
+def _write_history(history, ordered: Dict, payload: bytes = None):
     try:
-        if os.path.exists(server["history_path"]):
-            with open(server["history_path"], "r") as fh:
-                hist = json.load(fh)
-        else:
-            hist = []
-        hist.append(ordered)
-        with open(server["history_path"], "w") as fh:
-            json.dump(hist, fh, indent=2)
+        history.append(ordered, payload)
     except Exception as exc:
-        print("History write failed:", exc)
\ No newline at end of file
+        print("History write failed:", exc)
+
+
+def _history_io(server: Dict, fn, *args):
+    """Call *fn* now – or, with a history thread, queue it there.
+
+    Both server modes set ``server["history_io"]`` to a one-thread
+    executor, so disk writes happen in order without the server lock held
+    and never stall the event loop (page reads are queued behind them too).
+    """
+    pool = server.get("history_io")
+    if pool is None:
+        fn(*args)
+    else:
+        pool.submit(fn, *args)
+
+
+def _history_read(server: Dict, fn, *args):
+    """*fn*(*args) on the history thread, after every queued append; waits for it."""
+    pool = server.get("history_io")
+    if pool is None:
+        return fn(*args)
+    return pool.submit(fn, *args).result()
\ No newline at end of file
@@ -0,0 +1,123 @@
+# engine/server/connection.py
+"""
+Per-client outbound queue + writer thread for the threaded server.
+
+Nothing on the command path writes to a client socket any more: ``send``
+only appends the frame to this connection's queue and a dedicated writer
+thread drains it.  A client with a full TCP window therefore backs up its
+own queue instead of stalling command ordering for everyone; what happens
+when the queue grows too large is decided by the slow-consumer policy in
+command_processing.
+
+The asyncio server mode has an equivalent wrapper (async_server.AsyncConnection)
+that uses the transport's write buffer as the queue.
+"""
+
+import collections
+import socket
+import threading
+from typing import Optional
+
+from engine.core import netcodec
+
+
+class Connection:
+    """A client socket with a bounded-by-policy outbound queue."""
+
+    def __init__(self, sock: socket.socket, addr) -> None:
+        self.sock = sock
+        self.addr = addr
+        self.username: Optional[str] = None
+        self.closed = False
+        self.codec = netcodec.JSON      # negotiated in the hello
+        self.compress_over = None       # zlib threshold in bytes, if negotiated
+
+        # resync state: first seq withheld from this client while it lags
+        self.lagging_from: Optional[int] = None
+        self._on_drained = None         # one-shot callback(conn) once the queue empties
+
+        # metrics
+        self.sent_bytes     = 0
+        self.dropped_frames = 0
+        self.peak_bytes     = 0
+
+        self._queue = collections.deque()
+        self._queued_bytes = 0
+        self._cond = threading.Condition()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    # ------------------------------------------------------------------ #
+    # Producer side
+
+    def send(self, blob: bytes) -> None:
+        """Queue *blob* for the writer thread; never blocks on the network."""
+        with self._cond:
+            if self.closed:
+                raise ConnectionError("connection closed")
+            self._queue.append(blob)
+            self._queued_bytes += len(blob)
+            self.peak_bytes = max(self.peak_bytes, self._queued_bytes)
+            self._cond.notify()
+
+    def queued_bytes(self) -> int:
+        return self._queued_bytes
+
+    def queued_frames(self) -> int:
+        return len(self._queue)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far has been written."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue or self.closed, timeout)
+
+    def notify_when_drained(self, callback) -> None:
+        """Call *callback(conn)* from the writer once the queue is empty."""
+        with self._cond:
+            if self._queue:
+                self._on_drained = callback
+                return
+        callback(self)
+
+    def close(self) -> None:
+        """Stop the writer and unblock the receive loop (it does the cleanup)."""
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            self._queue.clear()
+            self._queued_bytes = 0
+            self._cond.notify_all()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    # ------------------------------------------------------------------ #
+    # Writer thread
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self.closed)
+                if self.closed:
+                    return
+                blob = self._queue[0]
+            try:
+                self.sock.sendall(blob)
+            except OSError:
+                self.close()
+                return
+            callback = None
+            with self._cond:
+                if self.closed:
+                    return
+                self._queue.popleft()
+                self._queued_bytes -= len(blob)
+                self.sent_bytes += len(blob)
+                if not self._queue:
+                    self._cond.notify_all()
+                    callback, self._on_drained = self._on_drained, None
+            if callback is not None:
+                callback(self)
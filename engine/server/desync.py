@@ -0,0 +1,82 @@
+# engine/server/desync.py
+"""
+Desync detection from the clients' sampled world hashes.
+
+Every DESYNC_HASH_EVERY seqs each client's sequencer hashes its world
+(``world_store.digest``, cut to DESYNC_HASH_CHARS) and reports a batch
+``{"type": "world_hashes", "hashes": [[seq, hash], …]}``.  The same seqs
+are sampled everywhere, so the server only has to compare: the lowest seq
+at which two clients disagree is the session's first divergence.  It
+happened after ``after`` – the last sampled seq everyone reported agreed
+on – and at or before ``seq``:
+
+    desync.json     # {"seq", "after", "groups": {hash: [clients]}}
+
+The record lives in the session directory and is cleared by a reset.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from engine.core import world_store
+
+DESYNC_FILE = "desync.json"
+MAX_SEQS    = 1024           # sampled seqs remembered for comparison
+
+
+class DesyncMonitor:
+    """Sampled world hashes per ``seq → client`` and the first disagreement."""
+
+    def __init__(self, session_dir: str) -> None:
+        self.path = os.path.join(session_dir, DESYNC_FILE)
+        self._hashes: Dict[int, Dict[str, str]] = {}
+        self._lock = threading.Lock()       # reports arrive from every client thread
+        self.first: Optional[dict] = self._load()
+
+    def _load(self) -> Optional[dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    # ------------------------------------------------------------------ #
+
+    def report(self, voter: str, hashes: List[list]) -> Optional[dict]:
+        """Record *voter*'s ``[seq, hash]`` pairs; the new first divergence, if any."""
+        found = changed = None
+        with self._lock:
+            for seq, digest in hashes:
+                votes = self._hashes.setdefault(seq, {})
+                votes[voter] = digest
+                if len(set(votes.values())) < 2:
+                    continue
+                if self.first is None or seq < self.first["seq"]:
+                    found = changed = self.first = self._divergence(seq)
+                elif seq == self.first["seq"]:
+                    changed = self.first = self._divergence(seq)    # one more client's view
+            while len(self._hashes) > MAX_SEQS:
+                del self._hashes[min(self._hashes)]
+            if changed:
+                world_store.write_text(self.path, json.dumps(self.first, indent=2))
+        return found
+
+    def _divergence(self, seq: int) -> dict:
+        groups: Dict[str, List[str]] = {}
+        for voter, digest in sorted(self._hashes[seq].items()):
+            groups.setdefault(digest, []).append(voter)
+        agreed = [s for s, votes in self._hashes.items()
+                  if s < seq and len(votes) > 1 and len(set(votes.values())) == 1]
+        return {"seq": seq, "after": max(agreed, default=0), "groups": groups}
+
+    def clear(self) -> None:
+        """Forget everything (session reset)."""
+        with self._lock:
+            self._hashes.clear()
+            self.first = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
@@ -0,0 +1,252 @@
+# engine/server/history_store.py
+"""
+Append-only, segmented command history for the thin server.
+
+Layout inside the session directory:
+
+    history/
+        00000001.ndjson     # ordered commands seq 1 .. HISTORY_SEGMENT_SIZE
+        00000001.idx        # big-endian u64 byte offset of every line above
+        00010001.ndjson     # next segment, named after its first seq
+        00010001.idx
+        ...
+
+Each line is one ordered command in compact JSON.  Seqs inside a segment are
+contiguous, so the segment names plus the per-segment ``.idx`` files form a
+seq → byte-offset index: any page is one bisect, one small ``.idx`` read and
+one bounded read of the segment.  Appending a command is a single ``write`` on
+the open tail segment (plus 8 bytes of index), and the highest seq is read
+back from the last line of the last segment – so neither appends, pages nor
+startup depend on the length of the session.
+
+A legacy ``history.json`` (one big JSON list) is migrated into segments the
+first time a store is opened on that session directory.
+"""
+
+import bisect
+import json
+import os
+import struct
+from typing import Any, Dict, List, Optional
+
+import config
+
+SEGMENT_SUFFIX = ".ndjson"
+INDEX_SUFFIX   = ".idx"
+_OFFSET        = struct.Struct(">Q")
+_TAIL_BLOCK    = 4096
+
+
+def _segment_name(first_seq: int) -> str:
+    return f"{first_seq:08d}{SEGMENT_SUFFIX}"
+
+
+def _index_name(first_seq: int) -> str:
+    return f"{first_seq:08d}{INDEX_SUFFIX}"
+
+
+class HistoryStore:
+    """Segmented NDJSON history with O(1) append and O(1) highest-seq lookup."""
+
+    def __init__(self, session_dir: str, segment_size: int = config.HISTORY_SEGMENT_SIZE) -> None:
+        self.session_dir  = session_dir
+        self.dir          = os.path.join(session_dir, config.HISTORY_DIR)
+        self.segment_size = segment_size
+        os.makedirs(self.dir, exist_ok=True)
+
+        self._starts: List[int] = self._scan_segments()
+        self._tail_fh  = None
+        self._tail_idx = None
+        self._tail_end = 0
+        self.highest   = self._read_highest()
+
+        self._migrate_legacy()
+
+    # ------------------------------------------------------------------ #
+    # Public API
+
+    def append(self, ordered: Dict[str, Any], payload: Optional[bytes] = None) -> None:
+        """
+        Append one ordered command (``{"seq": …}``) to the tail segment.
+        *payload* may carry its compact JSON encoding if the caller already
+        has it (the broadcast frame), saving a second ``json.dumps``.
+        """
+        seq = ordered["seq"]
+        if (not self._starts or seq != self.highest + 1
+                or seq - self._starts[-1] >= self.segment_size):
+            self._roll(seq)
+        if payload is None:
+            payload = json.dumps(ordered, separators=(",", ":")).encode("utf-8")
+        line = payload + b"\n"
+        self._tail_fh.write(line)
+        self._tail_fh.flush()
+        self._tail_idx.write(_OFFSET.pack(self._tail_end))
+        self._tail_idx.flush()
+        self._tail_end += len(line)
+        self.highest = seq
+
+    def read_range(self, from_seq: int, limit: int) -> List[Dict[str, Any]]:
+        """Return up to *limit* commands with ``seq >= from_seq``, in order."""
+        return [json.loads(line) for line in self.read_raw(from_seq, limit)]
+
+    def read_raw(self, from_seq: int, limit: int) -> List[bytes]:
+        """
+        Like :meth:`read_range` but returns the stored JSON lines (without the
+        trailing newline) so callers can splice them into frames unparsed.
+        """
+        out: List[bytes] = []
+        high = self.highest             # snapshot – appends may race us
+        if not self._starts or from_seq > high:
+            return out
+
+        seg = max(bisect.bisect_right(self._starts, from_seq) - 1, 0)
+        while len(out) < limit and seg < len(self._starts):
+            start = self._starts[seg]
+            if seg + 1 < len(self._starts):
+                seg_len = os.path.getsize(self._index_path(start)) // _OFFSET.size
+            else:
+                seg_len = high - start + 1
+            first = max(from_seq - start, 0)
+            count = min(limit - len(out), seg_len - first)
+            if count > 0:
+                out.extend(self._read_lines(start, first, count))
+            seg += 1
+        return out
+
+    def clear(self) -> None:
+        """Drop every segment (used by the host-issued reset)."""
+        self.close()
+        for start in self._starts:
+            os.remove(self._path(start))
+            os.remove(self._index_path(start))
+        self._starts = []
+        self.highest = 0
+
+    def close(self) -> None:
+        for fh in (self._tail_fh, self._tail_idx):
+            if fh is not None:
+                fh.close()
+        self._tail_fh  = None
+        self._tail_idx = None
+
+    # ------------------------------------------------------------------ #
+    # Segment helpers
+
+    def _path(self, first_seq: int) -> str:
+        return os.path.join(self.dir, _segment_name(first_seq))
+
+    def _index_path(self, first_seq: int) -> str:
+        return os.path.join(self.dir, _index_name(first_seq))
+
+    def _read_lines(self, start: int, first: int, count: int) -> List[bytes]:
+        """Read lines *first* .. *first+count-1* of segment *start* via its index."""
+        with open(self._index_path(start), "rb") as ix:
+            ix.seek(first * _OFFSET.size)
+            raw = ix.read((count + 1) * _OFFSET.size)
+        offsets = [o for (o,) in _OFFSET.iter_unpack(raw[: len(raw) - len(raw) % _OFFSET.size])]
+        with open(self._path(start), "rb") as fh:
+            fh.seek(offsets[0])
+            if len(offsets) > count:
+                blob = fh.read(offsets[count] - offsets[0])
+            else:
+                blob = fh.read()
+        lines = blob.split(b"\n")[:count]
+        return [ln for ln in lines if ln]
+
+    def _scan_segments(self) -> List[int]:
+        starts = []
+        for name in os.listdir(self.dir):
+            stem, ext = os.path.splitext(name)
+            if ext == SEGMENT_SUFFIX and stem.isdigit():
+                starts.append(int(stem))
+        return sorted(starts)
+
+    def _roll(self, first_seq: int) -> None:
+        self.close()
+        self._starts.append(first_seq)
+        self._tail_fh  = open(self._path(first_seq), "ab")
+        self._tail_idx = open(self._index_path(first_seq), "wb")
+        self._tail_end = 0
+
+    def _read_highest(self) -> int:
+        """Read the last complete line of the tail segment and reopen it for append."""
+        if not self._starts:
+            return 0
+        for start in self._starts[:-1]:
+            if not os.path.exists(self._index_path(start)):
+                _rebuild_index(self._path(start), self._index_path(start))
+
+        start = self._starts[-1]
+        path  = self._path(start)
+        last  = _last_complete_line(path)
+        high  = start - 1 if last is None else json.loads(last)["seq"]
+
+        # the tail index may trail the segment after a crash – rebuild if so
+        idx_path = self._index_path(start)
+        expected = (high - start + 1) * _OFFSET.size
+        if not os.path.exists(idx_path) or os.path.getsize(idx_path) != expected:
+            _rebuild_index(path, idx_path)
+
+        self._tail_fh  = open(path, "ab")
+        self._tail_idx = open(idx_path, "ab")
+        self._tail_end = os.path.getsize(path)
+        return high
+
+    def _migrate_legacy(self) -> None:
+        """One-time import of a pre-segment ``history.json`` list."""
+        legacy = os.path.join(self.session_dir, config.HISTORY_FILE)
+        if not os.path.exists(legacy):
+            return
+        if self._starts:
+            print(f"Warning: both {legacy} and {self.dir} exist – keeping segments")
+            return
+
+        with open(legacy, "r", encoding="utf-8") as fh:
+            history = json.load(fh)
+        for cmd in sorted(history, key=lambda c: c.get("seq", 0)):
+            self.append(cmd)
+        os.replace(legacy, legacy + ".migrated")
+        print(f"Migrated {len(history)} commands from {legacy} into {self.dir}")
+
+
+# --------------------------------------------------------------------------- #
+def _rebuild_index(seg_path: str, idx_path: str) -> None:
+    """Recreate a segment's offset index by scanning it once."""
+    offsets = bytearray()
+    pos = 0
+    with open(seg_path, "rb") as fh:
+        for line in fh:
+            if not line.endswith(b"\n"):
+                break
+            offsets += _OFFSET.pack(pos)
+            pos += len(line)
+    with open(idx_path, "wb") as ix:
+        ix.write(offsets)
+
+
+def _last_complete_line(path: str) -> Optional[bytes]:
+    """
+    Return the last newline-terminated line of *path*, reading backwards in
+    small blocks.  A torn trailing write (no final newline) is truncated away
+    so the next append starts on a clean line.
+    """
+    with open(path, "r+b") as fh:
+        end = fh.seek(0, os.SEEK_END)
+        buf = b""
+        pos = end
+        while pos > 0:
+            step = min(_TAIL_BLOCK, pos)
+            pos -= step
+            fh.seek(pos)
+            buf = fh.read(step) + buf
+            last_nl = buf.rfind(b"\n")
+            if last_nl == -1:
+                continue
+            if pos + last_nl + 1 != end:
+                fh.truncate(pos + last_nl + 1)      # drop torn tail
+            prev_nl = buf.rfind(b"\n", 0, last_nl)
+            if prev_nl != -1 or pos == 0:
+                return buf[prev_nl + 1 : last_nl + 1]
+        if end:
+            fh.truncate(0)
+        return None
@@ -0,0 +1,70 @@
+# engine/server/recent_cache.py
+"""
+Bounded in-memory window of the most recently ordered commands.
+
+Each entry is the exact netcodec frame that was broadcast for that seq, so
+reconnecting clients that only missed the last few hundred commands can be
+served from memory: no disk read, no JSON encode.  Older ranges fall back to
+the persistent HistoryStore.
+"""
+
+from typing import List, Optional
+
+import config
+from engine.core import netcodec
+
+
+class RecentCommands:
+    """Fixed-capacity ring of ``(seq → encoded frame)`` for contiguous seqs."""
+
+    def __init__(self, capacity: int = config.HISTORY_CACHE_SIZE) -> None:
+        self.capacity = max(int(capacity), 0)
+        self.clear()
+
+    # ------------------------------------------------------------------ #
+
+    def clear(self) -> None:
+        self._ring: List[Optional[bytes]] = [None] * self.capacity
+        self._head  = 0          # slot of the oldest entry
+        self._count = 0
+        self.first_seq = 0       # seq held in the oldest slot
+        self.last_seq  = 0
+
+    def push(self, seq: int, frame: bytes) -> None:
+        """Remember the broadcast *frame* of *seq* (must follow ``last_seq``)."""
+        if not self.capacity:
+            return
+        if self._count and seq != self.last_seq + 1:
+            self.clear()                     # gap (e.g. reset) – start over
+        if not self._count:
+            self.first_seq = seq
+
+        slot = (self._head + self._count) % self.capacity
+        self._ring[slot] = frame
+        if self._count < self.capacity:
+            self._count += 1
+        else:
+            self._head = (self._head + 1) % self.capacity
+            self.first_seq += 1
+        self.last_seq = seq
+
+    def covers(self, from_seq: int) -> bool:
+        return bool(self._count) and self.first_seq <= from_seq
+
+    def payloads(self, from_seq: int, limit: int) -> Optional[List[bytes]]:
+        """
+        JSON payloads (frames without their header) for up to *limit* seqs
+        starting at *from_seq*, or None when the window does not reach back
+        that far and the caller has to go to disk.
+        """
+        if not self.covers(from_seq):
+            return None
+        out: List[bytes] = []
+        offset = from_seq - self.first_seq
+        for i in range(offset, min(offset + limit, self._count)):
+            frame = self._ring[(self._head + i) % self.capacity]
+            out.append(frame[netcodec.HEADER_LEN:])
+        return out
+
+    def __len__(self) -> int:
+        return self._count
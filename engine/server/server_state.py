@@ -2,11 +2,17 @@
 """Server state management module"""
 import os
 import json
+import hashlib
 import socket
 import threading
 import subprocess
 import platform
 import config
+from engine.core import netcodec
+from engine.server.history_store import HistoryStore
+from engine.server.recent_cache import RecentCommands
+from engine.server.checkpoints import CheckpointStore
+from engine.server.desync import DesyncMonitor
 
 def get_local_ip_addresses():
     """Get all local IP addresses of this machine including virtual ones like ZeroTier
@@ -75,11 +81,12 @@ def get_local_ip_addresses():
     
     return list(local_ips)  # Convert set back to list
 
-def initialize(session_dir=None):
+def initialize(session_dir=None, history_cache=None):
     """Initialize server state
     
     Args:
         session_dir (str, optional): Session directory
+        history_cache (int, optional): Recent commands kept in memory
         
     Returns:
         dict: Server state or None if initialization failed
@@ -87,20 +94,31 @@ def initialize(session_dir=None):
     try:
         # Set session directory
         session_dir = session_dir or os.getcwd()
-        history_path = os.path.join(session_dir, config.HISTORY_FILE)
         
         # Create server socket
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         server_socket.bind((config.SERVER_HOST, config.SERVER_PORT))
         
-        # Initialize history file if it doesn't exist
-        if not os.path.exists(history_path):
-            with open(history_path, 'w') as f:
-                json.dump([], f)
+        # Open the append-only history (migrates a legacy history.json once)
+        history = HistoryStore(session_dir)
         
         # Get initial sequence number
-        sequence_number = get_highest_sequence(history_path)
+        sequence_number = get_highest_sequence(history)
+        
+        # Warm the in-memory window with the tail of the history
+        if history_cache is None:
+            history_cache = config.HISTORY_CACHE_SIZE
+        recent = warm_recent_cache(history, history_cache)
+        
+        # Client snapshot identity, offered to clients in the hello
+        client_snapshot = load_snapshot_info(session_dir)
+        
+        # Latest quorum-trusted world checkpoint, sent to joining clients
+        checkpoints = CheckpointStore(session_dir)
+        
+        # Clients' sampled world hashes, compared to spot a desync
+        desync = DesyncMonitor(session_dir)
         
         # Get local IP addresses for display
         local_ips = get_local_ip_addresses()
@@ -109,36 +127,81 @@ def initialize(session_dir=None):
         return {
             'socket': server_socket,
             'clients': [],
-            'lock': threading.Lock(),
+            'lock': threading.RLock(),
             'session_dir': session_dir,
-            'history_path': history_path,
+            'history': history,
             'sequence_number': sequence_number,
+            'recent': recent,
+            'client_snapshot': client_snapshot,
+            'checkpoints': checkpoints,
+            'desync': desync,
             'local_ips': local_ips
         }
     except Exception as e:
         print(f"Error initializing server: {e}")
         return None
 
-def get_highest_sequence(history_path):
-    """Get the highest sequence number from history file
+def get_highest_sequence(history):
+    """Get the highest sequence number from the history store
     
     Args:
-        history_path (str): Path to history file
+        history (HistoryStore): Open history store
         
     Returns:
         int: Highest sequence number
     """
-    try:
-        with open(history_path, 'r') as f:
-            history = json.load(f)
-        
-        if not history:
-            return 0
+    # The store reads it from the tail segment on open – no full scan
+    return history.highest
+
+
+def warm_recent_cache(history, capacity):
+    """Build the recent-command window from the tail of the history
+    
+    Args:
+        history (HistoryStore): Open history store
+        capacity (int): Number of commands to keep in memory
         
-        # Find highest sequence number
-        highest_seq = max(cmd.get("seq", 0) for cmd in history)
-        return highest_seq
+    Returns:
+        RecentCommands: Window holding up to *capacity* encoded frames
+    """
+    recent = RecentCommands(capacity)
+    first = max(history.highest - recent.capacity + 1, 1)
+    for line in history.read_raw(first, recent.capacity):
+        recent.push(json.loads(line)["seq"], netcodec.frame(line))
+    return recent
+
+
+def load_snapshot_info(session_dir):
+    """Describe the session's client snapshot zip
+    
+    Args:
+        session_dir (str): Session directory
         
-    except Exception as e:
-        print(f"Error reading history file: {e}")
-        return 0
\ No newline at end of file
+    Returns:
+        dict: {"path", "name", "size", "sha256"} or None if there is no zip
+    """
+    snap_dir = os.path.join(session_dir, config.SNAPSHOT_DIR)
+    zip_path = os.path.join(snap_dir, config.CLIENT_ZIP_NAME)
+    if not os.path.exists(zip_path):
+        return None
+
+    sha = None
+    meta_path = os.path.join(snap_dir, config.SNAPSHOT_META_FILE)
+    try:
+        with open(meta_path, 'r') as f:
+            sha = json.load(f).get("client_sha256")
+    except (OSError, ValueError):
+        pass
+    if not sha:
+        h = hashlib.sha256()
+        with open(zip_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                h.update(chunk)
+        sha = h.hexdigest()
+
+    return {
+        "path": zip_path,
+        "name": config.CLIENT_ZIP_NAME,
+        "size": os.path.getsize(zip_path),
+        "sha256": sha,
+    }
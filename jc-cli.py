@@ -13,6 +13,7 @@ Available commands:
   join-session <session-name> <client-name> [server-ip]
                                           - Join a session as a client
   list-sessions                            - List available sessions
+  replay-all [scripts-dir] [workers]       - Replay every session (vs. scripts-dir)
 
 Project Management:
   create-project <project-name> [description]   - Create a new project
@@ -41,6 +42,7 @@ from engine.core import utils
 from engine.core import session_manager
 from engine.core import client_manager
 from engine.core import project_manager
+from engine.core import replay_farm
 
 def show_help():
     """Display available commands"""
@@ -50,6 +52,7 @@ def show_help():
     print("  continue-session <session-name>                                    - Continue an existing session")
     print("  join-session <session-name> <client-name> [server-ip]              - Join a session as a client")
     print("  list-sessions                                                      - List available sessions")
+    print("  replay-all [scripts-dir] [workers]                                 - Replay every session, comparing against scripts-dir")
     
     # Project management commands
     print("\nProject Management:")
@@ -127,6 +130,10 @@ def interactive_shell():
             client_name = args[2]
             server_ip = args[3] if len(args) > 3 else None
             client_manager.join_session(session_name, client_name, server_ip) # Call function from client_manager
+        elif command == "replay-all":
+            scripts = args[1] if len(args) > 1 else None
+            workers = int(args[2]) if len(args) > 2 else config.REPLAY_WORKERS
+            replay_farm.replay_all(config.SESSIONS_DIR, scripts, workers)
             
         # Project management commands
         elif command == "create-project":
@@ -246,6 +253,10 @@ def main():
             client_manager.join_session(session_name, client_name, server_ip)
         elif command == "list-sessions":
             session_manager.list_sessions()
+        elif command == "replay-all":
+            scripts = args[1] if len(args) > 1 else None
+            workers = int(args[2]) if len(args) > 2 else config.REPLAY_WORKERS
+            replay_farm.replay_all(config.SESSIONS_DIR, scripts, workers)
             
         # Project management commands
         elif command == "create-project":
@@ -4,50 +4,114 @@ Game-agnostic Orchestrator
 
 - Recursively scans scripts/commands/** for Python files whose first line is
       NAME = "some_command"
-  and builds a {command_name: script_path} registry.
+  and builds a {command_name: script_path} registry.  The scan is indexed
+  in data/script_index.json (engine/core/registry.py), so only scripts
+  changed since the last command are opened.
 
 - When the player enters a command, the orchestrator looks it up in that
   registry, runs the script in a subprocess, and then invokes rule_loop.py.
 
+- ``run()`` takes the script runner as a parameter, so a long-lived
+  executor (engine/client/executor.py) can import this module and run the
+  same flow without spawning interpreters.
+
+- A command script that defines
+      def run(world, argv, ctx): ...
+  next to NAME is called in-process on the world dict (ctx = {"player",
+  "command"}) and returns what it would have passed to sys.exit; a failed
+  command leaves the world untouched.  Scripts without ``run`` keep their
+  file-based contract.
+
+- In-memory world mode (``--world-in-memory`` / ``run(world_in_memory=True)``):
+  the world is loaded once per command, handed to the command and then to
+  the rule loop (rule_loop.apply_rules), and data/world.json is written once
+  at the end.
+
+- With a seq (``--seq N`` / ``run(seq=N)``, passed by the sequencer) and
+  WORLD_PATCHES on, what the command changed is appended to
+  data/world_patches.ndjson as a JSON Patch (engine/core/world_patch.py);
+  the rule loop adds one line per rule.  The seq reaches the rule loop and
+  the scripts as JC_SEQ in the environment.
+
 Exit codes
 ----------
 0  – command + rule loop succeeded
 1+ – an error occurred (details printed to console)
 """
-import os, sys, shlex, subprocess, json, re, pathlib
+import os, sys, shlex, subprocess, pathlib, importlib.util, traceback
+
+import config
+from engine.core import registry, world_patch, world_store
 
 CWD           = pathlib.Path.cwd()
 COMMANDS_DIR  = CWD / "scripts" / "commands"
 RULE_LOOP_PY  = CWD / "rule_loop.py"
 WORLD_FILE    = CWD / "data" / "world.json"
-NAME_PATTERN  = re.compile(r'NAME\s*=\s*["\'](.+?)["\']')
+INDEX_FILE    = CWD / "data" / registry.INDEX_FILE
+PATCH_FILE    = CWD / "data" / "world_patches.ndjson"
 
 def _discover_commands(folder: pathlib.Path = COMMANDS_DIR) -> dict[str, str]:
-    registry: dict[str, str] = {}
-    for path in folder.rglob("*.py"):
-        try:
-            with path.open() as fh:
-                for line in fh:
-                    s = line.strip()
-                    if not s or s.startswith("#"):
-                        continue
-                    m = NAME_PATTERN.match(s)
-                    if m:
-                        registry[m.group(1)] = str(path)
-                    break
-        except OSError:
-            pass
-    return registry
-
-COMMANDS = _discover_commands()
+    # indexed in data/script_index.json; only changed files are re-read
+    return registry.discover(folder, str(INDEX_FILE))
+
+def _run_script(path: str, argv: list[str], env: dict | None = None,
+                stdin: bytes | None = None) -> tuple[int, bytes, bytes]:
+    """Default runner: a fresh interpreter per script -> (exit code, stdout, stderr)."""
+    # Create a copy of the environment and add e.g. the player name
+    full_env = os.environ.copy()
+    full_env.update(env or {})
+    proc = subprocess.run([sys.executable, path, *argv],
+                          env=full_env, input=stdin, capture_output=True)
+    return proc.returncode, proc.stdout, proc.stderr
+
+_run_script.threadsafe = True   # the rule loop's PARALLEL_RULES may use it from several threads
+
+def _load_module(path: str) -> dict:
+    """Default loader: import *path* (not as __main__) -> its namespace."""
+    spec = importlib.util.spec_from_file_location(pathlib.Path(path).stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return vars(module)
+
+def _has_handler(path: str) -> bool:
+    return registry.has_handler(path)
+
+def _echo(out: bytes, err: bytes):
+    # Show both stdout and stderr regardless of success or failure
+    if out:
+        sys.stdout.write(out.decode("utf-8", errors="replace"))
+    if err:
+        sys.stderr.write(err.decode("utf-8", errors="replace"))
 
 def _ensure_world():
-    WORLD_FILE.parent.mkdir(parents=True, exist_ok=True)
     if not WORLD_FILE.exists():
-        WORLD_FILE.write_text(json.dumps({"counter": 0}, indent=2))
+        world_store.save({"counter": 0}, WORLD_FILE)
+
+def _load_world() -> dict:
+    try:
+        return world_store.load(WORLD_FILE)
+    except Exception as e:
+        print(f"!!! ERROR: Failed to load world data: {e}")
+        return {}
+
+def _save_world(world: dict):
+    world_store.save(world, WORLD_FILE)
 
-def _execute_command(cmd: str, argv: list[str], username: str) -> bool:
-    script = COMMANDS.get(cmd)
+def _call_handler(script: str, world: dict, argv: list[str], ctx: dict,
+                  load_module) -> bool:
+    try:
+        code = load_module(script)["run"](world, argv, ctx)
+    except SystemExit as e:
+        code = e.code
+    except Exception:
+        traceback.print_exc()
+        return False
+    return code in (None, 0)
+
+def _execute_command(commands: dict, cmd: str, argv: list[str], username: str,
+                     run_script=_run_script, load_module=_load_module,
+                     held: dict | None = None) -> bool:
+    script = commands.get(cmd)
     if not script:
         print(f"ERROR! Unknown command: {cmd}")
         return False
@@ -55,70 +119,145 @@ def _execute_command(cmd: str, argv: list[str], username: str) -> bool:
         print(f"ERROR! Script not found: {script}")
         return False
     
-    # Create a copy of the environment and add the player name
-    env = os.environ.copy()
-    env["PLAYER"] = username
-    
     #print(f"→ {cmd} ► {script} {argv}")
 
     print(f"-> {cmd} > {script} {argv}")
-    # Run with full output captured and displayed, but don't use check=True
-    # so we can still return a boolean success value
-    result = subprocess.run([sys.executable, script, *argv], 
-                           env=env, capture_output=True, text=True)
-    
-    # Show both stdout and stderr regardless of success or failure
-    if result.stdout:
-        sys.stdout.write(result.stdout)
-    if result.stderr:
-        sys.stderr.write(result.stderr)
-    
-    # Return success/failure based on exit code
-    return result.returncode == 0
+    if _has_handler(script):
+        # Opt-in script: call run(world, argv, ctx) on the loaded world.
+        # With *held* (in-memory mode) the caller keeps the world and saves it.
+        world = _load_world()
+        ok = _call_handler(script, world, argv, {"player": username, "command": cmd},
+                           load_module)
+        if held is not None:
+            # a failed command leaves the world as it was (still on disk)
+            held["world"] = world if ok else _load_world()
+            held["dirty"] = ok
+        elif ok:
+            _save_world(world)
+        return ok
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: orchestrator.py <command-text> [username]")
-        sys.exit(1)
+    # Run with full output captured and displayed, and return a
+    # boolean success value based on the exit code
+    code, out, err = run_script(script, argv, {"PLAYER": username})
+    _echo(out, err)
+    return code == 0
 
+def _run_rule_loop(run_script=_run_script) -> int:
+    code, out, err = run_script(str(RULE_LOOP_PY), [])
+    _echo(out, err)
+    return code
+
+def _run_in_memory(commands: dict, cmd: str, argv: list[str], username: str,
+                   run_script, load_module, on_command=None) -> tuple[bool, int]:
+    """
+    One tick with a single world load/save -> (command ok, rule loop code).
+    *on_command* is called with the world after the command.
+    """
+    held: dict = {}
+    command_success = _execute_command(commands, cmd, argv, username,
+                                       run_script, load_module, held)
+    if "world" not in held:
+        # Legacy scripts read and write data/world.json themselves
+        held = {"world": _load_world(), "dirty": False}
+    if on_command:
+        on_command(held["world"])
+
+    rule_loop = load_module(str(RULE_LOOP_PY))
+    if "apply_rules" not in rule_loop:
+        # rule_loop.py copied into an older client: let it use the file
+        if held["dirty"]:
+            _save_world(held["world"])
+        return command_success, _run_rule_loop(run_script)
+
+    world, changed = rule_loop["apply_rules"](held["world"], run_script, load_module)
+    if held["dirty"] or changed:
+        _save_world(world)
+    return command_success, 0 if changed else 9
+
+def _record_patch(seq: int, cmd: str, before: dict, after: dict):
+    patch = world_patch.diff(before, after)
+    if patch:
+        try:
+            world_patch.append(str(PATCH_FILE), [{"seq": seq, "step": "command",
+                                                  "name": cmd, "patch": patch,
+                                                  "undo": world_patch.diff(after, before)}])
+        except OSError as e:
+            print(f"!!! ERROR: Failed to record the world patch: {e}")
+
+def run(raw: str, username: str, run_script=_run_script, run_rules=None,
+        world_in_memory: bool = False, load_module=_load_module,
+        seq: int | None = None) -> int:
+    """
+    Execute one command line for *username* and then the rule loop.
+    Returns the orchestrator exit code (0 ok, 1 error).
+
+    *run_script* runs a single script (see ``_run_script``); *run_rules*
+    runs the rule loop and returns its exit code.  *load_module* loads
+    scripts that define ``run``; with *world_in_memory* it also loads the
+    rule loop, and *run_rules* is not used.  *seq* is the command's place
+    in the session, for the patch journal.
+    """
     _ensure_world()
-    raw = sys.argv[1]
-    
-    # Extract username from arguments or use default
-    username = sys.argv[2] if len(sys.argv) > 2 else "unknown_player"
-    
     args = shlex.split(raw)
     if not args:
         print("Empty command")
-        sys.exit(1)
+        return 1
     cmd, argv = args[0], args[1:]
 
     if cmd == "exit":
-        sys.exit(0)
+        return 0
 
-    # Execute the command, capturing the success/failure
-    command_success = _execute_command(cmd, argv, username)
-    
-    # Always run the rule loop, even if the command failed
-    rule_result = subprocess.run([sys.executable, RULE_LOOP_PY], 
-                               capture_output=True, text=True)
-    
-    # Show rule loop output
-    if rule_result.stdout:
-        sys.stdout.write(rule_result.stdout)
-    if rule_result.stderr:
-        sys.stderr.write(rule_result.stderr)
+    patches = seq is not None and getattr(config, "WORLD_PATCHES", True)
+    before = _load_world() if patches else None
+    saved_seq = os.environ.get("JC_SEQ")
+    if seq is not None:
+        os.environ["JC_SEQ"] = str(seq)
+    try:
+        if world_in_memory:
+            command_success, rule_code = _run_in_memory(
+                _discover_commands(), cmd, argv, username, run_script, load_module,
+                (lambda world: _record_patch(seq, cmd, before, world)) if patches else None)
+        else:
+            # Execute the command, capturing the success/failure
+            command_success = _execute_command(_discover_commands(), cmd, argv, username,
+                                               run_script, load_module)
+            if patches:
+                _record_patch(seq, cmd, before, _load_world())
+
+            # Always run the rule loop, even if the command failed
+            rule_code = run_rules() if run_rules else _run_rule_loop(run_script)
+    finally:
+        if saved_seq is None:
+            os.environ.pop("JC_SEQ", None)
+        else:
+            os.environ["JC_SEQ"] = saved_seq
     
     # Exit with success only if both command and rules succeeded
     # But we've already displayed all error information
     if not command_success:
         print(f"ERROR! Command '{cmd}' failed")
-        sys.exit(1)
-    elif rule_result.returncode not in (0, 9):
-        print(f"ERROR! Rule loop failed with code {rule_result.returncode}")
-        sys.exit(1)
+        return 1
+    elif rule_code not in (0, 9):
+        print(f"ERROR! Rule loop failed with code {rule_code}")
+        return 1
     
-    sys.exit(0)
+    return 0
+
+def main():
+    args, seq = [], None
+    rest = iter(sys.argv[1:])
+    for a in rest:
+        if a == "--seq":
+            seq = int(next(rest, "0"))
+        elif a != "--world-in-memory":
+            args.append(a)
+    if not args:
+        print("Usage: orchestrator.py <command-text> [username] [--world-in-memory] [--seq N]")
+        sys.exit(1)
+
+    # Extract username from arguments or use default
+    username = args[1] if len(args) > 1 else "unknown_player"
+    sys.exit(run(args[0], username, world_in_memory="--world-in-memory" in sys.argv, seq=seq))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+JC-CLI Headless Replay
+Re-runs a recorded session through the orchestrator / rule loop without a
+server, client or sequencer, and writes the final world, a per-seq world
+hash trail and timings (engine/core/replay.py).
+
+Run from the project root:
+  python replay.py --session sessions/demo
+  python replay.py --history history.json --world initial_world.json --scripts scripts
+"""
+import argparse
+import os
+import sys
+
+import config
+from engine.core import replay, world_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JC-CLI headless session replay")
+    parser.add_argument("--session", help="Session directory (history, initial world, snapshot)")
+    parser.add_argument("--history", help="history/ folder, .ndjson segment or history.json")
+    parser.add_argument("--world", help="Initial world JSON")
+    parser.add_argument("--scripts", help="Scripts folder to use instead of the snapshot's")
+    parser.add_argument("--executor", choices=["subprocess", "inprocess", "pool"],
+                        default="inprocess", help="How commands are run (default: inprocess)")
+    parser.add_argument("--out", help=f"Report folder (default: {config.REPLAYS_DIR}/<name>)")
+    parser.add_argument("--workdir", help="Keep the client directory here instead of a temp one")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show every command's output")
+    args = parser.parse_args()
+
+    if not args.session and not (args.history and args.world):
+        parser.error("give --session, or both --history and --world")
+
+    name = os.path.basename(os.path.normpath(args.session or os.path.dirname(
+        os.path.abspath(args.history))))
+    out_dir = args.out or os.path.join(config.REPLAYS_DIR, name)
+
+    result = replay.replay_session(args.session, args.history, args.world, args.scripts,
+                                   args.executor, args.workdir, args.verbose)
+    replay.write_report(out_dir, result)
+
+    t = result["timings"]
+    print(f"Replayed {t['commands']} commands in {t['total_s']} s "
+          f"({t['commands_per_s']} cmd/s, p50 {t['p50_ms']} ms, p95 {t['p95_ms']} ms), "
+          f"{t['failed']} failed")
+    print(f"Final world sha256 {world_store.digest(result['final_world'])}")
+    cp = result["checkpoint"]
+    if cp:
+        state = "matches" if cp["match"] else "DOES NOT MATCH"
+        print(f"Trusted checkpoint at seq {cp['seq']} {state} the replay")
+    print(f"Report written to {out_dir}")
+    sys.exit(1 if cp and not cp["match"] else 0)
+
+
+if __name__ == "__main__":
+    main()
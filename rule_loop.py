@@ -4,11 +4,56 @@ Game-agnostic Rule Loop
 
 • Recursively scans scripts/rules/** for Python files whose first line is
       NAME = "rule_id"
-  and builds {rule_id: script_path}.
+  and builds {rule_id: script_path} (indexed like the orchestrator's
+  commands, see engine/core/registry.py).
 
 • World['rules_in_power'] (optional list) controls which rules actually run;
   if the list is missing, *all* discovered rules are executed.
 
+• ``main()`` takes the script runner and module loader as parameters (see
+  orchestrator.py).
+
+• A rule that defines
+      def run(world, argv, ctx): ...
+  next to NAME is called in-process on the live world dict instead of being
+  fed JSON on stdin; it returns what it would have passed to sys.exit
+  (0 / None = changed, 9 = no change).  Other rules run as usual.
+
+• ``apply_rules()`` runs the loop on a world dict the caller already holds
+  (the orchestrator's in-memory mode) instead of data/world.json.
+
+• A rule may declare the world paths it reads next to NAME:
+      READS = ["counter", "players.*.hp"]
+  With SELECTIVE_RULES it is skipped when none of them changed since it
+  last ran (engine/core/world_diff.py; the last loop's result is kept in
+  data/rules_base.json).  Rules without READS always run, and so do rules
+  that are new to rules_in_power or whose script changed.
+  VERIFY_SKIPPED_RULES runs skippable rules on a copy of the world and
+  warns when one of them would change it – its READS are incomplete; the
+  copy is thrown away, so the loop's result is the same as without it.
+
+• With RULES_FIXPOINT the loop does not stop after one pass: a rule whose
+  inputs another rule changed (exit 0) since it last ran is run again, in
+  rules_in_power order, until nothing is due (``_settle``).  Inputs are its
+  READS, or any change at all when it declares none; its own writes don't
+  count.  RULES_MAX_PASSES caps the passes, and a pass that would start
+  from an already seen world and worklist is reported as a cycle.
+
+• With PARALLEL_RULES, consecutive rules that also declare
+      WRITES = ["players.*.hp"]
+  and don't read or write what an earlier one of them writes run as one
+  wave, side by side (``_run_wave``; RULE_WORKERS at once).  Their results
+  are checked against WRITES and merged in rules_in_power order, so the
+  world is the one a serial pass gives.  A rule that wrote elsewhere makes
+  the wave run again one by one, or raises RuleConflict with
+  RULE_CONFLICTS = "fail".  Only runners marked ``threadsafe`` (the
+  subprocess runner and the worker pool) are used this way; fixpoint
+  passes stay serial.
+
+• With WORLD_PATCHES and a JC_SEQ from the orchestrator, every rule that
+  changed the world adds a JSON Patch line to data/world_patches.ndjson
+  (engine/core/world_patch.py).
+
 Exit codes
 ----------
 0  – at least one rule modified the world
@@ -16,35 +61,59 @@ Exit codes
 1+ – an error occurred
 """
 
-import json, sys, subprocess, pathlib, re
+import json, os, sys, subprocess, pathlib, importlib.util, traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from engine.core import registry, world_diff, world_patch, world_store
 
 CWD           = pathlib.Path.cwd()
 RULES_DIR     = CWD / "scripts" / "rules"
 WORLD_FILE    = CWD / "data" / "world.json"
-NAME_PATTERN  = re.compile(r'NAME\s*=\s*["\'](.+?)["\']')
+INDEX_FILE    = CWD / "data" / registry.INDEX_FILE
+BASE_FILE     = CWD / "data" / "rules_base.json"    # last loop's result, for READS checks
+PATCH_FILE    = CWD / "data" / "world_patches.ndjson"
 
 def _discover_rules(folder: pathlib.Path = RULES_DIR) -> dict[str, str]:
-    registry: dict[str, str] = {}
-    for path in folder.rglob("*.py"):
-        try:
-            with path.open() as fh:
-                for line in fh:
-                    s = line.strip()
-                    if not s or s.startswith("#"):
-                        continue
-                    m = NAME_PATTERN.match(s)
-                    if m:
-                        registry[m.group(1)] = str(path)
-                    break
-        except OSError:
-            print(f"!!! ERROR: Cannot read rule script at {path}")
-    return registry
-
-RULES = _discover_rules()
+    # indexed in data/script_index.json; only changed files are re-read
+    return registry.discover(folder, str(INDEX_FILE))
+
+def _run_script(path: str, argv: list[str], env: dict | None = None,
+                stdin: bytes | None = None) -> tuple[int, bytes, bytes]:
+    """Default runner: a fresh interpreter per script -> (exit code, stdout, stderr)."""
+    full_env = os.environ.copy()
+    full_env.update(env or {})
+    proc = subprocess.run([sys.executable, path, *argv],
+                          env=full_env, input=stdin, capture_output=True)
+    return proc.returncode, proc.stdout, proc.stderr
+
+_run_script.threadsafe = True   # PARALLEL_RULES may call it from several threads
+
+def _load_module(path: str) -> dict:
+    """Default loader: import *path* (not as __main__) -> its namespace."""
+    spec = importlib.util.spec_from_file_location(pathlib.Path(path).stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return vars(module)
+
+def _call_handler(rid: str, path: str, world: dict, load_module) -> bool:
+    try:
+        code = load_module(path)["run"](world, [], {"rule": rid})
+    except SystemExit as e:
+        code = e.code
+    except Exception:
+        print(f"!!! ERROR: Rule {rid} raised an exception")
+        traceback.print_exc()
+        return False
+    if code in (None, 0):
+        return True
+    if code != 9:
+        print(f"!!! ERROR: Rule {rid} exited with code {code}")
+    return False
 
 def _load_world() -> dict:
     try:
-        return json.loads(WORLD_FILE.read_text())
+        return world_store.load(WORLD_FILE)
     except Exception as e:
         # Show raw error but use empty world to allow continuation
         print(f"!!! ERROR: Failed to load world data: {e}")
@@ -52,71 +121,338 @@ def _load_world() -> dict:
 
 def _save_world(world: dict):
     try:
-        WORLD_FILE.parent.mkdir(parents=True, exist_ok=True)
-        WORLD_FILE.write_text(json.dumps(world, indent=2))
+        world_store.save(world, WORLD_FILE)
     except Exception as e:
         print(f"!!! ERROR: Failed to save world data: {e}")
         # Don't handle the error - let caller see the raw failure
 
-def _run_rule(rid: str, path: str, world: dict) -> tuple[dict, bool]:
+def _run_rule(rid: str, path: str, world: dict, run_script=_run_script) -> tuple[dict, bool]:
     print(f"Running rule: {rid} => {path}")
     try:
         # Pass the world data as input to the rule script
         # Show raw output for maximum transparency
-        proc = subprocess.run(
-            [sys.executable, path],
-            input=json.dumps(world).encode(),
-            capture_output=True
-        )
+        returncode, stdout, stderr = run_script(path, [], None, json.dumps(world).encode())
         
         # Show any stderr output - errors should be visible
-        if proc.stderr:
-            sys.stderr.write(proc.stderr.decode('utf-8', errors='replace'))
+        if stderr:
+            sys.stderr.write(stderr.decode('utf-8', errors='replace'))
         
         # Try to parse output, but show raw error if it fails
         try:
-            new_world = json.loads(proc.stdout or b"{}")
+            new_world = json.loads(stdout or b"{}")
         except json.JSONDecodeError as e:
             print(f"!!! ERROR: Rule {rid} returned invalid JSON: {e}")
-            print(f"Raw output: {proc.stdout[:200]}...")  # First 200 chars of output
+            print(f"Raw output: {stdout[:200]}...")  # First 200 chars of output
             return world, False  # Return original world unchanged
     except Exception as e:
         print(f"!!! ERROR: Rule {rid} failed to execute: {e}")
         return world, False
     
-    if proc.returncode == 0:
+    if returncode == 0:
         return new_world, True
-    if proc.returncode == 9:
+    if returncode == 9:
         return new_world, False
     
-    print(f"!!! ERROR: Rule {rid} exited with code {proc.returncode}")
+    print(f"!!! ERROR: Rule {rid} exited with code {returncode}")
     return new_world, False
 
-def main():
-    if not RULES:
+def apply_rules(world: dict, run_script=_run_script,
+                load_module=_load_module) -> tuple[dict, bool]:
+    """Run the active rules on *world* -> (world, changed)."""
+    rules = _discover_rules()
+    if not rules:
         print("!!! WARNING: No rules found.")
-        sys.exit(9)  # No changes
+        return world, False
+    return _apply(rules, world, run_script, load_module)
+
+def _load_base() -> dict | None:
+    try:
+        return world_store.load(BASE_FILE)
+    except Exception:
+        return None         # first loop, or unreadable: run every rule
+
+def _save_base(world: dict, changed: set, signatures: dict):
+    try:
+        world_store.save({"world": world, "changed": sorted(changed), "rules": signatures},
+                         BASE_FILE)
+    except Exception as e:
+        print(f"!!! ERROR: Failed to save {BASE_FILE.name}: {e}")
+
+def _run_one(rid: str, path: str, meta: dict, world: dict, track: bool,
+             run_script, load_module, seq: int | None = None) -> tuple[dict, bool, set]:
+    """
+    Run one rule -> (world, changed, changed paths if *track*).  With a
+    *seq*, what it changed goes to the patch journal.
+    """
+    before = world
+    if meta["run"]:
+        if track or seq is not None:
+            before = json.loads(json.dumps(world))     # the handler edits in place
+        print(f"Running rule: {rid} => {path}")
+        did = _call_handler(rid, path, world, load_module)
+    else:
+        world, did = _run_rule(rid, path, world, run_script)
+    # not by the exit code alone: a failing rule's output is kept too
+    delta = world_diff.changed_paths(before, world) if track else set()
+    if seq is not None:
+        _journal(seq, rid, before, world)
+    return world, did, delta
+
+def _verify_skipped(rid: str, path: str, meta: dict, world: dict, run_script,
+                    load_module):
+    """
+    VERIFY_SKIPPED_RULES: run a rule selective evaluation skipped on a copy
+    of *world* and warn if it would have changed it.  The copy is dropped.
+    """
+    copy = json.loads(json.dumps(world))
+    _, _, delta = _run_one(rid, path, meta, copy, True, run_script, load_module)
+    if delta:
+        print(f"!!! WARNING: Rule {rid} would change {sorted(delta)} although its READS "
+              f"were untouched – its READS declaration is incomplete (change not applied)")
 
-    world = _load_world()
+def _patch_seq() -> int | None:
+    """The seq whose rule patches are journaled (JC_SEQ, set by the orchestrator)."""
+    if not getattr(config, "WORLD_PATCHES", True):
+        return None
+    try:
+        return int(os.environ["JC_SEQ"])
+    except (KeyError, ValueError):
+        return None
+
+def _journal(seq: int, rid: str, before: dict, after: dict):
+    # written at once: the patch shares values with the live world
+    patch = world_patch.diff(before, after)
+    if patch:
+        try:
+            world_patch.append(str(PATCH_FILE), [{"seq": seq, "step": "rule",
+                                                  "name": rid, "patch": patch,
+                                                  "undo": world_patch.diff(after, before)}])
+        except OSError as e:
+            print(f"!!! ERROR: Failed to record the world patch: {e}")
+
+def _propagate(pending: dict, rid: str, delta: set):
+    """*rid* just ran: everyone else has *delta* to see, *rid* is up to date."""
+    for other in pending:
+        if other != rid:        # a rule's own writes don't queue it again
+            pending[other] |= delta
+    pending[rid] = set()
+
+def _due(pending: set, reads) -> bool:
+    """Did anything a rule reads change since it last ran?  (No READS: anything.)"""
+    if not pending:
+        return False
+    return reads is None or world_diff.affects(pending, reads)
+
+class RuleConflict(Exception):
+    """Rules run side by side wrote outside their WRITES (RULE_CONFLICTS = "fail")."""
+
+def _independent(meta: dict, wave: list) -> bool:
+    """
+    May this rule run side by side with the rules of *wave*?  It must
+    declare READS and WRITES, and no rule before it in the wave may write
+    what it reads or writes.  (It writing what they read is fine: they
+    run before it, so they don't see its writes either way.)
+    """
+    if meta["reads"] is None or meta["writes"] is None:
+        return False
+    return not any(world_diff.affects(m["writes"], meta["reads"] + meta["writes"])
+                   for _, _, m in wave)
+
+def _run_wave(wave: list, world: dict, run_script, load_module,
+              seq: int | None = None) -> tuple[dict, list]:
+    """
+    Run *wave*'s rules on the same world at once -> (world, [(changed,
+    changed paths)] in wave order).  Script rules run on RULE_WORKERS
+    threads, each driving its own process; rules with run() go on copies
+    in this thread meanwhile.  Every result is checked against its WRITES
+    and merged in rules_in_power order, the same world a serial pass gives.
+    """
+    if len(wave) == 1:
+        rid, path, meta = wave[0]
+        world, did, delta = _run_one(rid, path, meta, world, True, run_script, load_module, seq)
+        return world, [(did, delta)]
+
+    print(f"Running rules side by side: {', '.join(w[0] for w in wave)}")
+    workers = getattr(config, "RULE_WORKERS", 0) or os.cpu_count() or 1
+    outs = []
+    with ThreadPoolExecutor(max_workers=min(workers, len(wave))) as pool:
+        jobs = {rid: pool.submit(_run_rule, rid, path, world, run_script)
+                for rid, path, meta in wave if not meta["run"]}
+        for rid, path, meta in wave:
+            if meta["run"]:
+                copy = json.loads(json.dumps(world))
+                print(f"Running rule: {rid} => {path}")
+                outs.append((copy, _call_handler(rid, path, copy, load_module)))
+            else:
+                outs.append(jobs[rid].result())
+
+    keys = [world_diff.changed_keys(world, out) for out, _ in outs]
+    paths = [{world_diff.dotted(k) for k in ks} for ks in keys]
+    stray = [rid for (rid, _, meta), p in zip(wave, paths)
+             if not world_diff.within(p, meta["writes"])]
+    if stray:
+        message = f"Wrote outside the declared WRITES: {', '.join(stray)}"
+        if getattr(config, "RULE_CONFLICTS", "serial") == "fail":
+            raise RuleConflict(message)
+        print(f"!!! WARNING: {message} – running the wave one by one")
+        results = []
+        for rid, path, meta in wave:
+            world, did, delta = _run_one(rid, path, meta, world, True, run_script,
+                                         load_module, seq)
+            results.append((did, delta))
+        return world, results
+
+    for (rid, _, _), (out, _), ks in zip(wave, outs, keys):
+        before = json.loads(json.dumps(world)) if seq is not None and ks else None
+        world_diff.merge(world, out, ks)
+        if before is not None:
+            _journal(seq, rid, before, world)
+    return world, [(did, p) for (_, did), p in zip(outs, paths)]
+
+def _apply(rules: dict, world: dict, run_script, load_module) -> tuple[dict, bool]:
     active = world.get("rules_in_power")
     
     # If no rules_in_power specified, run all discovered rules
     if active is None:
-        active = list(RULES.keys())
+        active = list(rules.keys())
     
     changed = False
 
+    # Selective evaluation: a rule that declares READS is skipped when none
+    # of those paths changed since it last ran.  That is everything the
+    # command changed (this world vs. the last loop's result) plus whatever
+    # rules changed during the last loop (a rule may have run before them).
+    selective = getattr(config, "SELECTIVE_RULES", False)
+    verify = getattr(config, "VERIFY_SKIPPED_RULES", False)
+    fixpoint = getattr(config, "RULES_FIXPOINT", False)
+    seq = _patch_seq()
+    # side by side only if the runner may be called from several threads
+    parallel = getattr(config, "PARALLEL_RULES", False) and getattr(run_script, "threadsafe", False)
+    track = selective or fixpoint or parallel
+    base = _load_base() if selective else None
+    dirty = None
+    if base:
+        dirty = world_diff.changed_paths(base["world"], world) | set(base["changed"])
+    rule_changes: set = set()
+    signatures: dict = {}
+    order: list = []            # (rid, path, meta) in rules_in_power order
+    pending: dict = {}          # rid -> paths other rules changed since it last ran
+    wave: list = []             # (rid, path, meta) waiting to run side by side
+
+    def _done(rid: str, did: bool, delta: set):
+        nonlocal changed
+        changed |= did
+        rule_changes.update(delta)
+        if dirty is not None:
+            dirty.update(delta)
+        _propagate(pending, rid, delta if did else set())
+
     for rid in active:
-        path = RULES.get(rid)
+        path = rules.get(rid)
         if not path:
             print(f"!!! ERROR: Rule '{rid}' specified in rules_in_power but script not found")
             continue  # Continue with other rules
-        
-        world, did = _run_rule(rid, path, world)
+
+        meta = registry.info(path)
+        order.append((rid, path, meta))
+        pending.setdefault(rid, set())
+        signatures[rid] = [meta["mtime"], meta["size"]]
+        skip = (dirty is not None and meta["reads"] is not None
+                and base["rules"].get(rid) == signatures[rid]      # same code, ran before
+                and not world_diff.affects(dirty, meta["reads"]))
+        if skip and not verify:
+            print(f"Skipping rule: {rid} (READS unchanged)")
+            pending[rid] = set()
+            continue
+
+        joins = parallel and not skip and _independent(meta, wave)
+        if wave and not joins:
+            world, results = _run_wave(wave, world, run_script, load_module, seq)
+            for (wid, _, _), (did, delta) in zip(wave, results):
+                _done(wid, did, delta)
+            wave = []
+            joins = parallel and not skip and _independent(meta, wave)
+
+        if skip:
+            _verify_skipped(rid, path, meta, world, run_script, load_module)
+            pending[rid] = set()
+            continue
+        if joins:
+            wave.append((rid, path, meta))
+            continue
+        world, did, delta = _run_one(rid, path, meta, world, track, run_script,
+                                     load_module, seq)
+        _done(rid, did, delta)
+
+    if wave:
+        world, results = _run_wave(wave, world, run_script, load_module, seq)
+        for (wid, _, _), (did, delta) in zip(wave, results):
+            _done(wid, did, delta)
+
+    if fixpoint:
+        world, did = _settle(order, pending, world, run_script, load_module, seq)
         changed |= did
+        # what some rule has not seen yet; a settled loop only leaves paths
+        # nobody reads
+        rule_changes = set().union(*pending.values())
+
+    if selective:
+        _save_base(world, rule_changes, signatures)
+    return world, changed
+
+def _settle(order: list, pending: dict, world: dict, run_script, load_module,
+            seq: int | None = None) -> tuple[dict, bool]:
+    """
+    Fixpoint passes after the first one: in rules_in_power order, re-run
+    every rule whose READS another rule changed (exit 0) since it last ran,
+    until no rule is due.  Stops at RULES_MAX_PASSES, or as soon as a pass
+    would start from a world and worklist seen before (a cycle).
+    """
+    limit = getattr(config, "RULES_MAX_PASSES", 16)
+    changed = False
+    seen: dict = {}             # (world digest, due rules) -> pass that started from it
+    ran: dict = {}              # pass -> rules that changed the world in it
+    number = 1                  # the first pass is _apply's
+    while True:
+        due = tuple(rid for rid, _, meta in order if _due(pending[rid], meta["reads"]))
+        if not due:
+            return world, changed
+        state = (world_store.digest(world), due)
+        if state in seen:
+            ring = [rid for n in range(seen[state], number + 1) for rid in ran[n]]
+            print(f"!!! WARNING: Rule cycle, the world repeats every "
+                  f"{number + 1 - seen[state]} passes: {' -> '.join(ring + ring[:1])}; "
+                  f"stopped after pass {number}")
+            return world, changed
+        if number >= limit:
+            print(f"!!! WARNING: Rules still changing after {limit} passes "
+                  f"(RULES_MAX_PASSES); due: {', '.join(due)}")
+            return world, changed
+        number += 1
+        seen[state] = number
+        ran[number] = []
+        print(f"--- Rule pass {number}: {', '.join(due)}")
+
+        for rid, path, meta in order:
+            if not _due(pending[rid], meta["reads"]):     # due now, perhaps through
+                continue                                  # an earlier rule of this pass
+            world, did, delta = _run_one(rid, path, meta, world, True, run_script,
+                                         load_module, seq)
+            changed |= did
+            if did and delta:
+                ran[number].append(rid)
+            _propagate(pending, rid, delta if did else set())
+
+def main(run_script=_run_script, load_module=_load_module) -> int:
+    """Run the active rules; returns 0 (changed) or 9 (no changes)."""
+    rules = _discover_rules()
+    if not rules:
+        print("!!! WARNING: No rules found.")
+        return 9  # No changes
 
+    world, changed = _apply(rules, _load_world(), run_script, load_module)
     _save_world(world)
-    sys.exit(0 if changed else 9)
+    return 0 if changed else 9
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
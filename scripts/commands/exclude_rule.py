@@ -8,18 +8,17 @@ rules_in_power list.
 
 Usage: exclude <rule_id>
 """
-import json
 import sys
 
+from engine.core import world_store
+
 def load_world():
     """Load the current world state"""
-    with open("data/world.json", "r") as f:
-        return json.load(f)
+    return world_store.load()
 
 def save_world(world):
     """Save the updated world state"""
-    with open("data/world.json", "w") as f:
-        json.dump(world, f, indent=2)
+    world_store.save(world)
 
 def main():
     # Check arguments
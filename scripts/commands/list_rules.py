@@ -7,13 +7,13 @@ Lists all rules in the rule map and shows which ones are currently active.
 
 Usage: rules
 """
-import json
 import sys
 
+from engine.core import world_store
+
 def load_world():
     """Load the current world state"""
-    with open("data/world.json", "r") as f:
-        return json.load(f)
+    return world_store.load()
 
 def main():
     # Load the current world state
@@ -1,4 +1,5 @@
 NAME = "trim_counter"
+READS = ["counter"]
 
 #!/usr/bin/env python3
 """
@@ -8,6 +8,12 @@ import os, sys, json, time, argparse, shlex, subprocess, threading
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 import config
+from engine.core import timeline, world_store
+from engine.client.executor import make_executor
+
+# The byte offset is saved after every pass over the log and every this many
+# commands in between; resuming from an older offset only re-skips lines.
+OFFSET_SAVE_EVERY = 1000
 
 # ---------------------------------------------------------------------------#
 # Helper: read/write cursor                                                  #
@@ -26,6 +32,25 @@ def _write_cursor(path: str, seq: int) -> None:
     with open(path, "w") as fh:
         fh.write(str(seq))
 
+def _read_offset(path: str, cursor: int) -> int:
+    """Byte offset to resume commands.log from, or 0 if it can't be trusted.
+
+    The file also records the cursor it was written with.  An offset saved
+    at an older cursor is still safe – lines up to the cursor are skipped by
+    seq – but one saved *ahead* of the cursor means the cursor was reset
+    (connect/reset), so the log is read from the top.
+    """
+    try:
+        with open(path, "r") as fh:
+            offset, seq = (int(x) for x in fh.read().split())
+    except (FileNotFoundError, ValueError):
+        return 0
+    return offset if seq <= cursor else 0
+
+def _write_offset(path: str, offset: int, seq: int) -> None:
+    with open(path, "w") as fh:
+        fh.write(f"{offset} {seq}")
+
 # ---------------------------------------------------------------------------#
 # Watchdog handler                                                           #
 # ---------------------------------------------------------------------------#
@@ -42,19 +67,32 @@ class _LogEventHandler(FileSystemEventHandler):
 # ---------------------------------------------------------------------------#
 
 class Sequencer:
-    def __init__(self, client_dir: str | None = None):
+    def __init__(self, client_dir: str | None = None, executor: str | None = None):
         self.client_dir = client_dir or os.getcwd()
         self.data_dir   = os.path.join(self.client_dir, "data")
         self.log_file   = os.path.join(self.data_dir, config.COMMANDS_LOG_FILE)
         self.cursor_file= os.path.join(self.data_dir, config.CURSOR_FILE)
-        self.orchestrator = os.path.join(os.path.dirname(__file__), "orchestrator.py")
+        self.offset_file= os.path.join(self.data_dir, config.CURSOR_OFFSET_FILE)
+        self.world_file = os.path.join(self.data_dir, config.WORLD_FILE)
+        self.outbox_dir = os.path.join(self.data_dir, config.OUTBOX_DIR)
+        self.orchestrator = os.path.join(os.path.dirname(os.path.abspath(__file__)), "orchestrator.py")
+        self.executor = make_executor(executor or config.EXECUTOR, self.client_dir, self.orchestrator)
 
         for p in (self.data_dir,):
             os.makedirs(p, exist_ok=True)
         open(self.log_file, "a").close()   # ensure exists
 
         self.cursor = _read_cursor(self.cursor_file)
+        self.offset = _read_offset(self.offset_file, self.cursor)  # end of the last consumed line
+        # journal steps and timeline worlds past the cursor belong to a
+        # world that was reset or replaced; the journal's horizon follows
+        # WORLD_PATCHES
+        timeline.prepare(self.data_dir, self.cursor, config.WORLD_PATCHES)
+        self.pending = {}          # seq -> (cmd, line start) read ahead of the cursor
+        self.hashes = []           # [seq, short world hash] not yet reported
+        self._digest = (None, None)   # (world.json stat key, digest) – unchanged world, no rehash
         self.lock   = threading.Lock()
+        self.again  = threading.Event()   # a change arrived while we were busy
 
         self.observer = Observer()
         self.observer.schedule(_LogEventHandler(self), self.data_dir, recursive=False)
@@ -76,36 +114,141 @@ class Sequencer:
         print("Stopping sequencer.")
         self.observer.stop()
         self.observer.join()
+        self.executor.close()
 
     # ------------------------------------------------------------------ #
 
     def process_new(self):
-        if not self.lock.acquire(blocking=False):
-            return
+        """Run every command that is now next in line.
+
+        Reads ``commands.log`` from the saved byte offset instead of the top,
+        so each line is decoded once.  Lines that arrive ahead of the cursor
+        (e.g. live commands before a history gap is filled) wait in
+        ``pending``; a trailing line without its newline is left for the
+        next event.
+        """
+        self.again.set()
+        while self.again.is_set():
+            if not self.lock.acquire(blocking=False):
+                return      # the running pass will loop once more
+            try:
+                while self.again.is_set():
+                    self.again.clear()
+                    self._read_new()
+            finally:
+                self.lock.release()
+
+    def _read_new(self):
+        with open(self.log_file, "rb") as fh:
+            if os.fstat(fh.fileno()).st_size < self.offset:
+                # log truncated under us (reset) – start over
+                self.offset = 0
+                self.pending.clear()
+            fh.seek(self.offset)
+            while True:
+                line = fh.readline()
+                if not line.endswith(b"\n"):
+                    break   # EOF, or a line the client is still writing
+                start = self.offset
+                self.offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    cmd = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"!!! ERROR: Invalid JSON in command log: {line!r}")
+                    # Continue processing, don't block on invalid JSON
+                    continue
+
+                seq = cmd.get("seq")
+                if not isinstance(seq, int) or seq <= self.cursor:
+                    continue        # already handled
+                if seq != self.cursor + 1:
+                    self.pending.setdefault(seq, (cmd, start))
+                    continue
+
+                self._advance(cmd)
+                while self.cursor + 1 in self.pending:
+                    self._advance(self.pending.pop(self.cursor + 1)[0])
+                if self.cursor % OFFSET_SAVE_EVERY == 0:
+                    self._save_offset()
+        self._save_offset()
+        if self.hashes:
+            self._write_hashes()        # idle: report what we have
+
+    def _advance(self, cmd):
+        # Execute command and ALWAYS advance cursor, even on failure
+        self._execute(cmd)
+        self.cursor = cmd["seq"]
+        _write_cursor(self.cursor_file, self.cursor)
+        if config.CHECKPOINT_INTERVAL and self.cursor % config.CHECKPOINT_INTERVAL == 0:
+            self._write_checkpoint()
+        if config.DESYNC_HASH_EVERY and self.cursor % config.DESYNC_HASH_EVERY == 0:
+            self._sample_hash()
+        if config.TIMELINE_EVERY and self.cursor % config.TIMELINE_EVERY == 0:
+            self._write_timeline()
+
+    def _write_checkpoint(self):
+        # the client uploads it (client_network.flush_outbox) for the
+        # server's checkpoint quorum
+        try:
+            world = world_store.load(self.world_file)
+            report = {
+                "type": "checkpoint",
+                "seq": self.cursor,
+                "sha256": world_store.digest(world),
+                "world": world,
+            }
+            path = os.path.join(self.outbox_dir, f"checkpoint-{self.cursor:08d}.json")
+            world_store.write_text(path, json.dumps(report, separators=(",", ":")))
+        except Exception as exc:
+            print(f"!!! Checkpoint at seq {self.cursor} not written: {exc}")
+
+    def _write_timeline(self):
+        # a full world for the view's rewind / forward to walk the patch
+        # journal from; also bounds the journal to the last TIMELINE_KEEP
+        if not config.WORLD_PATCHES:
+            return          # nothing to walk
+        try:
+            timeline.checkpoint(self.data_dir, self.cursor, self.world_file,
+                                config.TIMELINE_KEEP)
+        except OSError as exc:
+            print(f"!!! Timeline world at seq {self.cursor} not written: {exc}")
+
+    def _world_digest(self):
+        # world_store.save leaves an unchanged world untouched, so the file's
+        # stat identifies its content between writes
+        try:
+            st = os.stat(self.world_file)
+            key = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if self._digest[0] != key:
+                self._digest = (key, world_store.digest(world_store.load(self.world_file)))
+        except (OSError, ValueError):
+            return None
+        return self._digest[1]
+
+    def _sample_hash(self):
+        # sampled seqs are the same on every client, so the server can
+        # compare them (desync detection); a short prefix is plenty for that
+        digest = self._world_digest()
+        if digest:
+            self.hashes.append([self.cursor, digest[:config.DESYNC_HASH_CHARS]])
+        if len(self.hashes) >= config.DESYNC_REPORT_EVERY:
+            self._write_hashes()
+
+    def _write_hashes(self):
+        report = {"type": "world_hashes", "hashes": self.hashes}
+        path = os.path.join(self.outbox_dir, f"hashes-{self.hashes[0][0]:08d}.json")
         try:
-            next_seq = self.cursor + 1
-            with open(self.log_file, "r", encoding="utf-8") as fh:
-                for line in fh:
-                    if not line.strip():
-                        continue
-                    try:
-                        cmd = json.loads(line)
-                    except json.JSONDecodeError:
-                        print(f"!!! ERROR: Invalid JSON in command log: {line}")
-                        # Continue processing, don't block on invalid JSON
-                        continue
-                        
-                    # skip already-handled
-                    if cmd.get("seq") != next_seq:
-                        continue
-
-                    # Execute command and ALWAYS advance cursor, even on failure
-                    self._execute(cmd)
-                    self.cursor = next_seq
-                    _write_cursor(self.cursor_file, self.cursor)
-                    next_seq += 1
-        finally:
-            self.lock.release()
+            world_store.write_text(path, json.dumps(report, separators=(",", ":")))
+        except OSError as exc:
+            print(f"!!! World hashes not written: {exc}")
+        self.hashes = []
+
+    def _save_offset(self):
+        # resume point: before the oldest line still waiting its turn
+        resume = min((start for _, start in self.pending.values()), default=self.offset)
+        _write_offset(self.offset_file, resume, self.cursor)
 
     # ------------------------------------------------------------------ #
 
@@ -121,23 +264,16 @@ class Sequencer:
         if cmd_args:
             print(f"[Command:{seq}] Args: {cmd_args}")
 
-        # Execute without check=True, since we want to continue even if command fails
-        # Capture output to show it in raw form
-        result = subprocess.run(
-            [sys.executable, self.orchestrator, text, user],
-            cwd=self.client_dir,
-            capture_output=True,
-            text=True
-        )
-        
-        # Show raw output, not sanitized error messages
-        if result.stdout:
-            print(result.stdout)
-        if result.stderr:
-            print(result.stderr)
+        # The executor never raises on a failing command, since we want to
+        # continue; show its raw output, not sanitized error messages
+        returncode, stdout, stderr = self.executor.run(text, user, seq)
+        if stdout:
+            print(stdout)
+        if stderr:
+            print(stderr)
             
-        if result.returncode != 0:
-            print(f"!!! COMMAND FAILED: '{cmd_name}' (code {result.returncode})")
+        if returncode != 0:
+            print(f"!!! COMMAND FAILED: '{cmd_name}' (code {returncode})")
         
         # Note: We don't return anything because sequencer will continue regardless
 
@@ -146,9 +282,11 @@ class Sequencer:
 def main():
     parser = argparse.ArgumentParser(description="JC-CLI Sequencer (append-only)")
     parser.add_argument("--dir", help="Client directory to use", default=None)
+    parser.add_argument("--executor", choices=["subprocess", "inprocess", "pool"], default=None,
+                        help=f"How commands are run (default: {config.EXECUTOR})")
     args = parser.parse_args()
 
-    Sequencer(client_dir=args.dir).start()
+    Sequencer(client_dir=args.dir, executor=args.executor).start()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,9 @@
+# tests/conftest.py
+"""Shared fixtures; the project root is importable like from jc-cli.py."""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,138 @@
+# tests/test_async_server.py
+
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from engine.core import netcodec, world_store
+from engine.server import async_server, client_handling, command_processing
+from engine.server.checkpoints import CheckpointStore
+from engine.server.desync import DesyncMonitor
+from engine.server.history_store import HistoryStore
+from engine.server.recent_cache import RecentCommands
+
+
+class Conn:
+    def __init__(self, name):
+        self.username = name
+        self.addr = (name, 0)
+        self.closed = False
+        self.codec = netcodec.JSON
+        self.frames = []
+
+    def send(self, blob):
+        self.frames.append(blob)
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / "initial_world.json").write_text(json.dumps({"counter": 0}))
+    state = {"lock": threading.RLock(), "clients": [], "sequence_number": 10,
+             "session_dir": str(tmp_path), "client_snapshot": None,
+             "history": HistoryStore(str(tmp_path)), "recent": RecentCommands(8),
+             "history_io": ThreadPoolExecutor(max_workers=1),
+             "checkpoints": CheckpointStore(str(tmp_path), quorum=1),
+             "desync": DesyncMonitor(str(tmp_path))}
+    yield state
+    state["history_io"].shutdown(wait=True)
+
+
+async def _serve(server, client):
+    """Run *client(reader, writer)* against handle_connection on a local port."""
+    srv = await asyncio.start_server(lambda r, w: async_server.handle_connection(server, r, w),
+                                     "127.0.0.1", 0)
+    async with srv:
+        reader, writer = await asyncio.open_connection(*srv.sockets[0].getsockname()[:2])
+        try:
+            return await client(reader, writer)
+        finally:
+            writer.close()
+
+
+async def _read(reader, decoder, until):
+    """Messages up to and including the first of type *until*."""
+    out = []
+    while not out or not isinstance(out[-1], dict) or out[-1].get("type") != until:
+        chunk = await asyncio.wait_for(reader.read(65536), 5)
+        assert chunk, f"closed before {until}"
+        out += decoder.feed(chunk)
+    return out
+
+
+def _threads(monkeypatch, name):
+    """Record the thread *name* in command_processing runs on."""
+    seen, fn = [], getattr(command_processing, name)
+
+    def wrapper(*args):
+        seen.append(threading.current_thread())
+        return fn(*args)
+    monkeypatch.setattr(command_processing, name, wrapper)
+    return seen
+
+
+def test_reports_are_handled_off_the_event_loop(server, monkeypatch):
+    votes = _threads(monkeypatch, "record_checkpoint")
+    checks = _threads(monkeypatch, "check_world_hashes")
+    world = {"counter": 5}
+    a, b = Conn("a"), Conn("b")
+    server["clients"] = [a, b]
+
+    async def run():
+        state = client_handling.new_state()
+        await async_server._dispatch(server, a, {"type": "checkpoint", "seq": 5, "world": world,
+                                                 "sha256": world_store.digest(world)}, state, a.addr)
+        await async_server._dispatch(server, a, {"type": "world_hashes", "hashes": [[5, "x"]]},
+                                     state, a.addr)
+        await async_server._dispatch(server, b, {"type": "world_hashes", "hashes": [[5, "y"]]},
+                                     state, b.addr)
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(run())
+    assert server["checkpoints"].latest["seq"] == 5
+    assert len(votes) == 1 and len(checks) == 2
+    assert loop_thread not in votes + checks
+    assert server["desync"].first["seq"] == 5
+    assert len(a.frames) == len(b.frames) == 1          # the desync notice, sent from the loop
+
+
+def test_snapshot_is_read_off_the_event_loop(server, monkeypatch):
+    seen = []
+
+    def frames(*args):
+        for i in range(3):
+            seen.append(threading.current_thread())
+            yield netcodec.encode({"type": "snapshot_part", "n": i})
+    monkeypatch.setattr(command_processing, "snapshot_frames", frames)
+
+    async def client(reader, writer):
+        dec = netcodec.NetDecoder()
+        await _read(reader, dec, "hello")
+        writer.write(netcodec.encode({"type": "hello", "caps": []}))
+        msgs = await _read(reader, dec, "history_meta")
+        return msgs, threading.current_thread()
+
+    msgs, loop_thread = asyncio.run(_serve(server, client))
+    assert [m["n"] for m in msgs if m.get("type") == "snapshot_part"] == [0, 1, 2]
+    assert len(seen) == 3 and loop_thread not in seen
+
+
+def test_a_bad_message_closes_only_that_client(server):
+    errors = []
+
+    async def client(reader, writer):
+        asyncio.get_running_loop().set_exception_handler(lambda loop, ctx: errors.append(ctx))
+        dec = netcodec.NetDecoder()
+        await _read(reader, dec, "hello")
+        writer.write(netcodec.encode({"type": "hello", "caps": []}))
+        await _read(reader, dec, "history_meta")
+        writer.write(netcodec.encode({"type": "history_request", "from": "soon"}))
+        while await asyncio.wait_for(reader.read(65536), 5):
+            pass                                        # until the server closes it
+        await asyncio.sleep(0.05)
+
+    asyncio.run(_serve(server, client))
+    assert errors == []
+    assert server["clients"] == []
@@ -0,0 +1,51 @@
+# tests/test_checkpoints.py
+
+from engine.core import world_store
+from engine.server import command_processing
+from engine.server.checkpoints import CheckpointStore
+
+
+class Conn:
+    def __init__(self, name, port):
+        self.username = name
+        self.addr = ("127.0.0.1", port)
+
+
+def _report(seq, world):
+    return {"type": "checkpoint", "seq": seq, "world": world,
+            "sha256": world_store.digest(world)}
+
+
+def test_trusted_only_at_quorum_distinct_voters(tmp_path):
+    store = CheckpointStore(str(tmp_path), quorum=3)
+    world = {"counter": 5}
+    sha = world_store.digest(world)
+    assert not store.vote(5, sha, world, "a")
+    assert not store.vote(5, sha, world, "a")           # same voter again
+    assert not store.vote(5, world_store.digest({"counter": 6}), {"counter": 6}, "b")
+    assert not store.vote(5, "0" * 64, world, "c")      # hash of some other world
+    assert not store.vote(5, sha, world, "b")
+    assert store.latest is None
+    assert store.vote(5, sha, world, "c")
+    assert store.latest == {"seq": 5, "sha256": sha, "world": world}
+
+    assert not store.vote(4, world_store.digest({}), {}, "d")      # older than trusted
+    assert CheckpointStore(str(tmp_path), quorum=3).latest == store.latest
+
+
+def test_one_connection_counts_once_whatever_its_name(tmp_path):
+    server = {"sequence_number": 10, "checkpoints": CheckpointStore(str(tmp_path), quorum=2)}
+    conn = Conn("ann", 4000)
+    for name in ("ann", "bob", "cy"):
+        conn.username = name
+        command_processing.record_checkpoint(server, conn, _report(10, {"counter": 1}))
+    assert server["checkpoints"].latest is None
+
+    command_processing.record_checkpoint(server, Conn("ann", 4001), _report(10, {"counter": 1}))
+    assert server["checkpoints"].latest["seq"] == 10
+
+
+def test_reports_for_unordered_seqs_are_ignored(tmp_path):
+    server = {"sequence_number": 10, "checkpoints": CheckpointStore(str(tmp_path), quorum=1)}
+    command_processing.record_checkpoint(server, Conn("ann", 1), _report(11, {}))
+    assert server["checkpoints"].latest is None
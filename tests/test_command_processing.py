@@ -0,0 +1,159 @@
+# tests/test_command_processing.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import config
+from engine.core import netcodec
+from engine.server import command_processing
+from engine.server.history_store import HistoryStore
+from engine.server.recent_cache import RecentCommands
+
+
+class Conn:
+    """Records what the server sends; never blocks."""
+
+    def __init__(self):
+        self.frames = []
+        self.closed = False
+        self.codec = netcodec.JSON
+        self.compress_over = None
+        self.lagging_from = None
+        self.dropped_frames = 0
+        self.username = None
+        self.addr = ("test", 0)
+        self.backlog = 0                # bytes the peer has not read yet
+        self.on_drained = None
+
+    def send(self, blob):
+        self.frames.append(blob)
+
+    def queued_bytes(self):
+        return self.backlog
+
+    def notify_when_drained(self, callback):
+        self.on_drained = callback
+
+    def close(self):
+        self.closed = True
+
+    def messages(self):
+        return netcodec.NetDecoder().feed(b"".join(self.frames))
+
+
+@pytest.fixture
+def server(tmp_path):
+    state = {"lock": threading.RLock(), "clients": [], "sequence_number": 0,
+             "history": HistoryStore(str(tmp_path), segment_size=8),
+             "recent": RecentCommands(4),
+             "history_io": ThreadPoolExecutor(max_workers=1)}
+    yield state
+    state["history_io"].shutdown(wait=True)
+
+
+def _order(server, n):
+    for i in range(n):
+        command_processing.process_command(server, {"username": "u", "text": f"c{i}"})
+
+
+def test_history_is_written_without_the_server_lock(server):
+    gate = threading.Event()
+    server["history_io"].submit(gate.wait)          # the disk is stuck
+    _order(server, 3)
+    # ordering went on, and nobody waits on the server lock
+    assert server["sequence_number"] == 3
+    assert server["lock"].acquire(timeout=1)
+    server["lock"].release()
+    gate.set()
+    server["history_io"].shutdown(wait=True)
+    assert [c["seq"] for c in server["history"].read_range(1, 10)] == [1, 2, 3]
+
+
+def test_pages_from_disk_see_every_queued_append(server):
+    gate = threading.Event()
+    server["history_io"].submit(gate.wait)
+    _order(server, 10)                              # seqs 1-6 are out of the window
+    conn = Conn()
+    page = threading.Thread(target=command_processing.send_history_page, args=(server, conn, 1))
+    page.start()
+    time.sleep(0.1)
+    gate.set()
+    page.join(5)
+    [msg] = conn.messages()
+    assert [c["seq"] for c in msg["commands"]] == list(range(1, 11))
+
+
+def _kinds(conn):
+    out = []
+    for m in conn.messages():
+        if m.get("type") == "history_page":
+            out.append([c["seq"] for c in m["commands"]])
+        else:
+            out.append(m["type"])
+    conn.frames.clear()
+    return out
+
+
+def test_stream_respects_the_credit_window(server, monkeypatch):
+    monkeypatch.setattr(config, "HISTORY_PAGE_SIZE", 2)
+    _order(server, 7)
+    conn = Conn()
+    stream = command_processing.start_history_stream(server, {"from": 1, "window": 2})
+
+    assert not command_processing.pump_history_stream(server, conn, stream)
+    assert _kinds(conn) == [[1, 2], [3, 4]]
+    assert not command_processing.pump_history_stream(server, conn, stream)
+    assert _kinds(conn) == []                       # no credit left
+
+    for pages in ([[5, 6]], [[7]]):
+        stream["credit"] += 1                       # a history_ack
+        assert not command_processing.pump_history_stream(server, conn, stream)
+        assert _kinds(conn) == pages
+    stream["credit"] += 1
+    assert command_processing.pump_history_stream(server, conn, stream)
+    assert _kinds(conn) == ["history_stream_end"]
+
+
+def _slow_and_fast(server, monkeypatch, policy):
+    monkeypatch.setattr(config, "SLOW_CONSUMER_POLICY", policy)
+    monkeypatch.setattr(config, "OUTBOUND_QUEUE_LIMIT_KB", 1)
+    monkeypatch.setattr(config, "SLOW_CONSUMER_BUFFER_MB", 0.01)
+    slow, fast = Conn(), Conn()
+    server["clients"] = [slow, fast]
+    _order(server, 2)
+    slow.backlog = 2000
+    _order(server, 2)
+    return slow, fast
+
+
+def test_resync_withholds_commands_until_the_queue_drains(server, monkeypatch):
+    slow, fast = _slow_and_fast(server, monkeypatch, "resync")
+    assert [m["seq"] for m in fast.messages()] == [1, 2, 3, 4]
+    assert [m["seq"] for m in slow.messages()] == [1, 2]
+    assert (slow.lagging_from, slow.dropped_frames) == (3, 2)
+    assert not slow.closed and slow in server["clients"]
+
+    slow.frames.clear()
+    slow.backlog = 0
+    slow.on_drained(slow)
+    _order(server, 1)
+    meta, live = slow.messages()
+    assert (meta["type"], meta["from"]) == ("history_meta", 3)
+    assert live["seq"] == 5 and slow.lagging_from is None
+
+
+def test_disconnect_drops_the_client_past_the_limit(server, monkeypatch):
+    slow, fast = _slow_and_fast(server, monkeypatch, "disconnect")
+    assert slow.closed and server["clients"] == [fast]
+    assert [m["seq"] for m in fast.messages()] == [1, 2, 3, 4]
+
+
+def test_buffer_keeps_queueing_up_to_its_own_limit(server, monkeypatch):
+    slow, _ = _slow_and_fast(server, monkeypatch, "buffer")
+    assert not slow.closed and len(slow.messages()) == 4
+    slow.backlog = 20000
+    _order(server, 1)
+    assert slow.closed
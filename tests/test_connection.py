@@ -0,0 +1,52 @@
+# tests/test_connection.py
+
+import socket
+import threading
+
+import pytest
+
+from engine.server.connection import Connection
+
+
+def _pair():
+    a, b = socket.socketpair()
+    a.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    b.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    return Connection(a, "peer"), b
+
+
+def _read_all(sock, n):
+    got = b""
+    while len(got) < n:
+        got += sock.recv(65536)
+    return got
+
+
+def test_send_never_waits_for_a_stalled_reader():
+    conn, peer = _pair()
+    try:
+        blob = b"x" * 65536
+        for _ in range(32):                          # far more than the socket buffers
+            conn.send(blob)
+        assert conn.queued_bytes() > 0
+        assert conn.peak_bytes >= conn.queued_bytes()
+
+        drained = threading.Event()
+        conn.notify_when_drained(lambda c: drained.set())
+        assert _read_all(peer, 32 * len(blob)) == blob * 32
+        assert conn.flush(5) and drained.wait(5)
+        assert (conn.queued_bytes(), conn.queued_frames()) == (0, 0)
+        assert conn.sent_bytes == 32 * len(blob)
+    finally:
+        conn.close()
+        peer.close()
+
+
+def test_closed_connection_refuses_frames():
+    conn, peer = _pair()
+    conn.send(b"x" * 300000)
+    conn.close()
+    assert conn.queued_bytes() == 0
+    with pytest.raises(ConnectionError):
+        conn.send(b"y")
+    peer.close()
@@ -0,0 +1,35 @@
+# tests/test_desync.py
+
+import json
+
+from engine.server.desync import DESYNC_FILE, DesyncMonitor
+
+
+def test_first_divergent_seq_is_reported_once(tmp_path):
+    mon = DesyncMonitor(str(tmp_path))
+    assert mon.report("a", [[10, "h1"], [20, "h2"], [30, "h3"]]) is None
+    found = mon.report("b", [[10, "h1"], [20, "XX"], [30, "YY"]])
+    assert found == {"seq": 20, "after": 10, "groups": {"h2": ["a"], "XX": ["b"]}}
+
+    # a later seq, or the same seq again, is not news
+    assert mon.report("b", [[30, "ZZ"]]) is None
+    assert mon.report("c", [[20, "XX"]]) is None
+    assert mon.first["groups"] == {"h2": ["a"], "XX": ["b", "c"]}   # but is recorded
+    with open(tmp_path / DESYNC_FILE) as fh:
+        assert json.load(fh) == mon.first
+
+    # an earlier one replaces it
+    mon.report("a", [[5, "p"]])
+    assert mon.report("b", [[5, "q"]])["seq"] == 5
+
+
+def test_the_record_survives_a_restart_until_cleared(tmp_path):
+    mon = DesyncMonitor(str(tmp_path))
+    mon.report("a", [[10, "h1"]])
+    mon.report("b", [[10, "h2"]])
+    again = DesyncMonitor(str(tmp_path))
+    assert again.first["seq"] == 10
+    assert again.report("c", [[20, "x"]]) is None and again.report("d", [[20, "y"]]) is None
+
+    again.clear()
+    assert DesyncMonitor(str(tmp_path)).first is None
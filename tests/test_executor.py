@@ -0,0 +1,147 @@
+# tests/test_executor.py
+
+import json
+import os
+import shutil
+import textwrap
+
+import pytest
+
+import config
+from engine.client.executor import ROOT, make_executor
+
+ORCHESTRATOR = os.path.join(ROOT, "orchestrator.py")
+
+RAISE = '''NAME = "raise"
+import json, sys
+value = int(sys.argv[1])
+with open("data/world.json") as f:
+    world = json.load(f)
+world["counter"] += value
+print(f"Counter raised to {world['counter']}")
+with open("data/world.json", "w") as f:
+    json.dump(world, f)
+'''
+
+TRIM = '''NAME = "trim_counter"
+READS = ["counter"]
+import json, sys
+world = json.loads(sys.stdin.read())
+code = 9
+if world["counter"] > 10:
+    world["counter"], code = 10, 0
+print(json.dumps(world))
+sys.exit(code)
+'''
+
+# rule_loop.py and config.py as sessions created before the in-process
+# executor shipped them: main() takes no runner, and none of the new keys
+LEGACY_RULE_LOOP = '''import json, subprocess, sys
+def main():
+    world = json.load(open("data/world.json"))
+    proc = subprocess.run([sys.executable, "scripts/rules/trim.py"],
+                          input=json.dumps(world).encode(), capture_output=True)
+    print("legacy rule loop")
+    if proc.returncode == 0:
+        json.dump(json.loads(proc.stdout), open("data/world.json", "w"))
+    return proc.returncode
+if __name__ == "__main__":
+    sys.exit(main())
+'''
+LEGACY_CONFIG = 'DATA_DIR = "data"\nWORLD_FILE = "world.json"\nRULE_LOOP_SCRIPT = "rule_loop.py"\n'
+
+
+def _client(root, legacy=False):
+    for sub in ("data", "scripts/commands", "scripts/rules"):
+        os.makedirs(root / sub, exist_ok=True)
+    (root / "scripts/commands/raise.py").write_text(RAISE)
+    (root / "scripts/rules/trim.py").write_text(TRIM)
+    (root / "data/world.json").write_text(json.dumps({"counter": 0}))
+    if legacy:
+        (root / "rule_loop.py").write_text(LEGACY_RULE_LOOP)
+        (root / "config.py").write_text(LEGACY_CONFIG)
+    else:
+        shutil.copy(os.path.join(ROOT, "rule_loop.py"), root)
+        shutil.copy(os.path.join(ROOT, "config.py"), root)
+    return str(root)
+
+
+def _run(kind, client_dir, commands):
+    ex = make_executor(kind, client_dir, ORCHESTRATOR)
+    try:
+        results = [tuple(r.replace(client_dir, "<client>") if isinstance(r, str) else r
+                         for r in ex.run(text, "ann", seq))
+                   for seq, text in enumerate(commands, 1)]
+    finally:
+        ex.close()
+    with open(os.path.join(client_dir, "data", "world.json")) as fh:
+        return results, json.load(fh)
+
+
+@pytest.mark.parametrize("kind", ["inprocess", "pool"])
+def test_sessions_from_before_the_worker_run_like_subprocess(tmp_path, kind):
+    expected = _run("subprocess", _client(tmp_path / "subprocess", legacy=True), ["raise 7", "raise 9"])
+    got = _run(kind, _client(tmp_path / kind, legacy=True), ["raise 7", "raise 9"])
+    assert got == expected
+    assert expected[1] == {"counter": 10}
+    assert "legacy rule loop" in expected[0][1][1]
+
+
+HANDLER_RULE = '''NAME = "floor"
+READS = ["counter"]
+
+def run(world, argv, ctx):
+    if world["counter"] >= 0:
+        return 9
+    world["counter"] = 0
+'''
+
+
+@pytest.mark.parametrize("kind", ["inprocess", "pool"])
+def test_same_exit_codes_output_and_world_as_subprocess(tmp_path, kind):
+    commands = ["raise 7", "raise x", "raise -20", "nosuch 1", "raise 9"]
+    runs = {}
+    for k in ("subprocess", kind):
+        client_dir = _client(tmp_path / k)
+        (tmp_path / k / "scripts/rules/floor.py").write_text(HANDLER_RULE)
+        runs[k] = _run(k, client_dir, commands)
+
+    assert runs[kind] == runs["subprocess"]
+    results, world = runs[kind]
+    assert [code for code, _, _ in results] == [0, 1, 0, 1, 0]
+    assert "ValueError" in results[1][2]
+    assert world["counter"] == 9
+
+
+ADD = '''NAME = "add"
+
+def run(world, argv, ctx):
+    world["counter"] += 1               # half-done when argv[0] is not a number
+    world["counter"] += int(argv[0]) - 1
+'''
+
+# what data/world.json said while the rules ran
+PEEK_RULE = '''NAME = "peek"
+import json
+
+def run(world, argv, ctx):
+    with open("data/world.json") as fh:
+        on_disk = json.load(fh)["counter"]
+    if world.get("on_disk") == on_disk:
+        return 9
+    world["on_disk"] = on_disk
+'''
+
+
+@pytest.mark.parametrize("in_memory", [False, True])
+def test_world_in_memory_is_handed_from_command_to_rules(tmp_path, monkeypatch, in_memory):
+    monkeypatch.setattr(config, "WORLD_IN_MEMORY", in_memory)
+    client_dir = _client(tmp_path)
+    (tmp_path / "scripts/commands/add.py").write_text(ADD)
+    (tmp_path / "scripts/rules/peek.py").write_text(PEEK_RULE)
+    results, world = _run("subprocess", client_dir, ["raise 4", "add x", "add 3"])
+
+    assert [code for code, _, _ in results] == [0, 1, 0]
+    assert world["counter"] == 7                        # the failed add changed nothing
+    # in memory the rules see the command's world before it is written
+    assert world["on_disk"] == (4 if in_memory else 7)
@@ -0,0 +1,82 @@
+# tests/test_history_store.py
+
+import json
+import os
+
+import config
+from engine.server.history_store import HistoryStore
+
+
+def _cmd(seq):
+    return {"seq": seq, "timestamp": 0, "command": {"username": "u", "text": f"c{seq}"}}
+
+
+def _fill(store, first, last):
+    for seq in range(first, last + 1):
+        store.append(_cmd(seq))
+
+
+def test_append_rolls_segments_and_pages_span_them(tmp_path):
+    store = HistoryStore(str(tmp_path), segment_size=4)
+    _fill(store, 1, 10)
+
+    names = sorted(os.listdir(tmp_path / config.HISTORY_DIR))
+    assert names == ["00000001.idx", "00000001.ndjson", "00000005.idx", "00000005.ndjson",
+                     "00000009.idx", "00000009.ndjson"]
+    assert store.highest == 10
+    assert [c["seq"] for c in store.read_range(3, 5)] == [3, 4, 5, 6, 7]
+    assert [c["seq"] for c in store.read_range(9, 50)] == [9, 10]
+    assert store.read_range(11, 5) == []
+    assert store.read_raw(2, 1) == [json.dumps(_cmd(2), separators=(",", ":")).encode()]
+
+
+def test_reopen_continues_where_it_stopped(tmp_path):
+    store = HistoryStore(str(tmp_path), segment_size=4)
+    _fill(store, 1, 6)
+    store.close()
+
+    store = HistoryStore(str(tmp_path), segment_size=4)
+    assert store.highest == 6
+    _fill(store, 7, 9)
+    assert [c["seq"] for c in store.read_range(1, 20)] == list(range(1, 10))
+
+
+def test_reopen_drops_a_torn_line_and_rebuilds_indexes(tmp_path):
+    store = HistoryStore(str(tmp_path), segment_size=4)
+    _fill(store, 1, 6)
+    store.close()
+    folder = tmp_path / config.HISTORY_DIR
+    with open(folder / "00000005.ndjson", "ab") as fh:
+        fh.write(b'{"seq":7,"timest')                  # crash mid-write
+    os.remove(folder / "00000001.idx")
+    with open(folder / "00000005.idx", "ab") as fh:
+        fh.write(b"\0" * 8)                            # index ahead of the segment
+
+    store = HistoryStore(str(tmp_path), segment_size=4)
+    assert store.highest == 6
+    _fill(store, 7, 7)
+    assert [c["seq"] for c in store.read_range(1, 20)] == list(range(1, 8))
+
+
+def test_legacy_history_json_is_migrated_once(tmp_path):
+    legacy = tmp_path / config.HISTORY_FILE
+    legacy.write_text(json.dumps([_cmd(2), _cmd(1), _cmd(3)]))
+
+    store = HistoryStore(str(tmp_path), segment_size=2)
+    assert store.highest == 3
+    assert [c["seq"] for c in store.read_range(1, 10)] == [1, 2, 3]
+    assert not legacy.exists()
+    assert (tmp_path / (config.HISTORY_FILE + ".migrated")).exists()
+
+    store.close()
+    assert HistoryStore(str(tmp_path), segment_size=2).highest == 3
+
+
+def test_clear_starts_over(tmp_path):
+    store = HistoryStore(str(tmp_path), segment_size=4)
+    _fill(store, 1, 5)
+    store.clear()
+    assert store.highest == 0
+    assert os.listdir(tmp_path / config.HISTORY_DIR) == []
+    _fill(store, 1, 2)
+    assert [c["seq"] for c in store.read_range(1, 10)] == [1, 2]
@@ -0,0 +1,109 @@
+# tests/test_netcodec.py
+
+import random
+import socket
+import struct
+
+import pytest
+
+from engine.core import netcodec
+
+MESSAGES = [{"type": "hello", "caps": ["zlib"]}, {"seq": 1, "text": "ü ✓"}, [], "x" * 5000]
+
+
+def _stream(codec=netcodec.JSON, compress_over=None):
+    frames = [netcodec.encode(m, codec, compress_over) for m in MESSAGES]
+    frames.insert(2, netcodec.encode_binary(b"\x00\xffraw"))
+    return b"".join(frames), MESSAGES[:2] + [b"\x00\xffraw"] + MESSAGES[2:]
+
+
+def test_plain_json_frames_have_no_flags():
+    blob = netcodec.encode({"a": 1})
+    assert blob[:4] == struct.pack(">I", len(b'{"a":1}'))
+    assert blob[4:] == b'{"a":1}'
+
+
+def test_frame_splices_stored_json():
+    dec = netcodec.NetDecoder()
+    assert dec.feed(netcodec.frame(b'{"seq":3}')) == [{"seq": 3}]
+
+
+def test_compression_only_when_large_enough_and_smaller():
+    small = netcodec.encode({"k": "v"}, compress_over=1000)
+    big = netcodec.encode({"k": "v" * 5000}, compress_over=1000)
+    assert not struct.unpack(">I", small[:4])[0] & netcodec.FLAG_ZLIB
+    assert struct.unpack(">I", big[:4])[0] & netcodec.FLAG_ZLIB
+    assert len(big) < 1000
+    assert netcodec.NetDecoder().feed(big) == [{"k": "v" * 5000}]
+
+
+def test_oversized_payload_is_refused():
+    class Huge(bytes):
+        def __len__(self):
+            return netcodec.LENGTH_MASK + 1
+
+    with pytest.raises(ValueError):
+        netcodec.frame(Huge(b"x"))
+    with pytest.raises(ValueError):
+        netcodec.encode_binary(Huge(b"x"))
+
+
+@pytest.mark.parametrize("codec", list(netcodec.CODECS.values()), ids=list(netcodec.CODECS))
+@pytest.mark.parametrize("compress_over", [None, 64])
+def test_decoder_handles_any_split(codec, compress_over):
+    blob, expected = _stream(codec, compress_over)
+    assert netcodec.NetDecoder().feed(blob) == expected
+
+    dec = netcodec.NetDecoder(bufsize=16)        # forces growth and compaction
+    assert [m for b in blob for m in dec.feed(bytes([b]))] == expected
+
+    rnd = random.Random(7)
+    for _ in range(20):
+        dec, got, pos = netcodec.NetDecoder(bufsize=32), [], 0
+        while pos < len(blob):
+            step = rnd.randint(1, 700)
+            got += dec.feed(blob[pos:pos + step])
+            pos += step
+        assert got == expected
+
+
+def test_decoder_skips_bad_frames():
+    bad_zlib = struct.pack(">I", netcodec.FLAG_ZLIB | 3) + b"abc"
+    stream = (netcodec.frame(b"{not json") + bad_zlib + netcodec.frame(b"[" * 100000)
+              + netcodec.encode({"ok": 1}))
+    assert netcodec.NetDecoder().feed(stream) == [{"ok": 1}]
+
+
+@pytest.mark.skipif("msgpack" not in netcodec.CODECS, reason="msgpack not installed")
+@pytest.mark.parametrize("payload", [b"\x81\x91\x01\x01",      # unhashable map key
+                                     b"\xd4\xff\x00",          # bad timestamp ext
+                                     b"\xc1"])                 # reserved byte
+def test_decoder_skips_bad_msgpack_frames(payload):
+    bad = struct.pack(">I", netcodec.FLAG_MSGPACK | len(payload)) + payload
+    stream = bad + netcodec.encode({"ok": 1}, netcodec.CODECS["msgpack"])
+    assert netcodec.NetDecoder().feed(stream) == [{"ok": 1}]
+
+
+def test_recv_into_reads_frames_and_reports_close():
+    a, b = socket.socketpair()
+    try:
+        blob, expected = _stream()
+        a.sendall(blob)
+        a.close()
+        dec, got = netcodec.NetDecoder(bufsize=8), []
+        while (msgs := dec.recv_into(b)) is not None:
+            got += msgs
+        assert got == expected
+    finally:
+        b.close()
+
+
+def test_codec_negotiation():
+    assert netcodec.choose_codec(["json"], ["msgpack", "json"]) is netcodec.JSON
+    assert netcodec.choose_codec(None, ["msgpack", "json"]) is netcodec.JSON
+    assert netcodec.choose_codec(["zstd"], ["zstd"]) is netcodec.JSON
+    assert netcodec.available_codecs(["zstd", "json"]) == ["json"]
+    if "msgpack" in netcodec.CODECS:
+        chosen = netcodec.choose_codec(["json", "msgpack"], ["msgpack", "json"])
+        assert chosen.name == "msgpack"
+        assert netcodec.choose_codec(["json", "msgpack"], ["json", "msgpack"]).name == "json"
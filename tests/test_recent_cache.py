@@ -0,0 +1,53 @@
+# tests/test_recent_cache.py
+
+import json
+
+from engine.core import netcodec
+from engine.server.history_store import HistoryStore
+from engine.server.recent_cache import RecentCommands
+from engine.server.server_state import warm_recent_cache
+
+
+def _payload(seq):
+    return json.dumps({"seq": seq}, separators=(",", ":")).encode()
+
+
+def _push(recent, first, last):
+    for seq in range(first, last + 1):
+        recent.push(seq, netcodec.frame(_payload(seq)))
+
+
+def test_hits_until_evicted_then_misses():
+    recent = RecentCommands(4)
+    assert recent.payloads(1, 10) is None
+    _push(recent, 1, 3)
+    assert recent.payloads(2, 10) == [_payload(2), _payload(3)]
+
+    _push(recent, 4, 6)                             # 1 and 2 fall out
+    assert (recent.first_seq, recent.last_seq, len(recent)) == (3, 6, 4)
+    assert recent.payloads(2, 10) is None
+    assert recent.payloads(3, 2) == [_payload(3), _payload(4)]
+    assert recent.payloads(7, 10) == []
+
+
+def test_a_gap_starts_the_window_over():
+    recent = RecentCommands(4)
+    _push(recent, 1, 3)
+    _push(recent, 1, 1)                             # after a reset
+    assert (recent.first_seq, recent.last_seq) == (1, 1)
+    assert recent.payloads(1, 10) == [_payload(1)]
+
+
+def test_zero_capacity_always_misses():
+    recent = RecentCommands(0)
+    _push(recent, 1, 3)
+    assert recent.payloads(1, 10) is None
+
+
+def test_warmed_from_the_history_tail(tmp_path):
+    store = HistoryStore(str(tmp_path), segment_size=4)
+    for seq in range(1, 11):
+        store.append({"seq": seq, "timestamp": 0, "command": {"text": "x"}})
+    recent = warm_recent_cache(store, 3)
+    assert (recent.first_seq, recent.last_seq) == (8, 10)
+    assert recent.payloads(8, 3) == store.read_raw(8, 3)
@@ -0,0 +1,91 @@
+# tests/test_registry.py
+
+import os
+
+import pytest
+
+from engine.core import registry
+
+OLD = 1_000_000_000_000_000_000          # 2001: long past the racy window
+
+
+@pytest.fixture
+def scripts(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, "_memo", {})
+    monkeypatch.setattr(registry, "_paths", {})
+    parsed = []
+    parse = registry._parse
+
+    def counting(path):
+        parsed.append(os.path.basename(path))
+        return parse(path)
+    monkeypatch.setattr(registry, "_parse", counting)
+    (tmp_path / "data").mkdir()
+    folder = tmp_path / "commands"
+    folder.mkdir()
+
+    def write(rel, body, mtime=OLD):
+        path = folder / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(body)
+        os.utime(path, ns=(mtime, mtime))
+        return str(path)
+    write.folder, write.parsed = str(folder), parsed
+    write.index = str(tmp_path / "data" / registry.INDEX_FILE)
+    return write
+
+
+def test_only_changed_scripts_are_read_again(scripts):
+    a = scripts("a.py", 'NAME = "alpha"\n')
+    scripts("sub/b.py", 'NAME = "beta"\ndef run(world, argv, ctx):\n    pass\n')
+    found = registry.discover(scripts.folder, scripts.index)
+    assert found == {"alpha": a, "beta": os.path.join(scripts.folder, "sub", "b.py")}
+    assert sorted(scripts.parsed) == ["a.py", "b.py"]
+
+    scripts.parsed.clear()
+    registry.discover(scripts.folder, scripts.index)
+    assert scripts.parsed == []
+
+    scripts("a.py", 'NAME = "alpha"\n', mtime=OLD + 1)           # touched: read again
+    scripts("sub/b.py", 'NAME = "gamma"\n')                      # same mtime, new size
+    assert set(registry.discover(scripts.folder, scripts.index)) == {"alpha", "gamma"}
+    assert sorted(scripts.parsed) == ["a.py", "b.py"]
+
+
+def test_the_index_outlives_the_process(scripts):
+    scripts("a.py", 'NAME = "alpha"\n')
+    registry.discover(scripts.folder, scripts.index)
+    registry._memo.clear()
+    scripts.parsed.clear()
+    assert set(registry.discover(scripts.folder, scripts.index)) == {"alpha"}
+    assert scripts.parsed == []
+
+
+def test_fresh_files_are_not_trusted_to_the_index(scripts):
+    now = registry.time.time_ns()
+    path = scripts("a.py", 'NAME = "alpha"\n', mtime=now)
+    registry.discover(scripts.folder, scripts.index)
+    scripts("a.py", 'NAME = "omega"\n', mtime=now)              # same mtime and size
+    assert registry.discover(scripts.folder, scripts.index) == {"omega": path}
+
+
+def test_info_follows_the_file(scripts):
+    path = scripts("a.py", 'NAME = "alpha"\n')
+    registry.discover(scripts.folder, scripts.index)
+    scripts.parsed.clear()
+    assert not registry.info(path)["run"] and scripts.parsed == []
+
+    scripts("a.py", 'NAME = "alpha"\ndef run(world, argv, ctx):\n    pass\n', mtime=OLD + 1)
+    assert registry.has_handler(path)
+
+
+def test_removed_scripts_and_duplicate_names(scripts):
+    scripts("a.py", 'NAME = "same"\n')
+    b = scripts("b.py", 'NAME = "same"\n')
+    scripts("c.py", '# a view\nimport x\nNAME = "view"\n')
+    found = registry.discover(scripts.folder, scripts.index)
+    assert found["same"] == b and "view" not in found           # last in sorted order wins
+    assert "view" in registry.discover(scripts.folder, scripts.index, any_line=True)
+
+    os.remove(b)
+    assert registry.discover(scripts.folder, scripts.index)["same"].endswith("a.py")
@@ -0,0 +1,144 @@
+# tests/test_replay.py
+
+import json
+import os
+import zipfile
+
+import pytest
+
+import config
+from engine.core import replay, replay_farm, world_store
+from engine.server.history_store import HistoryStore
+
+RAISE = '''NAME = "raise"
+
+def run(world, argv, ctx):
+    world["counter"] += int(argv[0])
+'''
+
+# the same command after a "fix": an extra point on every raise
+RAISE_V2 = RAISE + '    world["counter"] += 1\n'
+
+COMMANDS = ["raise 2", "raise x", "raise 3", "raise 4"]
+
+
+def make_session(root, commands=COMMANDS):
+    """A recorded session: initial world, segmented history, client snapshot."""
+    os.makedirs(root / config.SNAPSHOT_DIR)
+    (root / config.INITIAL_WORLD_FILE).write_text(json.dumps({"counter": 0}))
+    with zipfile.ZipFile(root / config.SNAPSHOT_DIR / config.CLIENT_ZIP_NAME, "w") as zf:
+        zf.writestr("scripts/commands/raise.py", RAISE)
+        zf.writestr("scripts/rules/README", "no rules")
+    store = HistoryStore(str(root))
+    for seq, text in enumerate(commands, 1):
+        store.append({"seq": seq, "timestamp": 0, "command": {"text": text, "username": "ann"}})
+    store.close()
+    return str(root)
+
+
+def scripts_v2(root):
+    os.makedirs(root / "commands")
+    os.makedirs(root / "rules")
+    (root / "commands" / "raise.py").write_text(RAISE_V2)
+    return str(root)
+
+
+def test_trail_has_one_hash_per_seq(tmp_path):
+    result = replay.replay_session(make_session(tmp_path / "s"))
+    assert result["final_world"] == {"counter": 9}
+    assert [(s["seq"], s["code"]) for s in result["trail"]] == [(1, 0), (2, 1), (3, 0), (4, 0)]
+    assert result["trail"][0]["sha256"] == world_store.digest({"counter": 2})
+    assert result["trail"][1]["sha256"] == result["trail"][0]["sha256"]     # failed: no change
+    assert result["timings"]["commands"] == 4 and result["timings"]["failed"] == 1
+    assert result["checkpoint"] is None and result["source"]["scripts"] == "snapshot"
+
+
+@pytest.mark.parametrize("executor", ["subprocess", "pool"])
+def test_executors_give_the_same_trail(tmp_path, executor):
+    session = make_session(tmp_path / "s")
+    hashes = lambda r: [(s["seq"], s["sha256"], s["code"]) for s in r["trail"]]
+    assert hashes(replay.replay_session(session, executor=executor)) == \
+        hashes(replay.replay_session(session))
+
+
+def test_reused_workdir_replays_the_same(tmp_path):
+    session = make_session(tmp_path / "s")
+    first = replay.replay_session(session, workdir=str(tmp_path / "w"))
+    again = replay.replay_session(session, workdir=str(tmp_path / "w"))
+    assert again["trail"] == [dict(s, ms=t["ms"]) for s, t in zip(first["trail"], again["trail"])]
+    with open(tmp_path / "w" / config.DATA_DIR / "world_patches.ndjson") as fh:
+        assert [json.loads(ln)["seq"] for ln in fh] == [1, 3, 4]     # this run's only
+
+
+def test_checkpoint_and_divergence(tmp_path):
+    session = make_session(tmp_path / "s")
+    cp_dir = tmp_path / "s" / config.CHECKPOINT_DIR
+    os.makedirs(cp_dir)
+    (cp_dir / "latest.json").write_text(json.dumps(
+        {"seq": 3, "sha256": world_store.digest({"counter": 5}), "world": {"counter": 5}}))
+
+    base = replay.replay_session(session)
+    assert base["checkpoint"] == {"seq": 3, "sha256": world_store.digest({"counter": 5}),
+                                  "match": True}
+    candidate = replay.replay_session(session, scripts=scripts_v2(tmp_path / "v2"))
+    assert candidate["checkpoint"]["match"] is False
+    assert candidate["final_world"] == {"counter": 12}
+    assert replay.first_divergence(candidate["trail"], base["trail"]) == 1
+    assert replay.first_divergence(base["trail"], base["trail"]) is None
+    assert replay.first_divergence(base["trail"][:2], base["trail"]) == 3
+
+    replay.write_report(str(tmp_path / "out"), base)
+    assert replay.read_trail(str(tmp_path / "out")) == base["trail"]
+    assert world_store.load(str(tmp_path / "out" / config.WORLD_FILE)) == {"counter": 9}
+
+
+def test_legacy_history_json(tmp_path):
+    session = tmp_path / "s"
+    make_session(session, commands=[])
+    (session / config.HISTORY_FILE).write_text(json.dumps(
+        [{"seq": 2, "command": {"text": "raise 5", "username": "ann"}},
+         {"seq": 1, "command": {"text": "raise 1", "username": "ann"}}]))
+    result = replay.replay_session(str(session))
+    assert [s["seq"] for s in result["trail"]] == [1, 2]
+    assert result["final_world"] == {"counter": 6}
+
+
+def test_farm_reuses_a_baseline_until_the_history_grows(tmp_path):
+    session, out = make_session(tmp_path / "s"), str(tmp_path / "replays")
+    v2 = scripts_v2(tmp_path / "v2")
+    row = replay_farm.replay_one(session, scripts=v2, out_root=out)
+    assert row["final_sha256"] == world_store.digest({"counter": 12})
+    assert row["baseline_sha256"] == world_store.digest({"counter": 9})
+    assert row["first_divergent_seq"] == 1
+
+    baseline = os.path.join(out, "s", replay.SUMMARY_FILE)
+    os.utime(baseline, ns=(1, 1))
+    assert replay_farm.replay_one(session, scripts=v2, out_root=out)["baseline_sha256"] == \
+        row["baseline_sha256"]
+    assert os.stat(baseline).st_mtime_ns == 1                   # not replayed again
+
+    store = HistoryStore(session)
+    store.append({"seq": 5, "timestamp": 0, "command": {"text": "raise 1", "username": "ann"}})
+    store.close()
+    row = replay_farm.replay_one(session, scripts=v2, out_root=out)
+    assert row["baseline_sha256"] == world_store.digest({"counter": 10})
+    assert os.stat(baseline).st_mtime_ns != 1
+
+
+def test_farm_reports_every_session(tmp_path):
+    sessions, out = tmp_path / "sessions", str(tmp_path / "replays")
+    make_session(sessions / "a")
+    make_session(sessions / "b", commands=["raise 1"])
+    os.makedirs(sessions / "broken")
+    (sessions / "broken" / config.INITIAL_WORLD_FILE).write_text("{")
+    os.makedirs(sessions / "not-a-session")
+
+    report = replay_farm.replay_all(str(sessions), scripts=scripts_v2(tmp_path / "v2"),
+                                    workers=2, out_root=out)
+    assert [r["session"] for r in report["rows"]] == ["a", "b", "broken"]
+    assert report["errors"] == ["broken"]
+    assert report["diverged"] == ["a", "b"]
+    assert report["commands"] == 5 and report["failed_commands"] == 1
+    saved = [n for n in os.listdir(out) if n.startswith("replay-all-")]
+    with open(os.path.join(out, saved[0])) as fh:
+        assert json.load(fh)["rows"] == report["rows"]
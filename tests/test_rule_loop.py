@@ -0,0 +1,176 @@
+# tests/test_rule_loop.py
+
+import json
+import textwrap
+
+import pytest
+
+import config
+import rule_loop
+
+
+@pytest.fixture
+def loop(tmp_path, monkeypatch):
+    """Rules written on the fly, run through a stdin/stdout runner like the default one."""
+    monkeypatch.setattr(rule_loop, "BASE_FILE", tmp_path / "rules_base.json")
+    monkeypatch.delenv("JC_SEQ", raising=False)
+    for name, value in (("SELECTIVE_RULES", False), ("VERIFY_SKIPPED_RULES", False),
+                        ("RULES_FIXPOINT", False), ("RULES_MAX_PASSES", 16),
+                        ("PARALLEL_RULES", False), ("RULE_CONFLICTS", "serial")):
+        monkeypatch.setattr(config, name, value)
+
+    class Loop:
+        rules = {}
+        calls = []
+
+        def rule(self, rid, body, reads=None, writes=None):
+            """*body* edits ``world``; the rule exits 0 when it changed something."""
+            lines = [f'NAME = "{rid}"']
+            if reads is not None:
+                lines.append(f"READS = {reads!r}")
+            if writes is not None:
+                lines.append(f"WRITES = {writes!r}")
+            lines += ["", "def step(world):", textwrap.indent(textwrap.dedent(body), "    ")]
+            path = tmp_path / f"{rid}.py"
+            path.write_text("\n".join(lines) + "\n")
+            self.rules[rid] = str(path)
+
+        def run_script(self, path, argv, env=None, stdin=None):
+            world = json.loads(stdin)
+            before = json.dumps(world, sort_keys=True)
+            rule_loop._load_module(path)["step"](world)
+            self.calls.append(rule_loop.registry.info(path)["name"])
+            code = 9 if json.dumps(world, sort_keys=True) == before else 0
+            return code, json.dumps(world).encode(), b""
+
+        run_script.threadsafe = True
+
+        def apply(self, world):
+            self.calls.clear()
+            return rule_loop._apply(self.rules, world, self.run_script, rule_loop._load_module)
+
+    return Loop()
+
+
+def test_selective_skips_rules_whose_reads_did_not_change(loop, monkeypatch):
+    monkeypatch.setattr(config, "SELECTIVE_RULES", True)
+    loop.rule("cap", "world['counter'] = min(world['counter'], 10)", reads=["counter"])
+    loop.rule("heal", "world['hp'] = max(world['hp'], 1)", reads=["hp"])
+    loop.rule("tick", "world['ticks'] = world.get('ticks', 0) + 1")
+    world = {"rules_in_power": ["cap", "heal", "tick"], "counter": 12, "hp": 0}
+
+    world, changed = loop.apply(world)
+    assert changed and loop.calls == ["cap", "heal", "tick"]
+    assert (world["counter"], world["hp"]) == (10, 1)
+
+    # what rules changed last loop counts too: a rule before them may read it
+    world, _ = loop.apply(world)
+    assert loop.calls == ["cap", "heal", "tick"]
+    world, _ = loop.apply(world)
+    assert loop.calls == ["tick"]
+
+    world["counter"] = 20
+    world, _ = loop.apply(world)
+    assert loop.calls == ["cap", "tick"]
+    assert (world["counter"], world["ticks"]) == (10, 4)
+
+
+def test_edited_rule_runs_again(loop, monkeypatch):
+    monkeypatch.setattr(config, "SELECTIVE_RULES", True)
+    loop.rule("cap", "world['counter'] = min(world['counter'], 10)", reads=["counter"])
+    world, _ = loop.apply({"rules_in_power": ["cap"], "counter": 12})
+    world, _ = loop.apply(world)
+    world, _ = loop.apply(world)
+    assert loop.calls == []
+
+    loop.rule("cap", "world['counter'] = min(world['counter'], 5)", reads=["counter"])
+    world, _ = loop.apply(world)
+    assert loop.calls == ["cap"] and world["counter"] == 5
+
+
+
+def test_verify_runs_skipped_rules_on_a_copy(loop, monkeypatch, capsys):
+    monkeypatch.setattr(config, "SELECTIVE_RULES", True)
+    monkeypatch.setattr(config, "VERIFY_SKIPPED_RULES", True)
+    # reads counter, but only declares hp
+    loop.rule("cap", "world['counter'] = min(world['counter'], 10)", reads=["hp"])
+    world = {"rules_in_power": ["cap"], "counter": 5, "hp": 1}
+    for _ in range(3):
+        world, _ = loop.apply(world)
+    assert "WARNING" not in capsys.readouterr().out
+
+    world["counter"] = 20
+    world, changed = loop.apply(world)
+    assert loop.calls == ["cap"]                        # it did run ...
+    assert not changed and world["counter"] == 20       # ... but like a skipped rule
+    assert "cap would change ['counter']" in capsys.readouterr().out
+
+def test_fixpoint_reruns_rules_whose_inputs_changed(loop, monkeypatch):
+    loop.rule("mirror", "world['copy'] = world['counter']", reads=["counter"])
+    loop.rule("cap", "world['counter'] = min(world['counter'], 10)", reads=["counter"])
+    world = {"rules_in_power": ["mirror", "cap"], "counter": 15}
+
+    once, _ = loop.apply(dict(world))
+    assert once["copy"] == 15
+
+    monkeypatch.setattr(config, "RULES_FIXPOINT", True)
+    settled, changed = loop.apply(dict(world))
+    assert changed and settled["copy"] == settled["counter"] == 10
+    assert loop.calls == ["mirror", "cap", "mirror"]
+
+
+def test_fixpoint_stops_at_a_cycle(loop, monkeypatch, capsys):
+    monkeypatch.setattr(config, "RULES_FIXPOINT", True)
+    loop.rule("flip", "world['a'] = not world['b']", reads=["b"])
+    loop.rule("flop", "world['b'] = world['a']", reads=["a"])
+    loop.apply({"rules_in_power": ["flip", "flop"], "a": False, "b": False})
+    out = capsys.readouterr().out
+    assert "Rule cycle, the world repeats every 2 passes" in out
+    assert "RULES_MAX_PASSES" not in out
+
+
+def test_fixpoint_gives_up_after_max_passes(loop, monkeypatch, capsys):
+    monkeypatch.setattr(config, "RULES_FIXPOINT", True)
+    monkeypatch.setattr(config, "RULES_MAX_PASSES", 3)
+    loop.rule("x", "world['x'] = world['y'] + 1", reads=["y"])
+    loop.rule("y", "world['y'] = world['x'] + 1", reads=["x"])
+    world, _ = loop.apply({"rules_in_power": ["x", "y"], "x": 0, "y": 0})
+    assert "Rules still changing after 3 passes" in capsys.readouterr().out
+    assert loop.calls == ["x", "y"] * 3
+
+
+def _disjoint(loop, leak=False):
+    loop.rule("hp", "world['hp'] -= 1", reads=["hp"], writes=["hp"])
+    loop.rule("mp", "world['mp'] += 1" + ("\nworld['hp'] = 0" if leak else ""),
+              reads=["mp"], writes=["mp"])
+    loop.rule("sum", "world['total'] = world['hp'] + world['mp']",
+              reads=["hp", "mp"], writes=["total"])
+    return {"rules_in_power": ["hp", "mp", "sum"], "hp": 5, "mp": 5}
+
+
+def test_parallel_wave_matches_a_serial_pass(loop, monkeypatch, capsys):
+    serial, _ = loop.apply(_disjoint(loop))
+    monkeypatch.setattr(config, "PARALLEL_RULES", True)
+    parallel, changed = loop.apply(_disjoint(loop))
+    assert changed and parallel == serial == {**serial, "hp": 4, "mp": 6, "total": 10}
+    assert "Running rules side by side: hp, mp" in capsys.readouterr().out
+
+
+def test_parallel_rule_writing_outside_its_writes(loop, monkeypatch, capsys):
+    serial, _ = loop.apply(_disjoint(loop, leak=True))
+    monkeypatch.setattr(config, "PARALLEL_RULES", True)
+    world, _ = loop.apply(_disjoint(loop, leak=True))
+    assert world == serial
+    assert "Wrote outside the declared WRITES: mp" in capsys.readouterr().out
+
+    monkeypatch.setattr(config, "RULE_CONFLICTS", "fail")
+    with pytest.raises(rule_loop.RuleConflict):
+        loop.apply(_disjoint(loop, leak=True))
+
+
+def test_parallel_needs_a_threadsafe_runner(loop, monkeypatch, capsys):
+    monkeypatch.setattr(config, "PARALLEL_RULES", True)
+    world, _ = rule_loop._apply(loop.rules, _disjoint(loop), lambda *a: loop.run_script(*a),
+                                rule_loop._load_module)
+    assert "side by side" not in capsys.readouterr().out
+    assert world["total"] == 10
@@ -0,0 +1,118 @@
+# tests/test_sequencer.py
+
+import json
+import os
+
+import pytest
+
+import config
+import sequencer
+
+
+class Recorder:
+    """Executor stand-in: remembers the seqs it was asked to run."""
+
+    def __init__(self):
+        self.seqs = []
+
+    def run(self, text, user, seq=None):
+        self.seqs.append(seq)
+        return 0, "", ""
+
+    def close(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def _quiet(monkeypatch):
+    monkeypatch.setattr(config, "CHECKPOINT_INTERVAL", 0)
+    monkeypatch.setattr(config, "DESYNC_HASH_EVERY", 0)
+    monkeypatch.setattr(config, "TIMELINE_EVERY", 0)
+
+
+def _line(seq):
+    cmd = {"seq": seq, "timestamp": 0, "command": {"username": "u", "text": f"noop {seq}"}}
+    return json.dumps(cmd) + "\n"
+
+
+def _log(tmp_path, text):
+    with open(tmp_path / "data" / config.COMMANDS_LOG_FILE, "a") as fh:
+        fh.write(text)
+
+
+def _start(tmp_path):
+    seq = sequencer.Sequencer(client_dir=str(tmp_path), executor="subprocess")
+    seq.executor = Recorder()
+    return seq
+
+
+def _cursor(tmp_path):
+    return int((tmp_path / "data" / config.CURSOR_FILE).read_text())
+
+
+def test_runs_in_seq_order_and_holds_back_gaps(tmp_path):
+    seq = _start(tmp_path)
+    _log(tmp_path, _line(1) + _line(3) + _line(2) + _line(5) + "not json\n")
+    seq.process_new()
+    assert seq.executor.seqs == [1, 2, 3]
+    assert _cursor(tmp_path) == 3
+    assert set(seq.pending) == {5}
+
+    _log(tmp_path, _line(4) + _line(2))
+    seq.process_new()
+    assert seq.executor.seqs == [1, 2, 3, 4, 5]
+    assert seq.pending == {}
+
+
+def test_resume_rereads_lines_still_waiting(tmp_path):
+    first = _start(tmp_path)
+    _log(tmp_path, _line(1) + _line(2) + _line(4) + _line(5))
+    first.process_new()
+    assert first.executor.seqs == [1, 2]
+
+    # restart: the saved offset points at seq 4, the oldest line not run yet
+    _log(tmp_path, _line(3))
+    again = _start(tmp_path)
+    log_size = os.path.getsize(tmp_path / "data" / config.COMMANDS_LOG_FILE)
+    assert 0 < again.offset < log_size
+    again.process_new()
+    assert again.executor.seqs == [3, 4, 5]
+    assert _cursor(tmp_path) == 5
+
+
+def test_a_line_still_being_written_waits(tmp_path):
+    seq = _start(tmp_path)
+    line = _line(1)
+    _log(tmp_path, line[:10])
+    seq.process_new()
+    assert seq.executor.seqs == []
+    _log(tmp_path, line[10:])
+    seq.process_new()
+    assert seq.executor.seqs == [1]
+
+
+def test_offset_ahead_of_the_cursor_is_ignored(tmp_path):
+    seq = _start(tmp_path)
+    _log(tmp_path, _line(1) + _line(2))
+    seq.process_new()
+
+    # reset: log and cursor cleared, the old offset file left behind
+    open(tmp_path / "data" / config.COMMANDS_LOG_FILE, "w").close()
+    (tmp_path / "data" / config.CURSOR_FILE).write_text("0")
+    _log(tmp_path, _line(1))
+    again = _start(tmp_path)
+    assert again.offset == 0
+    again.process_new()
+    assert again.executor.seqs == [1]
+
+
+def test_truncated_log_is_read_from_the_top(tmp_path):
+    seq = _start(tmp_path)
+    _log(tmp_path, _line(1) + _line(2) + _line(4))
+    seq.process_new()
+
+    open(tmp_path / "data" / config.COMMANDS_LOG_FILE, "w").close()
+    _log(tmp_path, _line(3))
+    seq.process_new()
+    assert seq.executor.seqs == [1, 2, 3]
+    assert seq.pending == {}
@@ -0,0 +1,74 @@
+# tests/test_snapshot_transfer.py
+
+import json
+import os
+import zipfile
+
+import pytest
+
+import config
+from engine.client import client_network
+from engine.core import netcodec
+from engine.server import command_processing, server_state
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "SNAPSHOT_CHUNK_SIZE", 256)
+    session_dir = tmp_path / "session"
+    snap_dir = session_dir / config.SNAPSHOT_DIR
+    snap_dir.mkdir(parents=True)
+    with zipfile.ZipFile(snap_dir / config.CLIENT_ZIP_NAME, "w") as zf:
+        zf.writestr("scripts/commands/roll.py", "NAME = 'roll'\n" + "# padding\n" * 200)
+    (session_dir / config.INITIAL_WORLD_FILE).write_text(json.dumps({"counter": 0}))
+    return {"session_dir": str(session_dir), "checkpoints": None,
+            "client_snapshot": server_state.load_snapshot_info(str(session_dir))}
+
+
+@pytest.fixture
+def client(tmp_path):
+    client_dir = tmp_path / "client"
+    (client_dir / "data").mkdir(parents=True)
+    return {"client_dir": str(client_dir), "data_dir": str(client_dir / "data")}
+
+
+def _transfer(server, client, mangle=None):
+    hello = {"caps": ["snapshot_chunks"],
+             "snapshot_sha256": client_network._cached_snapshot_sha(client)}
+    frames = list(command_processing.snapshot_frames(server, hello))
+    msgs = netcodec.NetDecoder().feed(b"".join(frames))
+    for msg in msgs:
+        if mangle and isinstance(msg, bytes):
+            msg, mangle = mangle(msg), None
+        client_network._handle_message(client, msg)
+    return msgs
+
+
+def _script(client):
+    return os.path.join(client["client_dir"], "scripts", "commands", "roll.py")
+
+
+def test_chunks_are_installed_and_then_cached(session, client):
+    msgs = _transfer(session, client)
+    chunks = [m for m in msgs if isinstance(m, bytes)]
+    assert len(chunks) == -(-session["client_snapshot"]["size"] // 256)
+    assert os.path.exists(_script(client))
+    assert client_network._cached_snapshot_sha(client) == session["client_snapshot"]["sha256"]
+
+    msgs = _transfer(session, client)
+    assert msgs[0] == {"type": "snapshot_cached", "sha256": session["client_snapshot"]["sha256"]}
+    assert not any(isinstance(m, bytes) for m in msgs)
+
+
+def test_a_corrupted_chunk_is_rejected(session, client, capsys):
+    _transfer(session, client, mangle=lambda chunk: b"\0" + chunk[1:])
+    assert "Snapshot hash mismatch" in capsys.readouterr().out
+    assert not os.path.exists(_script(client))
+    assert client_network._cached_snapshot_sha(client) is None
+    assert os.listdir(client["data_dir"]) == [config.WORLD_FILE]     # no .part left
+
+
+def test_legacy_clients_get_one_base64_frame(session, client):
+    frames = list(command_processing.snapshot_frames(session, None))
+    kinds = [m["type"] for m in netcodec.NetDecoder().feed(b"".join(frames))]
+    assert kinds == ["snapshot_zip", "initial_world"]
@@ -0,0 +1,172 @@
+# tests/test_timeline.py
+
+import copy
+import os
+
+import pytest
+
+import config
+from engine.client import client_network
+from engine.core import timeline, world_patch, world_store
+
+
+class Client:
+    """A client data/ folder driven the way the sequencer drives it."""
+
+    def __init__(self, root, world=None):
+        self.data = str(root / "data")
+        os.makedirs(self.data, exist_ok=True)
+        self.world = world if world is not None else {"counter": 0}
+        self.cursor = 0
+        self.history = {0: world_store.digest(self.world)}
+        self._save()
+
+    def _save(self):
+        world_store.save(self.world, os.path.join(self.data, config.WORLD_FILE))
+        with open(os.path.join(self.data, config.CURSOR_FILE), "w") as fh:
+            fh.write(str(self.cursor))
+
+    def step(self, command, *rules):
+        """One seq: *command* and every rule edit the world in place."""
+        seq = self.cursor + 1
+        entries = []
+        for name, edit in (("cmd", command),) + tuple(("rule", r) for r in rules):
+            before = copy.deepcopy(self.world)
+            edit(self.world)
+            patch = world_patch.diff(before, self.world)
+            if patch:
+                entries.append({"seq": seq, "step": name, "name": name, "patch": patch,
+                                "undo": world_patch.diff(self.world, before)})
+        world_patch.append(os.path.join(self.data, config.PATCH_JOURNAL_FILE), entries)
+        self.cursor = seq
+        self._save()
+        self.history[seq] = world_store.digest(self.world)
+
+    def checkpoint(self, keep):
+        timeline.checkpoint(self.data, self.cursor,
+                            os.path.join(self.data, config.WORLD_FILE), keep)
+
+
+def _bump(key, by=1):
+    def edit(world):
+        world[key] = world.get(key, 0) + by
+    return edit
+
+
+def _run(client, n):
+    for i in range(n):
+        client.step(_bump("counter"),
+                    lambda w, i=i: w.setdefault("log", []).append(i),
+                    (lambda w: w.pop("flag", None)) if i % 3 else (lambda w: w.update(flag=True)))
+
+
+def test_goto_back_and_forward_match_every_seq(tmp_path):
+    client = Client(tmp_path)
+    timeline.prepare(client.data, 0, True)
+    _run(client, 12)
+
+    tl = timeline.Timeline(client.data)
+    for seq in list(range(12, -1, -1)) + list(range(13)) + [3, 11, 0, 7]:
+        assert world_store.digest(tl.goto(seq)) == client.history[seq]
+
+    tl.release()
+    assert world_store.digest(tl.back(2)) == client.history[10]
+    assert world_store.digest(tl.forward()) == client.history[11]
+    tl.forward(5)
+    assert tl.seq == 12
+    tl.release()
+    with pytest.raises(timeline.TimelineError):
+        tl.forward()
+
+
+def test_goto_never_touches_the_live_world(tmp_path):
+    client = Client(tmp_path)
+    timeline.prepare(client.data, 0, True)
+    _run(client, 4)
+    path = os.path.join(client.data, config.WORLD_FILE)
+    with open(path, "rb") as fh:
+        live = fh.read()
+
+    timeline.Timeline(client.data).goto(1)
+    with open(path, "rb") as fh:
+        assert fh.read() == live
+
+
+def test_kept_checkpoints_bound_the_journal(tmp_path):
+    client = Client(tmp_path)
+    timeline.prepare(client.data, 0, True)
+    for _ in range(4):
+        _run(client, 5)
+        client.checkpoint(keep=2)
+
+    assert timeline.checkpoints(client.data) == [15, 20]
+    assert timeline.horizon(client.data) == 15
+    journal = os.path.join(client.data, config.PATCH_JOURNAL_FILE)
+    assert min(e["seq"] for e in world_patch.read(journal)) == 16
+
+    tl = timeline.Timeline(client.data)
+    for seq in (15, 17, 20, 16):
+        assert world_store.digest(tl.goto(seq)) == client.history[seq]
+    with pytest.raises(timeline.TimelineError):
+        tl.goto(14)
+    tl.release()
+    tl.back(100)
+    assert tl.seq == 15
+
+
+def test_rewind_stops_at_a_checkpoint_join(tmp_path):
+    client = Client(tmp_path)
+    timeline.prepare(client.data, 0, True)
+    _run(client, 3)                 # an earlier life of this client folder
+
+    joined = {"counter": 40, "log": [], "note": "from the server"}
+    msg = {"type": "checkpoint", "seq": 40, "world": joined,
+           "sha256": world_store.digest(joined)}
+    commands = tmp_path / "data" / config.COMMANDS_LOG_FILE
+    client_network._handle_checkpoint(
+        {"data_dir": client.data, "commands_path": str(commands)}, msg)
+    timeline.prepare(client.data, 40, True)         # the restarted sequencer
+
+    client.world, client.cursor = joined, 40
+    client.history = {40: world_store.digest(joined)}
+    _run(client, 3)
+
+    tl = timeline.Timeline(client.data)
+    assert timeline.horizon(client.data) == 40
+    assert world_store.digest(tl.goto(40)) == client.history[40]
+    assert world_store.digest(tl.goto(42)) == client.history[42]
+    for seq in (39, 3, 0):
+        with pytest.raises(timeline.TimelineError):
+            tl.goto(seq)
+    tl.release()
+    tl.back(10)
+    assert tl.seq == 40
+
+
+def test_journal_switched_on_late_starts_at_the_cursor(tmp_path):
+    client = Client(tmp_path)
+    timeline.prepare(client.data, 0, False)         # WORLD_PATCHES off
+    client.step(_bump("counter"))
+    os.remove(os.path.join(client.data, config.PATCH_JOURNAL_FILE))    # not recorded
+    client.step(_bump("counter"))
+    os.remove(os.path.join(client.data, config.PATCH_JOURNAL_FILE))
+
+    timeline.prepare(client.data, client.cursor, True)
+    _run(client, 2)
+
+    tl = timeline.Timeline(client.data)
+    assert world_store.digest(tl.goto(2)) == client.history[2]
+    with pytest.raises(timeline.TimelineError):
+        tl.goto(1)
+
+
+def test_prepare_drops_steps_past_the_cursor(tmp_path):
+    client = Client(tmp_path)
+    timeline.prepare(client.data, 0, True)
+    _run(client, 6)
+    client.checkpoint(keep=5)
+
+    timeline.prepare(client.data, 4, True)
+    journal = os.path.join(client.data, config.PATCH_JOURNAL_FILE)
+    assert max(e["seq"] for e in world_patch.read(journal)) == 4
+    assert timeline.checkpoints(client.data) == []
@@ -0,0 +1,33 @@
+# tests/test_view.py
+
+import types
+
+import pytest
+
+pytest.importorskip("watchdog")
+import view
+
+
+@pytest.fixture
+def manager(tmp_path):
+    vm = object.__new__(view.ViewManager)
+    vm.username = "ann"
+    vm.cmd_queue = tmp_path / "cmd_queue"
+    vm.active_view = types.SimpleNamespace()
+    vm.travelled = []
+    vm._travel = lambda verb, arg: vm.travelled.append((verb, arg))
+    return vm
+
+
+def test_timeline_controls_need_the_colon(manager):
+    for line in (":rewind", ":REWIND 120", ":forward 3", ":live"):
+        manager.handle_input(line)
+    assert manager.travelled == [("rewind", ""), ("rewind", "120"), ("forward", "3"),
+                                 ("live", "")]
+
+
+def test_game_commands_of_the_same_name_reach_the_game(manager):
+    for line in ("rewind", "forward 2", "live"):
+        manager.handle_input(line)
+    assert manager.travelled == []
+    assert manager.cmd_queue.read_text() == "rewind\nforward 2\nlive\n"
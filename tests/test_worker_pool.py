@@ -0,0 +1,123 @@
+# tests/test_worker_pool.py
+
+import os
+import select
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import config
+from engine.client.worker_pool import WorkerPool
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+
+@pytest.fixture
+def script(tmp_path):
+    def write(name, body):
+        path = tmp_path / name
+        path.write_text(body)
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def pool():
+    pools = []
+
+    def make(**kw):
+        pools.append(WorkerPool(**kw))
+        return pools[-1]
+    yield make
+    for p in pools:
+        p.close()
+
+
+def test_scripts_get_argv_env_stdin_and_exit_code(pool, script):
+    path = script("echo.py", "import os, sys\n"
+                             "print(sys.argv[1:], os.environ['PLAYER'], sys.stdin.read())\n"
+                             "sys.exit(5)\n")
+    result = pool(size=1).run_script(path, ["a", "b"], {"PLAYER": "ann"}, b"in")
+    assert result == (5, b"['a', 'b'] ann in\n", b"")
+
+
+def test_children_are_recycled_after_max_jobs(pool, script):
+    path = script("pid.py", "import os\nprint(os.getpid())\n")
+    p = pool(size=1, max_jobs=2)
+    pids = [int(p.run_script(path, [])[1]) for _ in range(5)]
+    assert os.getpid() not in pids
+    assert pids[0] == pids[1] != pids[2] == pids[3] != pids[4]
+
+
+def test_a_crashing_script_only_takes_its_child(pool, script):
+    p = pool(size=1)
+    code, _, err = p.run_script(script("die.py", "import os\nos._exit(3)\n"), [])
+    assert code == 3 and b"pool worker died" in err
+    code, _, _ = p.run_script(script("kill.py", "import os, signal\n"
+                                                "os.kill(os.getpid(), signal.SIGKILL)\n"), [])
+    assert code == -9
+    assert p.run_script(script("ok.py", "print('ok')\n"), []) == (0, b"ok\n", b"")
+
+
+def test_children_drop_the_fds_they_are_told_to(pool):
+    r, w = os.pipe()
+    try:
+        pool(size=2, close_fds=(w,))
+        os.close(w)
+        w = None
+        # no child holds the write end: the reader sees EOF at once
+        assert select.select([r], [], [], 2)[0] and os.read(r, 1) == b""
+    finally:
+        os.close(r)
+        if w is not None:
+            os.close(w)
+
+
+def test_threads_share_the_pool_without_forking(pool, script):
+    path = script("pid.py", "import os, sys, time\ntime.sleep(0.1)\n"
+                            "print(os.getpid(), sys.argv[1])\n")
+    p = pool(size=2, max_jobs=1)
+    with ThreadPoolExecutor(max_workers=4) as threads:
+        outs = list(threads.map(lambda i: p.run_script(path, [str(i)])[1].split(), range(4)))
+    assert [int(arg) for _, arg in outs] == [0, 1, 2, 3]
+    assert len({pid for pid, _ in outs}) == 2           # worn out, but not replaced in a thread
+
+    again = {p.run_script(path, ["x"])[1].split()[0] for _ in range(2)}
+    assert not again & {pid for pid, _ in outs}         # the main thread recycles them
+
+
+def test_a_pool_emptied_by_crashes_in_threads_still_runs_jobs(pool, script):
+    p = pool(size=1)
+    die = script("die.py", "import os\nos._exit(3)\n")
+    ok = script("ok.py", "print('ok')\n")
+    with ThreadPoolExecutor(max_workers=1) as threads:
+        assert threads.submit(p.run_script, die, []).result()[0] == 3
+        assert threads.submit(p.run_script, ok, []).result() == (0, b"ok\n", b"")   # fresh interpreter
+    assert p.run_script(ok, []) == (0, b"ok\n", b"")
+    assert len(p._all) == 1
+
+
+RULE = '''NAME = "{name}"
+READS = ["in.{name}"]
+WRITES = ["out.{name}"]
+import json, sys
+w = json.load(sys.stdin)
+w.setdefault("out", {{}})["{name}"] = w["in"]["{name}"] * 2
+print(json.dumps(w))
+'''
+
+
+def test_rule_waves_run_on_the_pool(pool, script, monkeypatch, capsys):
+    import rule_loop
+    monkeypatch.setattr(rule_loop, "BASE_FILE", None)
+    monkeypatch.delenv("JC_SEQ", raising=False)
+    for name, value in (("SELECTIVE_RULES", False), ("RULES_FIXPOINT", False),
+                        ("PARALLEL_RULES", True), ("RULE_WORKERS", 2)):
+        monkeypatch.setattr(config, name, value)
+    rules = {n: script(f"{n}.py", RULE.format(name=n)) for n in ("a", "b", "c")}
+    world = {"rules_in_power": list(rules), "in": {"a": 1, "b": 2, "c": 3}}
+
+    world, changed = rule_loop._apply(rules, world, pool(size=2).run_script,
+                                      rule_loop._load_module)
+    assert changed and world["out"] == {"a": 2, "b": 4, "c": 6}
+    assert "Running rules side by side: a, b, c" in capsys.readouterr().out
@@ -0,0 +1,92 @@
+# tests/test_world_patch.py
+
+import copy
+
+import pytest
+
+from engine.core import world_diff, world_patch
+
+OLD = {
+    "counter": 1,
+    "flag": True,
+    "ratio": 1,
+    "players": {"ann": {"hp": 3, "items": ["axe", "rope"]}, "bo": {"hp": 0}},
+    "log": [1, 2, 3],
+    "odd/key~": "x",
+}
+NEW = {
+    "counter": True,                    # == 1, but not the same JSON
+    "flag": 1,
+    "ratio": 1.0,
+    "players": {"ann": {"hp": 2, "items": ["axe"]}, "cy": {"hp": 5}},
+    "log": [1, 5, 3, 4, 5],
+    "odd/key~": "y",
+    "new": None,
+}
+
+
+@pytest.mark.parametrize("old, new", [
+    (OLD, NEW),
+    (NEW, OLD),
+    ({"a": [1, {"b": 2}]}, {"a": []}),
+    ({"a": 1}, [1, 2]),
+    ({}, {}),
+])
+def test_diff_apply_undo_round_trip(old, new):
+    patch = world_patch.diff(old, new)
+    undo = world_patch.diff(new, old)
+    after = world_patch.apply(copy.deepcopy(old), patch)
+    assert world_diff.same(after, new)
+    assert world_diff.same(world_patch.apply(after, undo), old)
+
+
+def test_equal_numbers_of_other_types_are_changes():
+    assert world_patch.diff({"n": 1}, {"n": True}) == [{"op": "replace", "path": "/n", "value": True}]
+    assert world_patch.diff({"n": [1]}, {"n": [1.0]}) == [{"op": "replace", "path": "/n/0", "value": 1.0}]
+    assert world_patch.diff({"n": 1}, {"n": 1}) == []
+    assert world_diff.changed_keys({"a": {"b": 0}}, {"a": {"b": False}}) == {("a", "b")}
+
+
+def test_pointers_are_escaped():
+    patch = world_patch.diff({"a/b": 1, "c~d": 1}, {"a/b": 2, "c~d": 2})
+    assert sorted(op["path"] for op in patch) == ["/a~1b", "/c~0d"]
+
+
+def test_apply_understands_every_operation():
+    doc = {"a": {"b": [1, 2]}, "c": 1}
+    doc = world_patch.apply(doc, [
+        {"op": "test", "path": "/c", "value": 1},
+        {"op": "copy", "from": "/a/b", "path": "/d"},
+        {"op": "move", "from": "/c", "path": "/a/c"},
+        {"op": "add", "path": "/d/-", "value": 3},
+        {"op": "add", "path": "/d/0", "value": 0},
+    ])
+    assert doc == {"a": {"b": [1, 2], "c": 1}, "d": [0, 1, 2, 3]}
+    for bad in ({"op": "test", "path": "/d/0", "value": 9}, {"op": "remove", "path": "/zz"},
+                {"op": "replace", "path": "/d/9", "value": 1}, {"op": "frob", "path": ""},
+                {"op": "move", "from": "/a", "path": "/a/x"}):
+        with pytest.raises(world_patch.PatchError):
+            world_patch.apply(doc, [bad])
+
+
+def test_journal_append_read_trim(tmp_path):
+    path = str(tmp_path / "world_patches.ndjson")
+    world = {"n": 0}
+    for seq in range(1, 6):
+        new = {"n": seq}
+        world_patch.append(path, [{"seq": seq, "step": "rule", "name": "inc",
+                                   "patch": world_patch.diff(world, new),
+                                   "undo": world_patch.diff(new, world)}])
+        world = new
+    with open(path, "a") as fh:
+        fh.write('{"seq":6,"pat')                       # still being written
+
+    assert [e["seq"] for e in world_patch.read(path, since=2)] == [3, 4, 5]
+    assert world_patch.world_at({"n": 0}, list(world_patch.read(path))) == {"n": 5}
+
+    world_patch.trim(path, 3)
+    assert [e["seq"] for e in world_patch.read(path)] == [1, 2, 3]
+    world_patch.drop_before(path, 1)
+    assert [e["seq"] for e in world_patch.read(path)] == [2, 3]
+    world_patch.trim(path, 0)
+    assert list(world_patch.read(path)) == []
@@ -0,0 +1,52 @@
+# tests/test_world_store.py
+
+import os
+
+import pytest
+
+import config
+from engine.core import world_store
+
+
+def test_save_is_compact_and_leaves_no_temp_file(tmp_path):
+    path = str(tmp_path / "world.json")
+    assert world_store.save({"a": 1, "b": [1, 2]}, path)
+    assert open(path).read() == '{"a":1,"b":[1,2]}'
+    assert os.listdir(tmp_path) == ["world.json"]
+    assert world_store.load(path) == {"a": 1, "b": [1, 2]}
+
+
+def test_unchanged_world_is_not_written(tmp_path):
+    path = str(tmp_path / "world.json")
+    world_store.save({"a": 1}, path)
+    os.utime(path, ns=(1, 1))
+    assert not world_store.save({"a": 1}, path)
+    assert os.stat(path).st_mtime_ns == 1
+    assert world_store.save({"a": 2}, path)
+
+
+def test_failed_write_keeps_the_old_world(tmp_path, monkeypatch):
+    path = str(tmp_path / "world.json")
+    world_store.save({"a": 1}, path)
+
+    def broken(src, dst, attempts=10):
+        raise OSError("disk full")
+    monkeypatch.setattr(world_store, "_replace", broken)
+    with pytest.raises(OSError):
+        world_store.save({"a": 2}, path)
+    assert world_store.load(path) == {"a": 1}
+    assert os.listdir(tmp_path) == ["world.json"]
+
+
+def test_indent_for_debugging(tmp_path, monkeypatch):
+    path = str(tmp_path / "world.json")
+    monkeypatch.setattr(config, "WORLD_INDENT", 2)
+    world_store.save({"a": 1}, path)
+    assert open(path).read() == '{\n  "a": 1\n}'
+    assert world_store.save({"a": 1}, path, indent=0)     # now compact
+    assert open(path).read() == '{"a":1}'
+
+
+def test_digest_ignores_key_order_but_not_types():
+    assert world_store.digest({"a": 1, "b": 2}) == world_store.digest({"b": 2, "a": 1})
+    assert world_store.digest({"a": 1}) != world_store.digest({"a": True})
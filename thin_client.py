@@ -153,6 +153,7 @@ def command_loop(client):
                     for command in cmds:
                         print(f"→ Sending command: {command}")
                         client_network.send_command(client, command)
+            client_network.flush_outbox(client)
             time.sleep(0.1)
     except KeyboardInterrupt:
         print("\nDisconnecting from server...")
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 """
 JC-CLI Thin Server – updated for paged-history protocol
+
+Two connection models share the same command processing:
+  • threads – one OS thread per client (default)
+  • asyncio – every client as a coroutine on a single event loop
 """
 
-import argparse, os, sys, threading, socket
+import argparse, os, sys, threading, socket, time
+from concurrent.futures import ThreadPoolExecutor
 import config
 from engine.server import server_state, client_handling, command_processing
 
@@ -11,9 +16,16 @@ from engine.server import server_state, client_handling, command_processing
 def main():
     parser = argparse.ArgumentParser(description="JC-CLI Thin Server")
     parser.add_argument("--session-dir", help="Session directory", default=None)
+    parser.add_argument("--history-cache", type=int, default=config.HISTORY_CACHE_SIZE,
+                        help="Recent commands kept in memory for catch-up "
+                             f"(default: {config.HISTORY_CACHE_SIZE})")
+    parser.add_argument("--mode", choices=("threads", "asyncio"), default=config.SERVER_MODE,
+                        help=f"Connection handling model (default: {config.SERVER_MODE})")
+    parser.add_argument("--metrics-interval", type=float, default=config.METRICS_INTERVAL,
+                        help="Print per-client outbound queue depth every N seconds (0 = off)")
     args = parser.parse_args()
 
-    server = server_state.initialize(args.session_dir)
+    server = server_state.initialize(args.session_dir, args.history_cache)
     if not server:
         return
 
@@ -21,38 +33,60 @@ def main():
     print(f"Server listening on port {config.SERVER_PORT}")
     for ip in (server["local_ips"] or ["localhost"]):
         print(f"* {ip}:{config.SERVER_PORT}")
+    print(f"Mode: {args.mode}")
     print("=============================================\n")
 
-    listen_for_connections(server)
+    if args.metrics_interval > 0:
+        threading.Thread(
+            target=report_metrics, args=(server, args.metrics_interval), daemon=True
+        ).start()
+
+    if args.mode == "asyncio":
+        from engine.server import async_server
+        async_server.run(server)
+    else:
+        listen_for_connections(server)
 
 # --------------------------------------------------------------------------- #
 def listen_for_connections(server):
-    """Accept clients and push snapshot + history-meta header."""
-    server["socket"].listen(5)
+    """Accept clients; each thread pushes its own snapshot + history-meta header."""
+    server["socket"].listen(config.LISTEN_BACKLOG)
+    # history appends leave the server lock for this thread (page reads queue behind them)
+    server["history_io"] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
 
     try:
         while True:
             client_sock, addr = server["socket"].accept()
             print(f"New connection from {addr}")
 
-            # 1) push client code snapshot
-            command_processing.send_snapshot(server, client_sock)
-            # 2) push only history metadata (page count / highest_seq)
-            command_processing.send_history_meta(server, client_sock)
-
-            # hand the socket to a dedicated receive thread
+            # hand the socket to a dedicated thread – a slow joiner's
+            # snapshot no longer holds up the next accept()
             t = threading.Thread(
                 target=client_handling.handle_client,
                 args=(server, client_sock, addr),
                 daemon=True,
             )
             t.start()
-            server["clients"].append(client_sock)
 
     except KeyboardInterrupt:
         print("\nShutting down server.")
     finally:
         server["socket"].close()
+        server.pop("history_io").shutdown(wait=True)    # queued appends still land
+
+# --------------------------------------------------------------------------- #
+def report_metrics(server, interval):
+    """Periodically print each client's outbound queue depth."""
+    while True:
+        time.sleep(interval)
+        rows = command_processing.client_metrics(server)
+        print(f"--- outbound queues ({len(rows)} clients) ---")
+        for m in rows:
+            frames = "?" if m["queued_frames"] is None else m["queued_frames"]
+            lag = f"  resync from {m['lagging_from']}" if m["lagging_from"] else ""
+            print(f"{m['username'] or m['addr']}: {frames} frames / {m['queued_bytes']} B queued, "
+                  f"peak {m['peak_bytes']} B, sent {m['sent_bytes']} B, "
+                  f"dropped {m['dropped_frames']}{lag}")
 
 # --------------------------------------------------------------------------- #
 if __name__ == "__main__":
@@ -10,6 +10,11 @@ Launches and coordinates game‑specific view modules.  Two modes:
 The view script is discovered by NAME metadata inside scripts/views/*.py.
 A running manager can switch views with the local command:
     view <view_id>
+and look back in time without touching the live world (engine/core/timeline.py):
+    :rewind [seq]   – one seq back, or to <seq>
+    :forward [seq]  – one seq ahead, or to <seq>
+    :live           – follow the live world again
+The colon keeps them apart from game commands of the same name.
 
 Game commands are queued for thin_client via --cmd-queue file.
 """
@@ -20,25 +25,18 @@ from watchdog.events import FileSystemEventHandler
 
 # Engine configuration
 import config
+from engine.core import registry as script_index
+from engine.core import timeline
 
 # ---------------------------------------------------------------------------
 # Discovery helpers
 # ---------------------------------------------------------------------------
 
 def _discover_views(folder: Path):
-    registry: dict[str, Path] = {}
-    for path in folder.rglob("*.py"):
-        try:
-            with path.open() as fh:
-                for line in fh:
-                    s = line.strip()
-                    if s.startswith("NAME"):
-                        name = s.split("=", 1)[1].strip().strip("\"'")
-                        registry[name] = path
-                        break
-        except OSError:
-            pass
-    return registry
+    # NAME may sit on any line of a view script
+    index = folder.parent.parent / "data" / script_index.INDEX_FILE
+    return {name: Path(path)
+            for name, path in script_index.discover(folder, str(index), any_line=True).items()}
 
 def _load_view(name: str, registry: dict[str, Path]):
     path = registry.get(name)
@@ -61,6 +59,12 @@ class _TriggerHandler(FileSystemEventHandler):
             return
         if os.path.abspath(event.src_path) == str(self.manager.trigger_file):
             self.manager.render_once()
+    def on_moved(self, event):
+        # world_store replaces world.json by renaming a temp file over it
+        if event.is_directory:
+            return
+        if os.path.abspath(event.dest_path) == str(self.manager.trigger_file):
+            self.manager.render_once()
 
 # ---------------------------------------------------------------------------
 # Manager
@@ -88,6 +92,7 @@ class ViewManager:
         else:
             self.trigger_file = self.data_dir / config.WORLD_FILE
         self.trigger_file.touch(exist_ok=True)
+        self.timeline = timeline.Timeline(self.data_dir)
 
         # Observer setup
         self.observer = Observer()
@@ -104,14 +109,21 @@ class ViewManager:
 
     # ---------------- rendering --------------------
     def render_once(self):
-        world = self._load_world()
         ctx   = {"username": self.username}
+        if self.timeline.seq is None:
+            world = self._load_world()
+        else:
+            # rewound: new commands still arrive, the view stays put
+            world = self.timeline.world
+            ctx["rewound"] = self.timeline.seq
         # clear terminal for readability
         os.system('cls' if os.name == 'nt' else 'clear')
         try:
             self.active_view.render(world, ctx)  # type: ignore[attr-defined]
         except Exception as e:
             print(f"[view-error] {e}")
+        if "rewound" in ctx:
+            print(f"[rewound to seq {ctx['rewound']} – ':rewind', ':forward' or ':live']")
 
     # ---------------- input handling ---------------
     def _queue_command(self, line: str):
@@ -130,6 +142,29 @@ class ViewManager:
         print(f"Switched to view '{vid}'.")
         self.render_once()
 
+    def _travel(self, verb: str, arg: str):
+        if verb == "live":
+            self.timeline.release()
+            self.render_once()
+            return
+        if not config.WORLD_PATCHES:
+            print("Rewind needs WORLD_PATCHES (the patch journal) turned on.")
+            return
+        if arg and not arg.isdigit():
+            print(f"Usage: :{verb} [seq]")
+            return
+        try:
+            if arg:
+                self.timeline.goto(int(arg))
+            elif verb == "rewind":
+                self.timeline.back()
+            else:
+                self.timeline.forward()
+        except (timeline.TimelineError, OSError, ValueError) as e:
+            print(f"Cannot {verb}: {e}")
+            return
+        self.render_once()
+
     def handle_input(self, line: str):
         line = line.strip()
         if not line:
@@ -137,6 +172,10 @@ class ViewManager:
         if line.lower().startswith("view "):
             self._switch_view(line.split(maxsplit=1)[1].strip())
             return
+        verb, _, arg = line.partition(" ")
+        if verb.lower() in (":rewind", ":forward", ":live"):
+            self._travel(verb[1:].lower(), arg.strip())
+            return
         # delegate to current view
         if hasattr(self.active_view, "handle_input"):
             consumed = bool(self.active_view.handle_input(line, {"username": self.username}))  # type: ignore[attr-defined]